@@ -1,11 +1,20 @@
 import joblib
 import numpy as np
+import pandas as pd
 import logging
 from datetime import datetime
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, LSTM
 from tensorflow.keras.callbacks import EarlyStopping
-from tensorflow.keras.models import load_model
+from sklearn.pipeline import make_pipeline
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.base import clone
+from utils.forest_compiler import compile_forest
+from utils.model_registry import load_shared
+from utils.cascade import CascadeDetector, CascadeStage, proba_scorer, rnn_scorer
 
 # Configure logging
 logging.basicConfig(filename='rnn_intrusion_detection.log', level=logging.INFO)
@@ -70,7 +79,8 @@ def save_model(model, model_path):
 
 
 def load_trained_model(model_path):
-    model = load_model(model_path)
+    # One copy per process, shared by every caller of the same file
+    model = load_shared(model_path)
     logging.info(f"Model loaded from {model_path}")
     return model
 
@@ -109,52 +119,121 @@ def main():
     # Load the trained model (for demonstration purposes)
     trained_model = load_trained_model(model_path)
 
-# Predict anomalies on the validation set
-    anomalies = predict_anomalies(trained_model, X_val)
+    # Put cheaper detectors in front of the RNN and tune them on half of the validation set
+    flat_train = X_train.reshape(len(X_train), -1)
+    flat_val = X_val.reshape(len(X_val), -1)
+    X_cal, X_test, y_cal, y_test = train_test_split(
+        flat_val, y_val, test_size=0.5, random_state=42, stratify=y_val)
+    detector = AIDetectionModel()
+    detector.train(flat_train, y_train)
+    cascade = build_detection_cascade(flat_train, y_train, detector, trained_model, X_cal, y_cal)
+
+    # Predict anomalies on the held-out part of the validation set
+    anomalies = cascade.predict(X_test)
     logging.info(
-    f"Anomalies detected: {np.sum(anomalies)} out of {len(anomalies)}")
+        f"Anomalies detected: {np.sum(anomalies)} out of {len(anomalies)}")
+    logging.info(cascade.format_report())
 
-# Save detected anomalies to a file
-output_file = f"detected_anomalies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-pd.DataFrame(anomalies, columns=['Anomaly']).to_csv(
-    output_file, index=False)
-logging.info(f"Detected anomalies saved to {output_file}")
-
-
-if __name__ == "__main__":
-    main()
+    # Save detected anomalies to a file
+    output_file = f"detected_anomalies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    pd.DataFrame(anomalies, columns=['Anomaly']).to_csv(
+        output_file, index=False)
+    logging.info(f"Detected anomalies saved to {output_file}")
 
 
 class AIDetectionModel:
-    def __init__(self, model_path=None):
-        if model_path:
-            self.model = joblib.load(model_path)
+    def __init__(self, model_path=None, model=None):
+        self.compiled = None
+        self.shared = False
+        self.version = None
+        if model is not None:
+            self.model = model
+            self.shared = True
+        elif model_path:
+            self.model = load_shared(model_path)
+            self.shared = True
         else:
             self.model = make_pipeline(
                 StandardScaler(),
                 RandomForestClassifier(n_estimators=100, random_state=42)
             )
 
+    @classmethod
+    def from_registry(cls, registry, name, version=None):
+        model, version = registry.load(name, version)
+        detector = cls(model=model)
+        detector.version = version
+        return detector
+
+    def _own_model(self):
+        # Shared models are read-only; retraining works on a private copy
+        if self.shared:
+            self.model = clone(self.model)
+            self.shared = False
+
     def train(self, X_train, y_train):
+        self._own_model()
         self.model.fit(X_train, y_train)
+        self.compiled = None
         print("Model training completed.")
 
+    def compile(self, threshold_dtype=np.float64):
+        # Flatten the fitted forest so small batches skip per-tree dispatch; large ones stay on the stock model
+        self.compiled = compile_forest(self.model, threshold_dtype=threshold_dtype)
+        print(f"Model compiled: {self.compiled.n_trees} trees, {self.compiled.n_nodes} nodes.")
+
     def predict(self, data):
         if isinstance(data, dict):
             data = np.array([list(data.values())])
+        if self.compiled is not None:
+            return self.compiled.predict(data)
         return self.model.predict(data)
 
+    def predict_proba(self, data):
+        if isinstance(data, dict):
+            data = np.array([list(data.values())])
+        if self.compiled is not None:
+            return self.compiled.predict_proba(data)
+        return self.model.predict_proba(data)
+
     def save_model(self, model_path):
         joblib.dump(self.model, model_path)
         print(f"Model saved to {model_path}")
 
     def update_model(self, X_new, y_new):
+        self._own_model()
         self.model.fit(X_new, y_new)
+        self.compiled = None
         print("Model updated with new data.")
 
 
+def build_detection_cascade(X_train, y_train, detector, rnn_model, X_val, y_val,
+                            target_recall=0.99, max_false_alarm_rate=0.01):
+    """Logistic regression -> random forest -> RNN, calibrated on validation events"""
+    screen = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    screen.fit(X_train, y_train)
+    if detector.compiled is None:
+        detector.compile()
+    stages = [
+        CascadeStage('logistic', proba_scorer(screen)),
+        CascadeStage('random_forest', proba_scorer(detector)),
+    ]
+    if rnn_model is not None:
+        stages.append(CascadeStage('rnn', rnn_scorer(rnn_model)))
+    cascade = CascadeDetector(stages)
+    calibration = cascade.calibrate(X_val, y_val, target_recall=target_recall,
+                                    max_false_alarm_rate=max_false_alarm_rate)
+    logging.info(f"Cascade calibrated: recall {calibration['recall']:.3f}, "
+                 f"false alarms {calibration['false_alarm_rate']:.3f}, "
+                 f"stage share {calibration['stage_fractions']}")
+    return cascade
+
+
 # Example usage
 if __name__ == "__main__":
+    # main() needs AIDetectionModel, so it runs once everything is defined
+    main()
+
     # Sample data for training
     X_train = np.array([[0.1, 0.2, 0.3], [1.0, 1.1, 1.2], [0.5, 0.6, 0.7]])
     y_train = np.array([0, 1, 0])
@@ -168,6 +247,7 @@ if __name__ == "__main__":
 
     # Load the model and make a prediction
     loaded_model = AIDetectionModel(model_path="intrusion_detection_model.pkl")
+    loaded_model.compile()
     sample_data = {"feature1": 0.2, "feature2": 0.3, "feature3": 0.4}
     prediction = loaded_model.predict(sample_data)
     print(f"Prediction: {prediction}")
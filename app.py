@@ -1,5 +1,5 @@
+import importlib
 import streamlit as st
-from modules import monitor, threat_detection, isolation, mitigation, recovery, education, pentest
 
 st.set_page_config(
     page_title="Security Lifecycle Demo",
@@ -7,29 +7,29 @@ st.set_page_config(
     layout="wide"
 )
 
+# Navigation label -> (module, render function). Page modules pull in plotly,
+# pandas, networkx, nvdlib and the analysis engines, so each one is imported
+# only when its page is first opened.
+PAGES = {
+    "Dashboard": ("modules.monitor", "show_dashboard"),
+    "Threat Detection": ("modules.threat_detection", "show_detection"),
+    "Penetration Testing": ("modules.pentest", "show_pentest"),
+    "Isolation Scenarios": ("modules.isolation", "show_scenarios"),
+    "Mitigation Strategies": ("modules.mitigation", "show_strategies"),
+    "Recovery Procedures": ("modules.recovery", "show_procedures"),
+    "Education Center": ("modules.education", "show_content"),
+}
+
+def load_page(name):
+    """Render function of a page; its module is imported on first use and reused from sys.modules"""
+    module_name, function = PAGES[name]
+    return getattr(importlib.import_module(module_name), function)
+
 def main():
     st.title("Security Lifecycle Demonstration Tool")
 
-    menu = st.sidebar.selectbox(
-        "Navigation",
-        ["Dashboard", "Threat Detection", "Penetration Testing", "Isolation Scenarios", 
-         "Mitigation Strategies", "Recovery Procedures", "Education Center"]
-    )
-
-    if menu == "Dashboard":
-        monitor.show_dashboard()
-    elif menu == "Threat Detection":
-        threat_detection.show_detection()
-    elif menu == "Penetration Testing":
-        pentest.show_pentest()
-    elif menu == "Isolation Scenarios":
-        isolation.show_scenarios()
-    elif menu == "Mitigation Strategies":
-        mitigation.show_strategies()
-    elif menu == "Recovery Procedures":
-        recovery.show_procedures()
-    elif menu == "Education Center":
-        education.show_content()
+    menu = st.sidebar.selectbox("Navigation", list(PAGES))
+    load_page(menu)()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,118 @@
+"""Compare two stored hot-path benchmark runs and flag regressions
+
+Runs are result files or git refs whose results are in .cache/benchmarks/.
+NEW defaults to the latest stored run. Exits with status 1 on regressions.
+
+    python benchmarks/compare.py HEAD~3
+    python benchmarks/compare.py HEAD~3 HEAD --threshold 0.2
+    python benchmarks/compare.py base.json new.json --json report.json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+from hot_paths import RESULTS_DIR, ROOT, format_seconds
+
+# Slower than this fraction on the best of the repeats counts as a regression
+THRESHOLD = 0.10
+
+
+def resolve(spec):
+    """Path of a result file, or of the stored run for a git ref (preferring a clean, full run)"""
+    if os.path.isfile(spec):
+        return spec
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--verify', spec + '^{commit}'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except subprocess.CalledProcessError:
+        raise SystemExit(f"{spec} is neither a result file nor a git ref")
+    for suffix in ('', '-quick', '-dirty', '-dirty-quick'):
+        path = os.path.join(RESULTS_DIR, commit[:12] + suffix + '.json')
+        if os.path.isfile(path):
+            return path
+    raise SystemExit(f"No stored results for {spec} ({commit[:12]}); run: python benchmarks/hot_paths.py --ref {spec}")
+
+
+def latest():
+    paths = glob.glob(os.path.join(RESULTS_DIR, '*.json'))
+    if not paths:
+        raise SystemExit("No stored results; run: python benchmarks/hot_paths.py")
+    return max(paths, key=os.path.getmtime)
+
+
+def compare(base, new, threshold=THRESHOLD):
+    """Per-benchmark status of ``new`` against ``base``, comparing the fastest repeat of each"""
+    rows = []
+    for name in list(base['benchmarks']) + [name for name in new['benchmarks'] if name not in base['benchmarks']]:
+        before, after = base['benchmarks'].get(name), new['benchmarks'].get(name)
+        row = {'name': name, 'base_s': None, 'new_s': None, 'change': None}
+        if before is None:
+            row['status'] = 'new'
+        elif after is None:
+            row['status'] = 'removed'
+        elif 'min_s' not in before or 'min_s' not in after:
+            row['status'] = 'skipped'
+            row['reason'] = after.get('missing') or after.get('error') or before.get('missing') or before.get('error')
+        else:
+            row.update(base_s=before['min_s'], new_s=after['min_s'], change=after['min_s'] / before['min_s'] - 1)
+            row['status'] = ('regression' if row['change'] > threshold
+                             else 'improvement' if row['change'] < -threshold else 'unchanged')
+        for key, entry in (('base_s', before), ('new_s', after)):
+            if row[key] is None and entry and 'min_s' in entry:
+                row[key] = entry['min_s']
+        rows.append(row)
+    return rows
+
+
+def describe(run):
+    return (f"{run['ref']} {run['commit'][:12]}{' (dirty)' if run['dirty'] else ''}"
+            f"{' (quick)' if run['quick'] else ''}, {run['created']}")
+
+
+def print_report(base, new, rows, threshold):
+    print(f"base: {describe(base)}")
+    print(f"new:  {describe(new)}")
+    if (base['quick'], base['machine'], base['cpus']) != (new['quick'], new['machine'], new['cpus']):
+        print("warning: runs differ in input size or machine, timings are not directly comparable")
+    print(f"\n{'benchmark':<46} {'base':>10} {'new':>10} {'change':>8}  status")
+    for row in rows:
+        base_s = format_seconds(row['base_s']) if row['base_s'] is not None else '-'
+        new_s = format_seconds(row['new_s']) if row['new_s'] is not None else '-'
+        change = f"{row['change']:+.1%}" if row['change'] is not None else ''
+        status = row['status'] + (f" ({row['reason']})" if row.get('reason') else '')
+        print(f"{row['name']:<46} {base_s:>10} {new_s:>10} {change:>8}  {status}")
+    counts = {}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+    print(f"\n{', '.join(f'{count} {status}' for status, count in sorted(counts.items()))} "
+          f"(threshold {threshold:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base', help="result file or git ref to compare against")
+    parser.add_argument('new', nargs='?', help="result file or git ref (default: latest stored run)")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f"fractional slowdown counted as a regression (default {THRESHOLD})")
+    parser.add_argument('--json', help="also write the comparison to this file")
+    args = parser.parse_args()
+
+    base_path, new_path = resolve(args.base), resolve(args.new) if args.new else latest()
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold)
+    print_report(base, new, rows, args.threshold)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'base': base_path, 'new': new_path, 'threshold': args.threshold, 'benchmarks': rows}, f,
+                      indent=2)
+    return 1 if any(row['status'] == 'regression' for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""Benchmarks of the project's hot paths, stored per commit to track regressions
+
+Every group runs in a fresh interpreter inside a scratch directory, on fixed
+synthetic data, with local stand-ins for the NVD and Exploit-DB APIs.
+
+    python benchmarks/hot_paths.py                      # all groups, saved as .cache/benchmarks/<commit>.json
+    python benchmarks/hot_paths.py --groups logs,graph --quick
+    python benchmarks/hot_paths.py --ref HEAD~3         # this suite against the code of another commit
+    python benchmarks/compare.py HEAD~3                 # regressions since HEAD~3, against the latest run
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, '.cache', 'benchmarks')
+# Children print their results on a line starting with this, after whatever the code under test prints
+MARKER = '@@benchmark-results@@ '
+
+GROUPS = ('nvd', 'attack_sim', 'logs', 'pentest', 'detection', 'graph', 'train')
+
+
+def measure(func, repeat=5, number=1, warmup=1):
+    """Seconds per call of ``func`` over ``repeat`` timings of ``number`` calls each"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - started) / number)
+    return {'median_s': statistics.median(times), 'min_s': min(times), 'max_s': max(times), 'repeat': repeat,
+            'number': number}
+
+
+class Recorder:
+    """Collects benchmark entries; a benchmark whose code is missing or broken is recorded, not fatal"""
+
+    def __init__(self):
+        self.results = {}
+
+    def bench(self, name, func, items=None, repeat=5, number=1, warmup=1, **extra):
+        try:
+            entry = measure(func, repeat, number, warmup)
+        except ImportError as exc:
+            entry = {'missing': str(exc)}
+        except Exception as exc:
+            entry = {'error': f'{type(exc).__name__}: {exc}'}
+        else:
+            items = items() if callable(items) else items
+            if items:
+                entry.update(items=items, items_per_s=items / entry['median_s'])
+            entry.update(extra)
+        self.results[name] = entry
+        return entry
+
+
+def _load(root, *path):
+    """Import a script that is not on the package path, such as the files under IDSfiles.py/"""
+    name = os.path.splitext(path[-1])[0].lower()
+    spec = importlib.util.spec_from_file_location(name, os.path.join(root, *path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_nvd(recorder, root, quick):
+    """CVE download and parsing, CVSS extraction and trend analysis over a synthetic NVD corpus"""
+    from types import SimpleNamespace
+    import requests
+    from stand_ins import NVD_PAGE_SIZE, StandInServer, synthetic_cves
+
+    count = 2000 if quick else 20000
+    with StandInServer(cves=synthetic_cves(count)) as server:
+        def fetch():
+            # Page through the API like nvdlib and build the same attribute-access CVE objects
+            cves, start = [], 0
+            while True:
+                page = requests.get(server.nvd_url, params={'startIndex': start, 'resultsPerPage': NVD_PAGE_SIZE},
+                                    timeout=60).json(object_hook=lambda fields: SimpleNamespace(**fields))
+                cves += [vulnerability.cve for vulnerability in page.vulnerabilities]
+                start += page.resultsPerPage
+                if start >= page.totalResults or not page.resultsPerPage:
+                    return cves
+
+        recorder.bench('nvd.fetch', fetch, items=count, repeat=3)
+        cves = fetch()
+
+    from utils import nvd_helper
+    recorder.bench('nvd.extract_cvss_data', lambda: [nvd_helper.extract_cvss_data(cve) for cve in cves], items=count)
+    if not hasattr(nvd_helper, 'format_cves'):
+        # Commits before the trend analysis took prefetched CVEs could only measure it against the live NVD
+        raise ImportError("nvd_helper has no format_cves")
+    recorder.bench('nvd.format_cves', lambda: nvd_helper.format_cves(cves), items=count)
+    rows = nvd_helper.format_cves(cves)
+    recorder.bench('nvd.analyze_vulnerability_trends', lambda: nvd_helper.analyze_vulnerability_trends(cves=rows),
+                   items=count)
+
+
+def _attack_log(root, count):
+    attack_sim = _load(root, 'IDSfiles.py', 'AttackSim.py')
+    random.seed(0)
+    return attack_sim, attack_sim.generate_attack_data(count)
+
+
+def bench_attack_sim(recorder, root, quick):
+    """Synthetic attack log generation"""
+    count = 10000 if quick else 100000
+    attack_sim, _ = _attack_log(root, 10)
+    random.seed(0)
+    recorder.bench('attack_sim.generate_attack_data', lambda: attack_sim.generate_attack_data(count), items=count,
+                   repeat=3)
+
+
+def bench_logs(recorder, root, quick):
+    """Parsing attack logs into columnar batches"""
+    from utils import log_parser
+
+    count = 20000 if quick else 200000
+    _, lines = _attack_log(root, count)
+    data = '\n'.join(lines).encode('utf-8')
+    recorder.bench('logs.parse_bytes', lambda: log_parser.parse_bytes(data), items=count, bytes=len(data))
+
+
+def bench_pentest(recorder, root, quick):
+    """Exploit download, indexing and ranking, and complete pentest runs against the stand-in lab"""
+    from stand_ins import StandInServer, synthetic_cves, synthetic_exploits
+    from utils import exploit_db
+
+    count = 10000 if quick else 100000
+    cves = synthetic_cves(2000)
+    exploits = synthetic_exploits(count, cves=[cve['id'] for cve in cves])
+    scores = {cve['id']: next(iter(cve['metrics'].values()))[0]['cvssData']['baseScore']
+              for cve in cves if cve['metrics']}
+    categories = ['SQL Injection', 'Remote Code Execution', 'Buffer Overflow', 'Cross-Site Scripting',
+                  'Authentication Bypass']
+    if not hasattr(exploit_db, 'API_URL'):
+        raise ImportError("exploit_db has no API_URL to point at the stand-in")
+    with StandInServer(exploits=exploits) as server:
+        exploit_db.API_URL = server.exploit_db_url
+        recorder.bench('pentest.fetch_exploits', lambda: exploit_db.get_recent_exploits(with_codes=True), items=count,
+                       repeat=3)
+        rows = exploit_db.get_recent_exploits(with_codes=True)
+
+        from utils.exploit_rank import ExploitRanker
+        recorder.bench('pentest.index_exploits', lambda: ExploitRanker(rows, scores), items=count, repeat=3)
+        ranker = ExploitRanker(rows, scores)
+        recorder.bench('pentest.rank_exploits', lambda: ranker.rank('Web Application', categories[:2]), items=count,
+                       repeat=20)
+
+        from modules import pentest
+        from utils.pentest_lab import PentestLab
+        # Related exploits come from the stand-in index, never from the live NVD
+        pentest.get_exploit_ranker = lambda: ranker
+        with PentestLab(tempfile.mkdtemp(dir='.')) as lab:
+            targets = [lab.http_url, lab.database_url]
+            for depth in ((1, 3) if quick else (1, 3, 5)):
+                stats = {}
+                # Safe mode, so no disruptive check knocks the lab over between repeats
+                recorder.bench(f'pentest.run_pentest[depth={depth}]',
+                               lambda: stats.update(pentest.run_pentest('Web Application', categories, depth, True,
+                                                                        targets)['stats']),
+                               items=lambda: stats['done'])
+                entry = recorder.results[f'pentest.run_pentest[depth={depth}]']
+                if 'median_s' in entry:
+                    entry['requests'] = stats['requests']
+
+
+def bench_detection(recorder, root, quick):
+    """AIDetectionModel predictions, one event at a time and in batches, stock and compiled"""
+    import numpy as np
+    from sklearn.datasets import make_classification
+
+    prevention_ai = _load(root, 'IDSfiles.py', 'preventionAI.py')
+    X, y = make_classification(n_samples=4000, n_features=20, n_informative=8, random_state=0)
+    batch = np.random.default_rng(0).normal(size=(1000 if quick else 10000, X.shape[1]))
+    event = {f'f{i}': value for i, value in enumerate(X[0])}
+    detector = prevention_ai.AIDetectionModel()
+    detector.train(X, y)
+    for variant in ('stock', 'compiled'):
+        if variant == 'compiled':
+            try:
+                detector.compile()
+            except AttributeError as exc:
+                recorder.results['detection.predict[compiled,single]'] = {'missing': str(exc)}
+                break
+        recorder.bench(f'detection.predict[{variant},single]', lambda: detector.predict(event), items=1, number=100)
+        recorder.bench(f'detection.predict[{variant},batch]', lambda: detector.predict(batch), items=len(batch))
+
+
+def bench_graph(recorder, root, quick):
+    """Network graph figures from a cold layout cache and from a warm one, at increasing sizes"""
+    import numpy as np
+    from utils import simulation
+    from utils.graph_layout import LayoutCache
+
+    for n in ((10, 100, 1000) if quick else (10, 100, 1000, 10000)):
+        rng = np.random.default_rng(n)
+        nodes = [f'host-{i}' for i in range(n)]
+        # Sparse random topology, about three links per host
+        links = rng.integers(0, n, size=(3 * n, 2))
+        results = {'nodes': nodes, 'edges': [(nodes[a], nodes[b]) for a, b in links.tolist()],
+                   'isolated_segments': nodes[::10]}
+        recorder.bench(f'graph.create_network_graph[cold,n={n}]',
+                       lambda: simulation.create_network_graph(results, cache=LayoutCache()), items=n, repeat=3)
+        warm = LayoutCache()
+        recorder.bench(f'graph.create_network_graph[warm,n={n}]',
+                       lambda: simulation.create_network_graph(results, cache=warm), items=n)
+
+
+def bench_train(recorder, root, quick):
+    """train.py model search on a fixed dataset: exhaustive grid and budgeted halving"""
+    import numpy as np
+    import pandas as pd
+    from sklearn.base import clone
+    from sklearn.model_selection import ParameterGrid
+
+    # train.py fits a model on this file when imported; a small fixed one keeps that quick
+    rng = np.random.default_rng(0)
+    traffic = pd.DataFrame(rng.normal(size=(600, 6)), columns=[f'feature_{i}' for i in range(6)])
+    traffic['label'] = (traffic['feature_0'] + traffic['feature_1'] > 0).astype(int)
+    traffic.to_csv('network_traffic_data.csv', index=False)
+    train = _load(root, 'train.py')
+
+    X_train, _, y_train, _ = train.MachineLearningAI().generate_dataset(n_samples=300 if quick else 1000)
+    classifier, grid = train.classifier_params['Decision Tree']
+    candidates = len(ParameterGrid(grid))
+
+    def search(settings):
+        train.MachineLearningAI(clone(classifier), grid, search=settings).generate_and_train_classifier(X_train, y_train)
+
+    repeat = 1 if quick else 3
+    recorder.bench('train.grid_search[decision_tree]', lambda: search(None), items=candidates, repeat=repeat,
+                   warmup=0)
+    recorder.bench('train.budgeted_search[decision_tree,halving]',
+                   lambda: search({'strategy': 'halving', 'verbose': False}), items=candidates, repeat=repeat,
+                   warmup=0)
+
+
+def run_child(group, root, quick):
+    recorder = Recorder()
+    try:
+        globals()[f'bench_{group}'](recorder, root, quick)
+        missing = None
+    except ImportError as exc:
+        # Dependencies not installed here, or code the measured commit does not have yet
+        missing = str(exc)
+    print(MARKER + json.dumps({'results': recorder.results, 'missing': missing}))
+
+
+def _git(root, *args):
+    return subprocess.run(['git', *args], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def run_group(group, root, quick):
+    scratch = tempfile.mkdtemp(prefix=f'bench-{group}-')
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''),
+               TF_CPP_MIN_LOG_LEVEL='3')
+    command = [sys.executable, os.path.abspath(__file__), '--child', group, '--root', root]
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(command + (['--quick'] if quick else []), cwd=scratch, env=env,
+                                capture_output=True, text=True)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    lines = [line for line in result.stdout.splitlines() if line.startswith(MARKER)]
+    if not lines:
+        tail = (result.stderr or result.stdout).strip().splitlines()[-1:] or ['no output']
+        return {'results': {}, 'missing': None, 'error': f'exit {result.returncode}: {tail[0]}',
+                'seconds': time.perf_counter() - started}
+    report = json.loads(lines[-1][len(MARKER):])
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def run_suite(groups, ref=None, quick=False):
+    """Run the groups against the working tree, or against commit ``ref`` checked out in a temporary worktree"""
+    root, worktree = ROOT, None
+    if ref is not None:
+        worktree = tempfile.mkdtemp(prefix='bench-worktree-')
+        _git(ROOT, 'worktree', 'add', '--detach', worktree, ref)
+        root = worktree
+    try:
+        commit = _git(root, 'rev-parse', 'HEAD')
+        dirty = bool(_git(root, 'status', '--porcelain', '--untracked-files=no'))
+        run = {'commit': commit, 'ref': ref or 'working tree', 'dirty': dirty, 'quick': quick,
+               'created': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+               'machine': f'{platform.system()} {platform.machine()}', 'cpus': os.cpu_count(),
+               'groups': {}, 'benchmarks': {}}
+        for group in groups:
+            print(f'running {group}...', flush=True)
+            report = run_group(group, root, quick)
+            run['groups'][group] = {key: report.get(key) for key in ('seconds', 'missing', 'error')}
+            run['benchmarks'].update(report['results'])
+    finally:
+        if worktree is not None:
+            _git(ROOT, 'worktree', 'remove', '--force', worktree)
+    return run
+
+
+def result_path(commit, dirty=False, quick=False):
+    return os.path.join(RESULTS_DIR, commit[:12] + ('-dirty' if dirty else '') + ('-quick' if quick else '') + '.json')
+
+
+def print_run(run):
+    print(f"\n{run['ref']} ({run['commit'][:12]}{', uncommitted changes' if run['dirty'] else ''})")
+    print(f"{'benchmark':<46} {'median':>10} {'min':>10} {'items/s':>12}")
+    for name, entry in run['benchmarks'].items():
+        if 'median_s' not in entry:
+            print(f"{name:<46} {entry.get('missing') or entry.get('error')}")
+            continue
+        rate = f"{entry['items_per_s']:>12,.0f}" if 'items_per_s' in entry else f"{'':>12}"
+        print(f"{name:<46} {format_seconds(entry['median_s']):>10} {format_seconds(entry['min_s']):>10} {rate}")
+    for group, info in run['groups'].items():
+        if info['missing'] or info['error']:
+            print(f"  {group} incomplete: {info['missing'] or info['error']}")
+
+
+def format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+    return f'{seconds / 1e-9:.0f} ns'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', default=','.join(GROUPS), help=f"comma-separated subset of {', '.join(GROUPS)}")
+    parser.add_argument('--quick', action='store_true', help="smaller inputs and fewer repeats")
+    parser.add_argument('--ref', help="measure this commit instead of the working tree")
+    parser.add_argument('--json', help="write the results here instead of .cache/benchmarks/<commit>.json")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--root', default=ROOT, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args.child, args.root, args.quick)
+    groups = [group.strip() for group in args.groups.split(',') if group.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+
+    run = run_suite(groups, args.ref, args.quick)
+    print_run(run)
+    path = args.json or result_path(run['commit'], run['dirty'], run['quick'])
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults written to {os.path.relpath(path)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Local stand-ins for the NVD and Exploit-DB APIs, serving fixed synthetic corpora
+
+Benchmarks talk to these instead of the real services, so results do not
+depend on the network, rate limits or what was published this week.
+"""
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+NVD_PATH = '/rest/json/cves/2.0'
+EXPLOIT_DB_PATH = '/api/exploits'
+# The NVD API's page size limit
+NVD_PAGE_SIZE = 2000
+
+PRODUCTS = ['WordPress plugin', 'Apache HTTP Server', 'nginx', 'OpenSSL', 'Linux kernel', 'Windows SMB', 'MySQL',
+            'PostgreSQL', 'Cisco IOS', 'Joomla', 'Jenkins', 'Exchange Server', 'Confluence', 'OpenSSH', 'Redis']
+FLAWS = ['SQL injection', 'remote code execution', 'buffer overflow', 'cross-site scripting', 'authentication bypass',
+         'privilege escalation', 'denial of service', 'path traversal', 'use-after-free', 'information disclosure']
+ATTACK_VECTORS = ['NETWORK', 'ADJACENT_NETWORK', 'LOCAL', 'PHYSICAL']
+EXPLOIT_TYPES = ['webapps', 'remote', 'local', 'dos']
+PLATFORMS = ['php', 'windows', 'linux', 'multiple', 'hardware', 'asp', 'jsp', 'macos']
+
+
+def _severity(score):
+    return 'CRITICAL' if score >= 9.0 else 'HIGH' if score >= 7.0 else 'MEDIUM' if score >= 4.0 else 'LOW'
+
+
+def synthetic_cves(count, seed=0, end=datetime(2025, 3, 20), days=90):
+    """NVD API 2.0 ``cve`` records with a mix of CVSS v3.1, v3.0, v2 and missing metrics"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        published = end - timedelta(seconds=rng.randrange(days * 86400))
+        score = round(rng.uniform(1.0, 10.0), 1)
+        vector = rng.choice(ATTACK_VECTORS)
+        version = rng.choices(['3.1', '3.0', '2.0', None], weights=[70, 10, 15, 5])[0]
+        metrics = {}
+        if version == '2.0':
+            metrics['cvssMetricV2'] = [{'source': 'nvd@nist.gov', 'type': 'Primary', 'cvssData': {
+                'version': '2.0', 'vectorString': f'AV:{vector[0]}/AC:L/Au:N/C:P/I:P/A:P', 'accessVector': vector,
+                'baseScore': score}}]
+        elif version is not None:
+            metrics[f"cvssMetricV{version.replace('.', '')}"] = [{'source': 'nvd@nist.gov', 'type': 'Primary', 'cvssData': {
+                'version': version, 'vectorString': f'CVSS:{version}/AV:{vector[0]}/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H',
+                'attackVector': vector, 'baseScore': score, 'baseSeverity': _severity(score)}}]
+        records.append({
+            'id': f'CVE-{published.year}-{10000 + i}',
+            'sourceIdentifier': 'cve@mitre.org',
+            'published': published.strftime('%Y-%m-%dT%H:%M:%S.000'),
+            'lastModified': published.strftime('%Y-%m-%dT%H:%M:%S.000'),
+            'vulnStatus': 'Analyzed',
+            'descriptions': [{'lang': 'en', 'value': f'{rng.choice(FLAWS).capitalize()} in {rng.choice(PRODUCTS)} '
+                                                     f'{rng.randint(1, 9)}.{rng.randint(0, 20)} allows attackers to '
+                                                     f'compromise the host.'}],
+            'metrics': metrics,
+            'references': [{'url': f'https://example.com/advisories/{i}'}],
+        })
+    return records
+
+
+def synthetic_exploits(count, seed=0, end=datetime(2025, 3, 20), days=3650, cves=None):
+    """Exploit-DB entries; about half reference one of ``cves`` ids in their codes"""
+    rng = random.Random(seed)
+    exploits = []
+    for i in range(count):
+        codes = rng.choice(cves) if cves and rng.random() < 0.5 else ''
+        exploits.append({
+            'id': 50000 + i,
+            'title': f'{rng.choice(PRODUCTS)} {rng.randint(1, 9)}.{rng.randint(0, 20)} - '
+                     f'{rng.choice(["Unauthenticated ", "Authenticated ", "Blind ", "Stored ", ""])}'
+                     f'{rng.choice(FLAWS).title()}',
+            'type': rng.choice(EXPLOIT_TYPES),
+            'platform': rng.choice(PLATFORMS),
+            'date': (end - timedelta(days=rng.randrange(days))).strftime('%Y-%m-%d'),
+            'codes': codes,
+        })
+    return exploits
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if parts.path == NVD_PATH:
+            start = int(params.get('startIndex', 0))
+            size = min(int(params.get('resultsPerPage', NVD_PAGE_SIZE)), NVD_PAGE_SIZE)
+            records = self.server.cves[start:start + size]
+            body = {'resultsPerPage': len(records), 'startIndex': start, 'totalResults': len(self.server.cves),
+                    'format': 'NVD_CVE', 'version': '2.0', 'vulnerabilities': [{'cve': r} for r in records]}
+        elif parts.path == EXPLOIT_DB_PATH:
+            body = {'exploits': self.server.exploits}
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StandInServer:
+    """NVD and Exploit-DB stand-ins on one localhost port, serving the given corpora"""
+
+    def __init__(self, cves=(), exploits=()):
+        self.cves = list(cves)
+        self.exploits = list(exploits)
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def nvd_url(self):
+        return self.url + NVD_PATH
+
+    @property
+    def exploit_db_url(self):
+        return self.url + EXPLOIT_DB_PATH
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.cves = self.cves
+        self._server.exploits = self.exploits
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        return False
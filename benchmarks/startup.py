@@ -0,0 +1,120 @@
+"""Cold-start cost of the Streamlit app: import-time profile and startup benchmark
+
+Every measurement runs in a fresh interpreter, like a new server worker.
+
+    python benchmarks/startup.py                 # lazy vs eager startup, 5 runs each
+    python benchmarks/startup.py --profile       # slowest imports when opening a page
+    python benchmarks/startup.py --page "Dashboard" --runs 10 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Child process: time importing the app and loading the pages, report peak RSS
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+pages = list(app.PAGES) if {eager} else [{page!r}]
+missing = []
+for name in pages:
+    try:
+        app.load_page(name)
+    except ImportError as exc:
+        # Pages whose optional dependencies are not installed are reported, not fatal
+        missing.append(f'{{name}}: {{exc}}')
+elapsed = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'seconds': elapsed, 'peak_rss_mb': peak / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+                   'modules': len(sys.modules), 'missing': missing}}))
+"""
+
+
+def _run_child(code, extra_args=()):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return subprocess.run([sys.executable, *extra_args, '-c', code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def measure_startup(page, eager, runs):
+    samples = []
+    for _ in range(runs):
+        result = _run_child(CHILD.format(eager=eager, page=page))
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    seconds = [s['seconds'] for s in samples]
+    return {
+        'mode': 'eager' if eager else 'lazy',
+        'page': 'all pages' if eager else page,
+        'runs': runs,
+        'median_seconds': statistics.median(seconds),
+        'min_seconds': min(seconds),
+        'peak_rss_mb': statistics.median(s['peak_rss_mb'] for s in samples),
+        'modules': samples[-1]['modules'],
+        'missing': samples[-1]['missing'],
+    }
+
+
+def import_profile(page, top=20):
+    """Top-level packages by cumulative import time (python -X importtime) when opening ``page``"""
+    result = _run_child(CHILD.format(eager=False, page=page), ('-X', 'importtime'))
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.rstrip()
+        # Nesting is shown as two extra spaces of indentation per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip().split('.')[0], int(self_us), int(cumulative_us)))
+
+    packages = {}
+    ancestors = []
+    # Children are printed before their parent; reversed, every entry follows its parent
+    for depth, package, self_us, cumulative_us in reversed(entries):
+        del ancestors[depth:]
+        entry = packages.setdefault(package, {'package': package, 'self_ms': 0.0, 'cumulative_ms': 0.0})
+        entry['self_ms'] += self_us / 1000
+        # Count the cumulative time only where the package is entered, so nested imports are not counted twice
+        if package not in ancestors:
+            entry['cumulative_ms'] += cumulative_us / 1000
+        ancestors.append(package)
+    ranked = sorted(packages.values(), key=lambda e: e['cumulative_ms'], reverse=True)
+    return ranked[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--page', default='Education Center', help="page opened by the lazy run")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--profile', action='store_true', help="print the import-time profile")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {'startup': [measure_startup(args.page, False, args.runs),
+                           measure_startup(args.page, True, args.runs)]}
+    print(f"{'mode':<6} {'page':<22} {'median s':>9} {'min s':>7} {'peak RSS MB':>12} {'modules':>8}")
+    for r in results['startup']:
+        print(f"{r['mode']:<6} {r['page']:<22} {r['median_seconds']:>9.3f} {r['min_seconds']:>7.3f} "
+              f"{r['peak_rss_mb']:>12.1f} {r['modules']:>8}")
+        for missing in r['missing']:
+            print(f"       not loaded: {missing}")
+
+    if args.profile:
+        results['import_profile'] = import_profile(args.page)
+        print(f"\nImport-time profile opening {args.page!r}")
+        print(f"{'package':<28} {'cumulative ms':>14} {'self ms':>9}")
+        for entry in results['import_profile']:
+            print(f"{entry['package']:<28} {entry['cumulative_ms']:>14.1f} {entry['self_ms']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import streamlit as st
 from utils import simulation
 import plotly.graph_objects as go
+import pandas as pd
 
 def show_scenarios():
     st.header("Isolation Scenario Simulations")
@@ -19,23 +20,118 @@ def show_scenarios():
         
         if st.button("Run Simulation"):
             results = simulation.run_network_isolation(segments)
+            blast = results["blast_radius"]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Reachable Host Pairs", f"{blast['after']:,}", f"{-blast['reduction']:,}",
+                          delta_color="inverse")
+            with col2:
+                st.metric("Blast Radius Reduction", f"{blast['reduction_pct']}%")
+            with col3:
+                st.metric("Security Impact", results["security_impact"].title())
             st.plotly_chart(
                 simulation.create_network_graph(results),
                 use_container_width=True
             )
-    
+            st.caption("Segment reachability after isolation (row reaches column)")
+            st.dataframe(pd.DataFrame(results["connectivity_matrix"]).T)
+
+        st.subheader("Attack Propagation")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            entry = st.selectbox("Entry segment", simulation.DEMO_TOPOLOGY["segments"], index=0)
+        with col2:
+            target = st.selectbox("Target segment", simulation.DEMO_TOPOLOGY["segments"], index=2)
+        with col3:
+            trials = st.select_slider("Trials", [100, 500, 1000, 5000], value=1000)
+
+        if st.button("Simulate Attack Spread"):
+            results = simulation.run_attack_propagation(segments, entry, target, trials)
+            table = pd.DataFrame(results["strategies"]).T
+            table.columns = [column.replace("_", " ").title() for column in table.columns]
+            st.dataframe(table)
+            steps = list(range(results["steps"] + 1))
+            fig = go.Figure()
+            for name, curve in results["curves"].items():
+                fig.add_trace(go.Scatter(x=steps, y=curve[:, 1], mode='lines', name=f"{name} (median)"))
+                fig.add_trace(go.Scatter(x=steps + steps[::-1], y=list(curve[:, 2]) + list(curve[::-1, 0]),
+                                         fill='toself', opacity=0.2, line=dict(width=0),
+                                         name=f"{name} (10th-90th pct)"))
+            fig.update_layout(title=f"Compromised hosts over {results['trials']:,} trials",
+                              xaxis_title="Time step", yaxis_title="Hosts compromised")
+            st.plotly_chart(fig, use_container_width=True)
+
     elif scenario == "Container Isolation":
         st.subheader("Container Isolation Simulation")
-        container_count = st.slider("Number of Containers", 1, 10, 3)
-        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            container_count = st.select_slider("Number of Containers", [100, 500, 1000, 2000, 5000, 10000], value=1000)
+        with col2:
+            minutes = st.slider("Simulated Minutes", 5, 60, 60, step=5)
+        with col3:
+            action = st.selectbox("Response to a Detected Compromise", ["network", "freeze", "stop", "none"])
+        attacks = st.slider("Attacks per Hour", 0, 60, 6)
+
         if st.button("Simulate Container Isolation"):
-            results = simulation.run_container_isolation(container_count)
-            st.json(results)
-    
+            with st.spinner("Running simulation..."):
+                results = simulation.run_container_isolation(container_count, minutes,
+                                                             None if action == "none" else action, attacks)
+            show_cluster_results(results)
+
     elif scenario == "Process Isolation":
         st.subheader("Process Isolation Simulation")
-        process_name = st.text_input("Enter Process Name")
-        
+        col1, col2 = st.columns(2)
+        with col1:
+            process_name = st.text_input("Enter Process Name", "fluent-bit")
+        with col2:
+            action = st.selectbox("Action", ["kill", "freeze"])
+        unfreeze = None
+        if action == "freeze":
+            unfreeze = st.select_slider("Unfreeze at Minute", options=[15, 20, 25, "never"], value=20)
+        st.caption("Every container runs app-server (2 workers), envoy (proxy) and fluent-bit (log agent). "
+                   "Processes are isolated cluster-wide at minute 10. Killed processes lose their queued "
+                   "requests and are restarted by the container; frozen ones keep them and stay suspended "
+                   "until unfrozen.")
+
         if st.button("Simulate Process Isolation"):
-            results = simulation.run_process_isolation(process_name)
-            st.code(results)
+            results = simulation.run_process_isolation(process_name, action,
+                                                       unfreeze_minute=None if unfreeze == "never" else unfreeze)
+            process = results["process"]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Processes Isolated", f"{process['matched']:,}")
+            with col2:
+                st.metric("Containers Affected", f"{process['containers_affected']:,}")
+            with col3:
+                before, after = process["throughput_before_rps"], process["throughput_after_rps"] or 0.0
+                st.metric("Throughput After", f"{after:,.0f} req/s", f"{after - before:,.0f} req/s")
+            show_cluster_results(results)
+
+def show_cluster_results(results):
+    """Summary metrics and per-minute timeline of a cluster simulation"""
+    isolation = results["isolation"]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Availability", f"{results['availability_pct']}%")
+    with col2:
+        p95 = results["latency_ms"]["p95"]
+        st.metric("p95 Latency", "-" if p95 is None else f"{p95} ms")
+    with col3:
+        st.metric("Compromised / Isolated", f"{isolation['compromises']} / {isolation['isolations']}")
+    with col4:
+        dwell = isolation["mean_dwell_seconds"]
+        st.metric("Mean Dwell Time", "-" if dwell is None else f"{dwell:.0f} s")
+
+    timeline = pd.DataFrame(results["timeline"])
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=timeline["minute"], y=timeline["throughput"], name="Throughput (req/s)"))
+    fig.add_trace(go.Scatter(x=timeline["minute"], y=timeline["dropped"] / timeline["seconds"], name="Dropped (req/s)"))
+    fig.add_trace(go.Scatter(x=timeline["minute"], y=timeline["isolated"], name="Isolated containers",
+                             yaxis="y2", line=dict(dash="dot")))
+    fig.update_layout(xaxis_title="Simulated minute", yaxis_title="Requests per second",
+                      yaxis2=dict(title="Containers", overlaying="y", side="right"))
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{results['containers']:,} containers, {results['processes']:,} processes, "
+               f"{results['events']:,} events simulated in {results['wall_seconds']} s")
+    with st.expander("Details"):
+        st.json({key: value for key, value in results.items() if key != "timeline"})
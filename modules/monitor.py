@@ -1,37 +1,198 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-
-def create_metric_chart():
-    # Create sample monitoring data
-    dates = pd.date_range(start=datetime.now() - timedelta(hours=24), 
-                         end=datetime.now(), freq='H')
-    cpu_usage = np.random.uniform(20, 80, len(dates))
-    memory_usage = np.random.uniform(30, 90, len(dates))
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=dates, y=cpu_usage, name="CPU Usage"))
-    fig.add_trace(go.Scatter(x=dates, y=memory_usage, name="Memory Usage"))
-    fig.update_layout(title="System Resource Usage", xaxis_title="Time", yaxis_title="Usage %")
-    return fig
+import time
+from datetime import datetime
+from utils.rate_anomaly import LogRateMonitor
+from utils.host_metrics import FIELDS, HostMetricsSampler, LiveSeries
+from utils.timeseries import TimeSeriesStore
+
+# Points per chart trace, whatever the time range
+CHART_POINTS = 1000
+
+# Embedded time-series store shared by the Dashboard and Recovery pages
+METRICS_STORE_DIR = '.cache/metrics'
+
+# Dashboard chart ranges in hours
+CHART_RANGES = {"Last hour": 1, "Last 24 hours": 24, "Last 7 days": 24 * 7, "Last 30 days": 24 * 30}
+
+# Seconds between live refreshes of the dashboard panels
+LIVE_INTERVAL = 2
+ANOMALY_INTERVAL = 10
+
+RESOURCE_TRACES = (('cpu_percent', "CPU Usage", 1), ('memory_percent', "Memory Usage", 1))
+IO_TRACES = (('net_rx_bytes', "Network In", 1 / 1024), ('net_tx_bytes', "Network Out", 1 / 1024),
+             ('disk_read_bytes', "Disk Read", 1 / 1024), ('disk_write_bytes', "Disk Write", 1 / 1024))
+
+# Event log whose rates are watched for anomalies; written by IDSfiles.py/AttackSim.py
+EVENT_LOG = 'synthetic_attack_data.log'
+
+@st.cache_resource
+def get_metric_store():
+    return TimeSeriesStore(METRICS_STORE_DIR)
+
+@st.cache_resource
+def get_rate_monitor():
+    # One detector per server process, fed incrementally as the log grows
+    return LogRateMonitor(EVENT_LOG, store=get_metric_store(), capacity=50000)
+
+@st.cache_resource
+def get_host_sampler():
+    # One sampler thread per server process, shared by every viewer
+    if not HostMetricsSampler.available():
+        return None
+    return HostMetricsSampler(store=get_metric_store()).start()
+
+def host_series(sampler, field, hours, max_points=CHART_POINTS):
+    # The in-memory buffer serves recent ranges; longer ones come from the store's rollups
+    if hours * 3600 <= sampler.retention:
+        return sampler.series(field, seconds=hours * 3600, max_points=max_points)
+    end = datetime.now().timestamp()
+    result = get_metric_store().query(f'host.{field}', end - hours * 3600, end, max_points=max_points)
+    return result['time'], result['mean']
 
 def show_dashboard():
     st.header("System Monitoring Dashboard")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Active Threats", "2", "-1")
-    with col2:
-        st.metric("System Health", "98%", "+2%")
-    with col3:
-        st.metric("Security Score", "85/100", "+5")
-    
-    st.plotly_chart(create_metric_chart(), use_container_width=True)
+
+    chart_range = st.selectbox("Time Range", list(CHART_RANGES), index=1)
+    show_live_panels(CHART_RANGES[chart_range])
+
+    show_rate_anomalies()
     
     with st.expander("Active Monitoring Metrics"):
         st.write("• Network Traffic Analysis")
         st.write("• System Resource Usage")
         st.write("• Security Event Logs")
         st.write("• User Activity Monitoring")
+
+class UpdateCost:
+    """CPU time and chart payload of one viewer's live refreshes"""
+
+    def __init__(self):
+        self.ticks = 0
+        self.cpu_seconds = 0.0
+        self.measured = 0
+        self.payload_bytes = 0
+        self.last_cpu_ms = 0.0
+        self.last_bytes = 0
+
+    def record(self, cpu_seconds, payload_bytes=None):
+        self.ticks += 1
+        self.cpu_seconds += cpu_seconds
+        self.last_cpu_ms = cpu_seconds * 1000
+        if payload_bytes is not None:
+            self.measured += 1
+            self.payload_bytes += payload_bytes
+            self.last_bytes = payload_bytes
+
+    def summary(self):
+        return {
+            'Refreshes': self.ticks,
+            'CPU per refresh (ms)': round(self.cpu_seconds * 1000 / max(self.ticks, 1), 2),
+            'Last refresh CPU (ms)': round(self.last_cpu_ms, 2),
+            'Chart payload per refresh (KB)': round(self.payload_bytes / 1024 / max(self.measured, 1), 1),
+        }
+
+def live_state(sampler, hours):
+    # Per-viewer chart state, rebuilt only when the range changes
+    state = st.session_state.get('live_dashboard')
+    if state is None or state['hours'] != hours:
+        fields = [field for field, _, _ in RESOURCE_TRACES + IO_TRACES]
+        live = None
+        if sampler is not None and hours * 3600 <= sampler.retention:
+            live = LiveSeries(sampler, fields, hours * 3600, CHART_POINTS)
+        state = {
+            'hours': hours,
+            'series': live,
+            'figures': {},
+            'previous': None,
+            'cost': state['cost'] if state else UpdateCost(),
+        }
+        st.session_state['live_dashboard'] = state
+    return state
+
+def live_figure(state, key, traces, title, yaxis_title, sampler):
+    fig = state['figures'].get(key)
+    if fig is None:
+        fig = go.Figure([go.Scatter(name=name) for _, name, _ in traces])
+        fig.update_layout(title=title, xaxis_title="Time", yaxis_title=yaxis_title, uirevision=key)
+        state['figures'][key] = fig
+    for trace, (field, _, scale) in zip(fig.data, traces):
+        if state['series'] is not None:
+            times, values = state['series'].series(field)
+        else:
+            times, values = host_series(sampler, field, state['hours'])
+        # Plotly takes epoch milliseconds on a date axis, so no per-point datetime objects
+        trace.x = times * 1000
+        trace.y = values * scale
+    fig.update_xaxes(type='date')
+    return fig
+
+def show_metric_cards(sampler, state):
+    # Cards only read in-memory snapshots: the sampler's latest row and the detector's alert list
+    _, latest = sampler.buffer.latest() if sampler is not None else (None, None)
+    previous, state['previous'] = state['previous'], latest
+    alerts = len(get_rate_monitor().detector.alerts)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Rate Alerts", alerts)
+    for column, (field, label, _) in zip((col2, col3), RESOURCE_TRACES):
+        with column:
+            if latest is None:
+                st.metric(label, "n/a")
+                continue
+            index = FIELDS.index(field)
+            delta = None if previous is None else f"{latest[index] - previous[index]:+.1f}%"
+            st.metric(label, f"{latest[index]:.1f}%", delta)
+
+@st.fragment(run_every=LIVE_INTERVAL)
+def show_live_panels(hours):
+    started = time.thread_time()
+    sampler = get_host_sampler()
+    state = live_state(sampler, hours)
+    if state['series'] is not None:
+        # Only the rows sampled since the previous refresh are pulled and appended
+        state['series'].refresh()
+
+    show_metric_cards(sampler, state)
+    if sampler is None:
+        st.info("Host metrics are not available on this platform")
+        figures = []
+    else:
+        figures = [
+            live_figure(state, 'resources', RESOURCE_TRACES, "System Resource Usage", "Usage %", sampler),
+            live_figure(state, 'io', IO_TRACES, "Network and Disk Throughput", "KiB/s", sampler),
+        ]
+    for fig in figures:
+        st.plotly_chart(fig, use_container_width=True)
+
+    cost = state['cost']
+    measure = st.session_state.get('measure_live_cost', False)
+    payload = sum(len(fig.to_json()) for fig in figures) if measure else None
+    cost.record(time.thread_time() - started, payload)
+    with st.expander("Live Update Cost"):
+        st.checkbox("Measure chart payload size", key='measure_live_cost')
+        st.json(cost.summary())
+
+@st.fragment(run_every=ANOMALY_INTERVAL)
+def show_rate_anomalies():
+    st.subheader("Event Rate Anomalies")
+    rate_monitor = get_rate_monitor()
+    rate_monitor.poll()
+    detector = rate_monitor.detector
+    stats = detector.stats()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Events Analysed", f"{stats['events']:,}")
+    with col2:
+        st.metric("Tracked Series", f"{stats['series']:,}")
+    with col3:
+        st.metric("Rate Alerts", stats['alerts'])
+
+    if detector.alerts:
+        alerts = pd.DataFrame(list(detector.alerts)[::-1])
+        st.dataframe(alerts, hide_index=True, use_container_width=True)
+    else:
+        st.info("No attack type or subnet is deviating from its baseline event rate.")
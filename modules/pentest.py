@@ -1,79 +1,185 @@
 import streamlit as st
 import pandas as pd
-from utils import exploit_db
+from utils import exploit_db, pentest_checks, pentest_engine
+from utils.exploit_rank import ExploitRanker
+from utils.pentest_lab import PentestLab
+
+try:
+    from utils import nvd_helper
+except ImportError:  # nvdlib is optional here; exploits are then ranked without CVSS scores
+    nvd_helper = None
+
+# Days of NVD history whose CVSS scores are linked to exploits
+CVE_DAYS = 120
+# Stand-in services a system type is tested against when no targets are given
+LAB_TARGETS = {"Web Application": ("http",), "Database": ("sqlite",)}
+SEVERITY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+FINDING_COLUMNS = ["severity", "category", "check", "target", "point", "title", "evidence"]
+
+@st.cache_resource
+def get_lab():
+    """Local vulnerable stand-in services, started once per server process"""
+    return PentestLab().start()
+
+@st.cache_resource(ttl=3600, show_spinner="Indexing exploits...")
+def _build_exploit_ranker():
+    exploits = exploit_db.get_recent_exploits(with_codes=True)
+    if exploits is None:
+        # Raising keeps a failed fetch out of the cache, so the next run tries again
+        raise ConnectionError("Exploit-DB is unavailable")
+    if not exploits:
+        return None
+    cves = nvd_helper.get_recent_cves(CVE_DAYS) if nvd_helper is not None else None
+    # CVEs NVD has not scored yet keep the ranker's default instead of counting as 0.0
+    return ExploitRanker(exploits, {row[0]: row[2] for row in cves or [] if row[4] != "NONE"})
+
+def get_exploit_ranker():
+    """Relevance index over recent Exploit-DB entries, with CVSS scores of the CVEs they reference"""
+    try:
+        return _build_exploit_ranker()
+    except ConnectionError:
+        return None
+
+def lab_targets(system_type):
+    lab = get_lab()
+    urls = {"http": lab.http_url, "sqlite": lab.database_url}
+    return [urls[kind] for kind in LAB_TARGETS.get(system_type, ("http", "sqlite"))]
 
 def show_pentest():
     st.header("Penetration Testing Suite")
-    
+
     # System Selection
     st.subheader("Target System Configuration")
     system_type = st.selectbox(
         "Select System Type",
         ["Web Application", "Network Service", "Operating System", "Database"]
     )
-    
+    target_source = st.radio("Targets", ["Local stand-in lab", "Custom targets"], horizontal=True)
+    targets = None
+    if target_source == "Custom targets":
+        text = st.text_area("Target URLs (one per line)", placeholder="http://127.0.0.1:8080\nsqlite:////srv/app/app.db")
+        targets = [line.strip() for line in text.splitlines() if line.strip()]
+        st.caption("Only test systems you are authorized to test.")
+
     # Vulnerability Categories
     st.subheader("Vulnerability Categories")
     vuln_categories = st.multiselect(
         "Select Categories to Test",
-        ["SQL Injection", "Remote Code Execution", "Buffer Overflow", 
-         "Cross-Site Scripting", "Authentication Bypass"]
+        pentest_checks.CATEGORIES
     )
-    
+
     # Test Configuration
     with st.expander("Test Configuration"):
-        test_depth = st.slider("Test Depth", 1, 5, 3)
+        test_depth = st.slider("Test Depth", 1, pentest_checks.MAX_DEPTH, 3)
         safe_mode = st.checkbox("Safe Mode (No actual exploitation)", value=True)
-        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            concurrency = st.slider("Concurrent Checks", 1, 64, 32)
+        with col2:
+            per_target = st.slider("Requests per Target", 1, 16, 4)
+        with col3:
+            timeout = st.slider("Request Timeout (s)", 1, 30, 5)
+
     # Run Test Button
     if st.button("Run Penetration Test"):
-        with st.spinner("Running security tests..."):
-            results = run_pentest(system_type, vuln_categories, test_depth, safe_mode)
-            display_results(results)
-
-def run_pentest(system_type, categories, depth, safe_mode):
-    # Get relevant exploits from the database
-    exploits = exploit_db.get_recent_exploits()
-    
-    if not exploits:
+        if not vuln_categories:
+            st.warning("Select at least one category to test")
+            return
+        if target_source == "Custom targets" and not targets:
+            st.warning("Enter at least one target URL")
+            return
+        progress = st.progress(0.0, text="Discovering targets...")
+        live = st.empty()
+        findings = []
+
+        def on_finding(finding):
+            findings.append(finding)
+            live.dataframe(findings_table(findings), use_container_width=True)
+
+        def on_progress(stats):
+            planned = stats["planned"] or 1
+            progress.progress(min((stats["done"] + stats["skipped"]) / planned, 1.0),
+                              text=f"{stats['done']:,} / {stats['planned']:,} checks, "
+                                   f"{stats['checks_per_second']:,.0f} checks/s, {stats['found']} findings")
+
+        results = run_pentest(system_type, vuln_categories, test_depth, safe_mode, targets, concurrency,
+                              per_target, timeout, on_finding, on_progress)
+        progress.empty()
+        live.empty()
+        display_results(results)
+
+def run_pentest(system_type, categories, depth, safe_mode, targets=None, concurrency=32, per_target=4,
+                timeout=5.0, on_finding=None, on_progress=None):
+    """Scan the targets for the selected categories, streaming findings to ``on_finding``"""
+    targets = targets or lab_targets(system_type)
+    scan = pentest_engine.run_scan(targets, categories, depth, safe_mode, concurrency, per_target, timeout,
+                                   on_finding=on_finding, on_progress=on_progress)
+    if scan["target_errors"] and len(scan["target_errors"]) == len(targets):
         return {
             "status": "error",
-            "message": "Could not fetch exploit data",
+            "message": "Could not reach any target: " + "; ".join(f"{url}: {error}" for url, error
+                                                                  in scan["target_errors"].items()),
             "findings": []
         }
-    
-    # Filter exploits based on system type and categories
-    filtered_exploits = [
-        exploit for exploit in exploits
-        if any(cat.lower() in exploit[1].lower() for cat in categories)
-    ]
-    
+
+    # Public exploits most relevant to the system and categories, listed next to the live findings
+    ranker = get_exploit_ranker()
+    exploits, matched = ranker.top(system_type, categories, k=5) if ranker is not None else ([], 0)
+
     return {
         "status": "completed",
         "system_type": system_type,
-        "total_tests": len(filtered_exploits),
-        "findings": filtered_exploits[:5],  # Limit to top 5 most relevant findings
-        "safe_mode": safe_mode
+        "targets": targets,
+        "total_tests": scan["done"],
+        "findings": scan.pop("findings"),
+        "exploits": exploits,
+        "exploits_matched": matched,
+        "safe_mode": safe_mode,
+        "stats": scan
     }
 
+def findings_table(findings):
+    df = pd.DataFrame(findings, columns=FINDING_COLUMNS)
+    df = df.sort_values("severity", key=lambda s: s.map(SEVERITY_ORDER), kind="stable")
+    df.columns = [column.title() for column in FINDING_COLUMNS[:-2]] + ["Finding", "Evidence"]
+    return df.reset_index(drop=True)
+
 def display_results(results):
     if results["status"] == "error":
         st.error(results["message"])
         return
-        
-    st.success(f"Penetration Test Completed - {results['total_tests']} tests performed")
-    
+
+    stats = results["stats"]
+    st.success(f"Penetration Test Completed - {results['total_tests']} tests performed "
+               f"in {stats['elapsed']:.1f} s ({stats['checks_per_second']:,.0f} checks/s)")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Findings", len(results["findings"]))
+    with col2:
+        st.metric("Requests Sent", f"{stats['requests']:,}")
+    with col3:
+        st.metric("Blocked by Safe Mode", f"{stats['blocked']:,}")
+    with col4:
+        st.metric("Timeouts / Errors", f"{stats['timeouts']} / {stats['errors']}")
+    for url, error in stats["target_errors"].items():
+        st.warning(f"{url}: {error}")
+
     # Display findings in a clean table
     if results["findings"]:
-        st.subheader("Potential Vulnerabilities Found")
-        df = pd.DataFrame(results["findings"], 
-                         columns=["ID", "Title", "Type", "Platform", "Date"])
-        st.dataframe(df)
-        
+        st.subheader("Vulnerabilities Found")
+        st.dataframe(findings_table(results["findings"]), use_container_width=True)
+
         # Recommendations
         st.subheader("Recommendations")
-        for finding in results["findings"]:
-            with st.expander(f"Mitigation for {finding[1]}"):
-                st.write("• Update affected components to latest version")
-                st.write("• Apply security patches if available")
-                st.write("• Review and harden security configurations")
+        for category in dict.fromkeys(finding["category"] for finding in results["findings"]):
+            with st.expander(f"Mitigation for {category}"):
+                for recommendation in pentest_checks.REMEDIATION[category]:
+                    st.write(f"• {recommendation}")
+    else:
+        st.info("No vulnerabilities found by the selected checks")
+
+    if results["exploits"]:
+        st.subheader("Related Public Exploits")
+        st.caption(f"Top {len(results['exploits'])} of {results['exploits_matched']:,} matching exploits by relevance")
+        st.dataframe(pd.DataFrame(results["exploits"],
+                                  columns=["ID", "Title", "Type", "Platform", "Date", "Relevance"]))
@@ -2,6 +2,21 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import json
+import os
+import plotly.graph_objects as go
+from utils import correlation
+from utils import restore
+from utils.backup import BackupRepository
+from modules.monitor import get_metric_store, get_rate_monitor
+
+# Log the incident correlator reads; written by IDSfiles.py/AttackSim.py
+INCIDENT_LOG = 'synthetic_attack_data.log'
+
+BACKUP_DIR = '.cache/backups'
+RESTORE_DIR = '.cache/restore'
+
+# Longest gap between backups that still counts as on schedule, per frequency
+BACKUP_INTERVALS = {"Hourly": 3600, "Daily": 86400, "Weekly": 7 * 86400, "Monthly": 31 * 86400}
 
 def show_procedures():
     st.header("Recovery Procedures")
@@ -14,32 +29,122 @@ def show_procedures():
     with tab2:
         show_backup_management()
 
+@st.cache_data(show_spinner="Correlating security events...")
+def load_incidents(path, modified):
+    # ``modified`` keys the cache, so a regenerated log is correlated again
+    return [incident.to_dict() for incident in correlation.correlate_log(path)]
+
 def show_recovery_plans():
-    incident_type = st.selectbox(
-        "Select Incident Type",
-        ["Data Breach", "Ransomware", "System Compromise", "DDoS Attack"]
-    )
+    incidents = []
+    if os.path.exists(INCIDENT_LOG):
+        incidents = load_incidents(INCIDENT_LOG, os.path.getmtime(INCIDENT_LOG))
+
+    if not incidents:
+        st.info("No correlated incidents available; showing generic recovery plans.")
+        incident_type = st.selectbox(
+            "Select Incident Type",
+            ["Data Breach", "Ransomware", "System Compromise", "DDoS Attack"]
+        )
+    else:
+        df = pd.DataFrame(incidents)
+        counts = df['Type'].value_counts()
 
+        st.subheader("Correlated Incidents")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Incidents", len(df))
+        with col2:
+            st.metric("Critical", int((df['Level'] == 'Critical').sum()))
+        with col3:
+            st.metric("Multi-stage", int(df['Stages'].str.contains('→').sum()))
+
+        incident_type = st.selectbox(
+            "Select Incident Type",
+            counts.index.tolist(),
+            format_func=lambda t: f"{t} ({counts[t]} incidents)"
+        )
+        st.dataframe(df[df['Type'] == incident_type].head(50), hide_index=True)
+
+    show_event_activity()
     show_recovery_checklist(incident_type)
     show_recovery_timeline(incident_type)
 
+def show_event_activity(days=7, max_points=500):
+    get_rate_monitor().poll()
+    store = get_metric_store()
+    latest = store.latest('events.total')
+    if latest is None:
+        return
+    # The store answers from its hourly or per-minute rollups, whatever the range
+    activity = store.query('events.total', latest - days * 86400, latest + 1, max_points=max_points)
+    fig = go.Figure(go.Bar(x=[datetime.fromtimestamp(t) for t in activity['time']], y=activity['sum'],
+                           name="Events"))
+    fig.update_layout(title=f"Security Event Volume (last {days} days of log activity)",
+                      xaxis_title="Time", yaxis_title="Events")
+    st.plotly_chart(fig, use_container_width=True)
+
+@st.cache_resource
+def get_backup_repository():
+    return BackupRepository(BACKUP_DIR)
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(size) < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def format_age(seconds):
+    for unit, length in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= length:
+            count = int(seconds // length)
+            return f"{count} {unit}{'s' if count > 1 else ''} ago"
+    return "just now"
+
 def show_backup_management():
     st.subheader("Backup Management")
+    repository = get_backup_repository()
+    summary = repository.catalog.summary()
 
     # Backup Status Overview
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Last Backup", "2 hours ago", "On Schedule")
-    with col2:
-        st.metric("Backup Size", "1.2 TB", "+100 MB")
-    with col3:
-        st.metric("Success Rate", "98%", "+2%")
+    col1, col2, col3, col4 = st.columns(4)
+    if summary["latest"]:
+        last = summary["latest"]
+        age = datetime.now().timestamp() - last["created"]
+        interval = BACKUP_INTERVALS[st.session_state.get("backup_frequency", "Daily")]
+        stored = summary["stored_bytes"]
+        with col1:
+            st.metric("Last Backup", format_age(age), "On Schedule" if age <= interval else "Overdue",
+                      delta_color="normal" if age <= interval else "inverse")
+        with col2:
+            st.metric("Backup Size", format_size(stored), f"+{format_size(last['bytes_stored'])}")
+        with col3:
+            st.metric("Success Rate", f"{100.0 * summary['succeeded'] / summary['runs']:.0f}%")
+        with col4:
+            # Everything the latest snapshot describes over what the whole store takes on disk
+            st.metric("Dedup Ratio", f"{last['bytes_total'] / stored:.1f}x" if stored else "-")
+    else:
+        st.info("No backups yet. Run one below to populate the backup metrics and history.")
+
+    source = st.text_input("Backup Source", ".")
+    if st.button("Run Backup Now"):
+        try:
+            with st.spinner(f"Backing up {source}..."):
+                run = repository.backup(source)
+        except OSError as exc:
+            st.error(f"Backup failed: {exc}")
+        else:
+            st.success(f"Snapshot {run['id']}: {run['files']:,} files, {format_size(run['bytes_total'])}, "
+                       f"{format_size(run['bytes_new'])} new, {run['throughput_mb_s']:.1f} MB/s "
+                       f"in {run['duration']:.1f} s")
+            st.rerun()
 
     # Backup Configuration
     st.subheader("Backup Configuration")
     backup_frequency = st.selectbox(
         "Backup Frequency",
-        ["Hourly", "Daily", "Weekly", "Monthly"]
+        list(BACKUP_INTERVALS),
+        index=1,
+        key="backup_frequency"
     )
 
     retention_period = st.slider(
@@ -48,6 +153,11 @@ def show_backup_management():
         max_value=365,
         value=30
     )
+    if st.button("Apply Retention"):
+        pruned = repository.prune(retention_period)
+        st.success(f"Expired {pruned['snapshots']} snapshots, freed {pruned['chunks']:,} chunks "
+                   f"({format_size(pruned['stored_bytes'])})"
+                   + (f"; {pruned['pending']} snapshots left to collect" if pruned['pending'] else ""))
 
     backup_locations = st.multiselect(
         "Backup Locations",
@@ -57,7 +167,7 @@ def show_backup_management():
 
     # Backup History
     st.subheader("Backup History")
-    show_backup_history()
+    show_backup_history(repository)
 
     # Restore Options
     st.subheader("Restore Options")
@@ -70,31 +180,90 @@ def show_backup_management():
         "Restore Type",
         ["Full System Restore", "Selective Restore", "Configuration Only"]
     )
+    show_restore(repository, restore_point, restore_type)
+
+def show_restore(repository, restore_point, restore_type):
+    # Latest snapshot taken by the end of the chosen day
+    snapshot_id = repository.snapshot_at(datetime.combine(restore_point, datetime.max.time()).timestamp())
+    if snapshot_id is None:
+        st.info("No snapshot was taken on or before this date.")
+        return
+    manifest = repository.load_snapshot(snapshot_id)
+    paths, suffixes = None, None
+    if restore_type == "Selective Restore":
+        paths = [p for p in st.text_input("Files or directories to restore (comma-separated)").split(",")
+                 if p.strip()]
+    elif restore_type == "Configuration Only":
+        suffixes = restore.CONFIG_SUFFIXES
+    selected = restore.select_files(manifest['files'], paths, suffixes)
+    size = sum(entry['size'] for entry in selected.values())
+    target = st.text_input("Restore Into", os.path.join(RESTORE_DIR, snapshot_id))
 
-    if st.button("Initialize Restore"):
-        st.warning("Restore process will require system downtime. Please confirm in the next dialog.")
-        with st.expander("Restore Confirmation"):
-            st.write("Please review restore details:")
-            st.write(f"- Restore Point: {restore_point}")
-            st.write(f"- Restore Type: {restore_type}")
-            st.write(f"- Estimated Duration: 2-4 hours")
-            if st.button("Confirm Restore"):
-                st.success("Restore process initiated. Monitoring dashboard will show progress.")
-
-def show_backup_history():
-    # Sample backup history data
-    history = pd.DataFrame({
-        'Date': pd.date_range(start=datetime.now()-timedelta(days=7), periods=8, freq='D'),
-        'Status': ['Success', 'Success', 'Success', 'Warning', 'Success', 'Success', 'Error', 'Success'],
-        'Size': ['1.2 TB', '1.1 TB', '1.1 TB', '1.0 TB', '1.2 TB', '1.1 TB', 'Failed', '1.2 TB'],
-        'Duration': ['45 min', '42 min', '44 min', '50 min', '46 min', '43 min', 'N/A', '45 min']
-    })
+    # Estimate from the last restore's measured rate, or the last backup's before any restore
+    rate = st.session_state.get("restore_rate_mb_s") or manifest['stats'].get('throughput_mb_s') or 0.0
+    estimate = f"{size / 1e6 / rate:.1f} s" if rate else "unknown"
+    st.write(f"- Snapshot: {snapshot_id} ({datetime.fromtimestamp(manifest['created']):%Y-%m-%d %H:%M})")
+    st.write(f"- Files: {len(selected):,} ({format_size(size)})")
+    st.write(f"- Estimated Duration: {estimate}")
+
+    if restore_type == "Selective Restore" and not paths:
+        return
+    confirmed = st.checkbox(f"Overwrite existing files in {target}")
+    if st.button("Initialize Restore", disabled=not confirmed or not selected):
+        bar = st.progress(0.0, text="Starting restore...")
+
+        def on_progress(progress):
+            eta = progress['eta']
+            done = progress['bytes_done'] / progress['bytes_total'] if progress['bytes_total'] else 1.0
+            bar.progress(min(done, 1.0), text=f"{progress['files_done']:,}/{progress['files_total']:,} files, "
+                                              f"{progress['rate_mb_s']:.1f} MB/s, "
+                                              f"ETA {'-' if eta is None else f'{eta:.0f} s'}")
+        try:
+            result = restore.restore_snapshot(repository, snapshot_id, target, paths, suffixes,
+                                              on_progress=on_progress)
+        except restore.IntegrityError as exc:
+            st.error(f"Restore stopped, integrity check failed: {exc}")
+        except OSError as exc:
+            st.error(f"Restore failed: {exc}")
+        else:
+            st.session_state["restore_rate_mb_s"] = result['throughput_mb_s']
+            st.success(f"Restored {result['files']:,} files ({format_size(result['bytes'])}) to {target} "
+                       f"in {result['duration']:.1f} s; Merkle root {(result['merkle_root'] or '')[:16]} verified")
+
+def show_backup_history(repository, page_size=20):
+    # Keyset pagination: the seq of the last run on each page opens the next one
+    cursors = st.session_state.setdefault("backup_history_cursors", [None])
+    runs = repository.runs(page_size, cursors[-1])
+    if not runs:
+        st.caption("No backup runs recorded.")
+        return
+    history = pd.DataFrame([{
+        'Date': datetime.fromtimestamp(run['created']),
+        'Status': run['status'],
+        'Snapshot': run['id'] or '',
+        'Files': run['files'],
+        'Size': format_size(run['bytes_total']) if run['status'] == 'Success' else 'Failed',
+        'New Data': format_size(run['bytes_new']),
+        'Stored': format_size(run['bytes_stored']),
+        'Dedup': f"{run['dedup_ratio']:.1f}x" if run.get('dedup_ratio') else '-',
+        'Throughput': f"{run.get('throughput_mb_s', 0.0):.1f} MB/s",
+        'Duration': f"{run['duration']:.1f} s",
+    } for run in runs])
 
     st.dataframe(
         history.style.apply(lambda x: ['background: red' if v == 'Error' 
                                      else 'background: yellow' if v == 'Warning'
                                      else '' for v in x], subset=['Status'])
     )
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Older", disabled=len(runs) < page_size):
+            cursors.append(runs[-1]['seq'])
+            st.rerun()
 
 def show_recovery_checklist(incident_type):
     st.subheader("Recovery Checklist")
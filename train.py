@@ -1,26 +1,36 @@
 import numpy as np
 import joblib
+from functools import partial
 from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.datasets import make_classification
 from sklearn.neural_network import MLPClassifier
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler
+from sklearn.preprocessing import StandardScaler, PolynomialFeatures
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
+from utils.forest_compiler import compile_forest
+from utils.search import BudgetedSearch
+from utils.orchestrator import TrainingOrchestrator
+from utils.transform_cache import TransformCache
+from utils.eval_store import EvaluationStore
+from utils.model_registry import ModelRegistry, load_shared
+from sklearn.base import clone
 
 class MachineLearningAI:
 
-    def __init__(self, classifier=None, param_grid=None):
+    def __init__(self, classifier=None, param_grid=None, search=None):
         self.classifier = classifier if classifier is not None else MLPClassifier()
         self.param_grid = param_grid
+        self.search = search
         self.pipeline = None
         self.grid_search = None
         self.best_params = None
         self.best_score = None
-
+        self.compiled = None
+        self.shared = False
 
     def generate_dataset(self, n_samples=100, n_features=20, test_size=0.25, random_state=42):
         X, y = make_classification(n_samples=n_samples, n_features=n_features, n_informative=2, n_classes=2, random_state=random_state)
@@ -30,23 +40,45 @@ class MachineLearningAI:
         self.pipeline = Pipeline(steps)
 
     def generate_and_train_classifier(self, X_train, y_train, cv=5):
+        if self.shared:
+            # A loaded pipeline is shared with other callers; train a private copy
+            self.pipeline = clone(self.pipeline)
+            self.shared = False
         if self.pipeline is None:
 
           self.configure_pipeline([('scaler', StandardScaler()), ('poly', PolynomialFeatures()), ('classifier', self.classifier)])
         if self.param_grid is not None:
-            self.grid_search = GridSearchCV(self.pipeline,
-                        self.param_grid, cv=cv, n_jobs=-1)
+            if self.search is not None:
+                # Budgeted search samples the grid instead of fitting every combination
+                self.grid_search = BudgetedSearch(self.pipeline, self.param_grid, cv=cv, **self.search)
+            else:
+                self.grid_search = GridSearchCV(self.pipeline,
+                            self.param_grid, cv=cv, n_jobs=-1)
             self.grid_search.fit(X_train, y_train)
             print(f'Best parameters found: {self.grid_search.best_params_}')
             self.best_params = self.grid_search.best_params_
+            self.best_score = self.grid_search.best_score_
             self.pipeline = self.grid_search.best_estimator_
+            self.compiled = None
         else:
             scores = cross_val_score(self.pipeline, X_train, y_train, cv=cv, n_jobs=-1)
             self.pipeline.fit(X_train, y_train)
+            self.compiled = None
             return np.mean(scores)
 
+    def compile_inference(self, threshold_dtype=np.float64):
+        # Only tree ensembles can be flattened; other classifiers keep the stock path
+        if isinstance(self.pipeline.steps[-1][1], RandomForestClassifier):
+            self.compiled = compile_forest(self.pipeline, threshold_dtype=threshold_dtype)
+        return self.compiled
+
+    def predict(self, X):
+        if self.compiled is not None:
+            return self.compiled.predict(X)
+        return self.pipeline.predict(X)
+
     def evaluate_classifier(self, X_test, y_test):
-        y_pred = self.pipeline.predict(X_test)
+        y_pred = self.predict(X_test)
         print(classification_report(y_test, y_pred))
         print(confusion_matrix(y_test, y_pred))
         return accuracy_score(y_test, y_pred)
@@ -56,7 +88,9 @@ class MachineLearningAI:
         print(f'Model saved to {filename}')
 
     def load_model(self, filename):
-        self.pipeline = joblib.load(filename)
+        self.pipeline = load_shared(filename)
+        self.shared = True
+        self.compiled = None
         print(f'Model loaded from {filename}')
 
 # Set up classifiers and parameter grids to use
@@ -103,28 +137,70 @@ classifier_params = {
     }),
 }
 
-def save_best_models(classifier_params):
-    for name, (clf, params) in classifier_params.items():
-        print(f'\nTraining and evaluating {name}')
-        ai = MachineLearningAI(classifier=clf, param_grid=params)
-        X_train, X_test, y_train, y_test = ai.generate_dataset()
-
-        ai.generate_and_train_classifier(X_train, y_train)
-        accuracy = ai.evaluate_classifier(X_test, y_test)
-        print(f'{name} Model Accuracy: {accuracy}')
+# Grids too large to search exhaustively, with the budget each may spend
+search_settings = {
+    'MLP': {'strategy': 'hyperband', 'max_fits': 2000, 'max_time': 900},
+}
 
-        # Save the best model
-        model_file = f'best_{name.lower().replace(" ", "_")}_model.joblib'
-        ai.save_model(model_file)
+# Scaled and polynomial-expanded folds, shared by every model and kept between runs
+TRANSFORM_CACHE_DIR = '.cache/transforms'
+# Every fold score ever computed, so re-runs resume instead of starting over
+EVALUATION_STORE_PATH = '.cache/evaluations.sqlite'
+MODEL_REGISTRY_DIR = 'models/registry'
+
+def save_best_models(classifier_params, search_settings=None, n_workers=None):
+    search_settings = search_settings or {}
+    transform_cache = TransformCache(TRANSFORM_CACHE_DIR)
+    evaluation_store = EvaluationStore(EVALUATION_STORE_PATH)
+    registry = ModelRegistry(MODEL_REGISTRY_DIR)
+    # Every candidate is trained and evaluated on the same dataset
+    X_train, X_test, y_train, y_test = MachineLearningAI().generate_dataset()
+
+    with TrainingOrchestrator(n_workers=n_workers) as orchestrator:
+        # Workers map the training matrix instead of receiving a pickled copy per fit
+        X_shared = orchestrator.share(X_train, 'X_train')
+        y_shared = orchestrator.share(y_train, 'y_train')
+
+        def train_model(name, clf, params):
+            search = dict(search_settings.get(name, {'strategy': 'grid'}),
+                          parallel=orchestrator.parallel(name), transform_cache=transform_cache,
+                          evaluation_store=evaluation_store, verbose=False)
+            ai = MachineLearningAI(classifier=clf, param_grid=params, search=search)
+            ai.generate_and_train_classifier(X_shared, y_shared)
+            ai.compile_inference()
+            accuracy = ai.evaluate_classifier(X_test, y_test)
+            print(f'{name} Model Accuracy: {accuracy}')
+
+            # Save the best model
+            model_file = f'best_{name.lower().replace(" ", "_")}_model.joblib'
+            ai.save_model(model_file)
+            search = ai.grid_search
+            evaluation_store.record_artifact(*search.store_keys_, ai.best_params, ai.best_score,
+                                             search.refit_time_, model_file)
+            report = search.report_
+
+            # Version the model and make it current only if it beats the live one
+            slug = name.lower().replace(" ", "_")
+            version = registry.register(slug, ai.pipeline,
+                                        metrics={'accuracy': accuracy, 'cv_score': ai.best_score},
+                                        metadata={'best_params': ai.best_params, 'search': report['strategy']})
+            promoted = registry.promote_if_better(slug, version)
+            return {'accuracy': accuracy, 'version': version, 'promoted': promoted, 'fits_run': report['fits_run'], 'fits_reused': report['fits_reused'],
+                    'transform_cache_hit_rate': report['transform_cache_hit_rate'], 'model_file': model_file}
+
+        jobs = {name: partial(train_model, name, clf, params) for name, (clf, params) in classifier_params.items()}
+        return orchestrator.run(jobs)
 
 
 # Call the function to save the best models
-save_best_models(classifier_params)
+if __name__ == "__main__":
+    save_best_models(classifier_params, search_settings)
 
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping
+from utils.dl_training import DeepTrainingDriver
 
 
 class DeepLearningAI(MachineLearningAI):
@@ -141,33 +217,42 @@ class DeepLearningAI(MachineLearningAI):
         ])
         self.classifier.compile(optimizer=Adam(), loss='binary_crossentropy', metrics=['accuracy'])
 
-    def train_deep_learning_model(self, X_train, y_train, epochs=10240, batch_size=10):
-        self.classifier.fit(X_train, y_train, epochs=epochs, batch_size=batch_size)
+    def train_deep_learning_model(self, X_train, y_train, epochs=500, batch_size=256, checkpoint_dir=None, **driver_options):
+        # Large prefetched batches with a scaled learning rate, early stopping on
+        # validation loss and resumable checkpoints instead of 10240 fixed epochs
+        self.driver = DeepTrainingDriver(self.classifier, checkpoint_dir=checkpoint_dir,
+                                         batch_size=batch_size, **driver_options)
+        self.history = self.driver.fit(X_train, y_train, epochs=epochs)
+        self.classifier = self.driver.model
+        print(f'Mean training throughput: {self.driver.throughput():.0f} samples/s')
+        return self.history
 
     def evaluate_deep_learning_model(self, X_test, y_test):
         evaluation = self.classifier.evaluate(X_test, y_test)
         return evaluation
 
+# Resumable checkpoints for the deep learning run
+DEEP_LEARNING_CHECKPOINT_DIR = '.cache/deep_learning_checkpoints'
+
 # Integration into the existing workflow
 def train_and_save_deep_learning_model():
     ai = DeepLearningAI()
-    X_train, X_test, y_train, y_test = ai.generate
+    X_train, X_test, y_train, y_test = ai.generate_dataset()
 
-ai.configure_deep_learning_model(input_dim=20)
-ai.train_deep_learning_model(X_train, y_train, epochs=10240, batch_size=10)
-accuracy = ai.evaluate_deep_learning_model(X_test, y_test)
-print
+    ai.configure_deep_learning_model(input_dim=20)
+    ai.train_deep_learning_model(X_train, y_train, checkpoint_dir=DEEP_LEARNING_CHECKPOINT_DIR)
 
-evaluation = ai.evaluate_deep_learning_model(X_test, y_test)
-print(f'Deep Learning Model Accuracy: {evaluation[1]}')
+    evaluation = ai.evaluate_deep_learning_model(X_test, y_test)
+    print(f'Deep Learning Model Accuracy: {evaluation[1]}')
 
     # Save the deep learning model
-model_file = 'deep_learning_model.h5'
-ai.classifier.save(model_file)
-print(f'Model saved to {model_file}')
+    model_file = 'deep_learning_model.h5'
+    ai.classifier.save(model_file)
+    print(f'Model saved to {model_file}')
 
 # Call the function to train and save the deep learning model
-train_and_save_deep_learning_model()
+if __name__ == "__main__":
+    train_and_save_deep_learning_model()
 
 
 import pandas as pd
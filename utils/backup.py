@@ -0,0 +1,319 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from utils.backup_catalog import BackupCatalog
+
+# Content-defined chunk sizes: a boundary is cut where the rolling hash of the
+# last WINDOW bytes has its top AVERAGE_BITS bits clear, so 64 KiB on average
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+AVERAGE_BITS = 16
+WINDOW = 48
+
+# Bytes read and chunked at a time; at most ``2 * workers`` blocks are in flight
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Stored chunk payloads start with one byte saying how the rest is encoded
+RAW, ZLIB = b'\x00', b'\x01'
+COMPRESSION_LEVEL = 3
+
+DIGEST_SIZE = 32
+DEFAULT_EXCLUDES = ('.git', '.cache', '__pycache__', '.venv', 'venv')
+
+# Chunks whose first bytes do not shrink by this much under zlib are stored raw
+COMPRESSIBLE = 0.95
+SAMPLE_SIZE = 4096
+
+_GEAR = np.random.default_rng(0x6765617220).integers(0, 2 ** 32, 256, dtype=np.uint32)
+_MIX = np.uint32(0x9E3779B1)
+_SHIFT = np.uint32(32 - AVERAGE_BITS)
+
+
+def chunk_digest(data):
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def merkle_root(digests):
+    """Root of the binary hash tree over hex digests; inner nodes hash their two children"""
+    level = [bytes.fromhex(digest) for digest in digests]
+    if not level:
+        return hashlib.blake2b(b'', digest_size=DIGEST_SIZE).hexdigest()
+    while len(level) > 1:
+        paired = [hashlib.blake2b(b'\x01' + level[i] + level[i + 1], digest_size=DIGEST_SIZE).digest()
+                  for i in range(0, len(level) - 1, 2)]
+        # An odd node out is carried up unchanged
+        level = paired + level[len(paired) * 2:]
+    return level[0].hex()
+
+
+def file_root(entry):
+    return merkle_root(digest for digest, _ in entry['chunks'])
+
+
+def snapshot_root(files):
+    """Merkle root over every file's path and root, in path order"""
+    return merkle_root(hashlib.blake2b(path.encode('utf-8') + b'\x00' + bytes.fromhex(entry['root']),
+                                       digest_size=DIGEST_SIZE).hexdigest()
+                       for path, entry in sorted(files.items()))
+
+
+def cut_points(data, final=True):
+    """Chunk end offsets in ``data``, which must start at a chunk boundary
+
+    Boundaries only depend on the WINDOW bytes before them, and never fall
+    within MIN_CHUNK of the previous one, so cutting a stream block by block
+    gives the same chunks as cutting it whole. Unless ``final``, bytes after
+    the last boundary are left for the next block.
+    """
+    n = len(data)
+    if n == 0:
+        return []
+    # Rolling sum of per-byte random values over the window, as differences of one
+    # cumulative sum; uint32 arithmetic wraps, which keeps the differences exact
+    total = np.zeros(n + 1, dtype=np.uint32)
+    np.cumsum(_GEAR.take(np.frombuffer(data, dtype=np.uint8)), out=total[1:])
+    window = np.subtract(total[WINDOW:], total[:-WINDOW]) if n >= WINDOW else total[:0]
+    window *= _MIX
+    window >>= _SHIFT
+    candidates = np.flatnonzero(window == 0) + WINDOW
+    cuts = []
+    start = 0
+    while True:
+        i = np.searchsorted(candidates, start + MIN_CHUNK)
+        end = int(candidates[i]) if i < len(candidates) else n + 1
+        if end - start > MAX_CHUNK:
+            end = start + MAX_CHUNK
+        if end > n:
+            break
+        cuts.append(end)
+        start = end
+    if final and start < n:
+        cuts.append(n)
+    return cuts
+
+
+class ChunkStore:
+    """Content-addressed chunk files under ``root``, named by their BLAKE2b digest
+
+    Chunks are zlib-compressed unless that does not make them smaller, and
+    written through a temporary file so a crash never leaves a partial chunk.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, digest, data):
+        """Store a chunk unless present; returns the bytes written"""
+        path = self.path(digest)
+        if os.path.exists(path):
+            return 0
+        payload = RAW + bytes(data)
+        # Already compressed or encrypted data is not worth a full zlib pass
+        sample = data[:SAMPLE_SIZE]
+        if len(zlib.compress(sample, 1)) < COMPRESSIBLE * len(sample):
+            compressed = zlib.compress(data, COMPRESSION_LEVEL)
+            if len(compressed) < len(data):
+                payload = ZLIB + compressed
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(payload)
+        os.replace(temporary, path)
+        return len(payload)
+
+    def get(self, digest):
+        with open(self.path(digest), 'rb') as f:
+            payload = f.read()
+        return zlib.decompress(payload[1:]) if payload[:1] == ZLIB else payload[1:]
+
+    def stored_size(self, digest):
+        return os.path.getsize(self.path(digest))
+
+    def remove(self, digest):
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+
+def _store_block(store, block, cuts):
+    """Hash a block's chunks and store the ones not on disk yet; runs in a worker thread"""
+    view = memoryview(block)
+    chunks = []
+    start = 0
+    for end in cuts:
+        data = view[start:end]
+        digest = chunk_digest(data)
+        # hashlib and zlib release the GIL, so blocks are hashed and compressed in parallel
+        chunks.append((digest, end - start, store.put(digest, data)))
+        start = end
+    return chunks
+
+
+class BackupRepository:
+    """Deduplicating snapshot backups of directory trees
+
+    Files are cut into content-defined chunks, so an edit only changes the
+    chunks around it, and every distinct chunk is stored once. Snapshots,
+    file versions and chunk references live in a BackupCatalog. Files whose
+    size and modification time match the latest snapshot of the same
+    source keep its version without being read at all.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.chunks = ChunkStore(os.path.join(root, 'chunks'))
+        self.catalog = BackupCatalog(os.path.join(root, 'catalog.db'))
+        # Garbage collection must not delete a chunk a running backup has just found on disk
+        self._lock = threading.Lock()
+
+    def _walk(self, source, excludes):
+        repository = os.path.abspath(self.root)
+        for directory, dirnames, filenames in os.walk(source):
+            dirnames[:] = sorted(d for d in dirnames if d not in excludes
+                                 and os.path.abspath(os.path.join(directory, d)) != repository)
+            for name in sorted(filenames):
+                path = os.path.join(directory, name)
+                if os.path.isfile(path) and not os.path.islink(path):
+                    yield os.path.relpath(path, source).replace(os.sep, '/'), path
+
+    def backup(self, source, excludes=DEFAULT_EXCLUDES, workers=None):
+        """Snapshot ``source`` and return the run's statistics
+
+        Only chunks missing from the store are compressed and written. Up
+        to ``workers`` threads hash and store blocks while the next ones are
+        read and chunked.
+        """
+        with self._lock:
+            return self._backup(os.path.abspath(source), excludes, workers or os.cpu_count() or 1)
+
+    def _backup(self, source, excludes, workers):
+        started = time.time()
+        parent = self.catalog.latest(source)
+        previous = self.catalog.files(parent) if parent else {}
+        files = {}
+        stored = {}
+        stats = dict.fromkeys(('files', 'files_changed', 'bytes_total', 'bytes_read', 'bytes_new',
+                               'bytes_stored', 'chunks_total', 'chunks_new'), 0)
+
+        def collect(future, entry):
+            for digest, length, written in future.result():
+                entry['chunks'].append([digest, length])
+                stats['chunks_total'] += 1
+                # Two blocks may both have written the same new chunk; count it once
+                if written and digest not in stored:
+                    stored[digest] = written
+                    stats['chunks_new'] += 1
+                    stats['bytes_new'] += length
+                    stats['bytes_stored'] += written
+
+        try:
+            # os.walk skips a missing source silently, which would record an empty successful snapshot
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"Backup source does not exist: {source}")
+            if not os.path.isdir(source):
+                raise NotADirectoryError(f"Backup source is not a directory: {source}")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for relative, path in self._walk(source, set(excludes)):
+                    info = os.stat(path)
+                    stats['files'] += 1
+                    stats['bytes_total'] += info.st_size
+                    old = previous.get(relative)
+                    if old and old['size'] == info.st_size and old['mtime_ns'] == info.st_mtime_ns:
+                        files[relative] = old
+                        continue
+                    entry = files[relative] = {'size': info.st_size, 'mtime_ns': info.st_mtime_ns,
+                                               'mode': info.st_mode & 0o777, 'chunks': []}
+                    stats['files_changed'] += 1
+                    with open(path, 'rb') as f:
+                        carry = b''
+                        while True:
+                            data = f.read(BLOCK_SIZE)
+                            block = carry + data if carry else data
+                            cuts = cut_points(block, final=not data)
+                            carry = block[cuts[-1]:] if cuts else block
+                            if cuts:
+                                pending.append((executor.submit(_store_block, self.chunks, block[:cuts[-1]], cuts),
+                                                entry))
+                            stats['bytes_read'] += len(data)
+                            # Bounded memory: wait for the oldest block once enough are in flight
+                            while len(pending) > 2 * workers:
+                                collect(*pending.popleft())
+                            if not data:
+                                break
+                while pending:
+                    collect(*pending.popleft())
+            for entry in files.values():
+                if 'root' not in entry:
+                    entry['root'] = file_root(entry)
+        except Exception as exc:
+            self.catalog.record_failure(source, started, {'error': str(exc), 'duration': time.time() - started,
+                                                          **stats})
+            raise
+
+        duration = max(time.time() - started, 1e-9)
+        stored_bytes = stats['bytes_stored']
+        stats.update({
+            'duration': duration,
+            'throughput_mb_s': stats['bytes_read'] / duration / 1e6,
+            # Logical size of the snapshot over what this run had to add to the store
+            'dedup_ratio': stats['bytes_total'] / stats['bytes_new'] if stats['bytes_new'] else None,
+            'compression_ratio': stats['bytes_new'] / stored_bytes if stored_bytes else None,
+            'merkle_root': snapshot_root(files),
+        })
+        snapshot_id = datetime.fromtimestamp(started).strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:6]
+        self.catalog.add_snapshot(snapshot_id, source, started, stats, files, previous, stored)
+        return self.catalog.run(snapshot_id)
+
+    def runs(self, limit=50, before=None):
+        """Backup runs, successful or not, newest first; page with the last run's ``seq`` as ``before``"""
+        return self.catalog.runs(limit, before)
+
+    def load_snapshot(self, snapshot_id):
+        run = self.catalog.run(snapshot_id)
+        return {'id': snapshot_id, 'source': run['source'], 'created': run['created'], 'stats': run,
+                'files': self.catalog.files(snapshot_id)}
+
+    def latest(self, source=None):
+        """Newest snapshot, optionally only among those of one source directory"""
+        return self.catalog.latest(source)
+
+    def snapshot_at(self, timestamp, source=None):
+        """Newest snapshot taken at or before ``timestamp``"""
+        return self.catalog.snapshot_at(timestamp, source)
+
+    def prune(self, retention_days, now=None, budget=10000):
+        """Expire snapshots older than the retention period and free up to ``budget`` dead file versions
+
+        Calling it again continues garbage collection where the last call
+        stopped.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = self.catalog.expire(now - retention_days * 86400)
+            freed = self.catalog.collect_garbage(budget)
+            for digest in freed['chunks']:
+                self.chunks.remove(digest)
+        return {'snapshots': expired, 'versions': freed['versions'], 'chunks': len(freed['chunks']),
+                'stored_bytes': freed['stored_bytes'], 'pending': freed['pending']}
+
+    def disk_usage(self):
+        """Bytes on disk of every chunk still referenced by a snapshot"""
+        return self.catalog.summary()['stored_bytes']
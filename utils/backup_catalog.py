@@ -0,0 +1,328 @@
+import json
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE,
+    source_id INTEGER NOT NULL,
+    created REAL NOT NULL,
+    status TEXT NOT NULL,
+    stats TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_source ON snapshots (source_id, created);
+CREATE INDEX IF NOT EXISTS snapshots_by_created ON snapshots (created);
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    UNIQUE (source_id, path)
+);
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    path_id INTEGER NOT NULL,
+    source_id INTEGER NOT NULL,
+    first_seq INTEGER NOT NULL,
+    last_seq INTEGER,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    mode INTEGER NOT NULL,
+    root TEXT NOT NULL,
+    chunks BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_by_path ON versions (path_id, first_seq);
+CREATE INDEX IF NOT EXISTS versions_by_start ON versions (source_id, first_seq);
+CREATE INDEX IF NOT EXISTS versions_by_end ON versions (source_id, last_seq);
+CREATE TABLE IF NOT EXISTS chunks (
+    digest BLOB PRIMARY KEY,
+    length INTEGER NOT NULL,
+    stored INTEGER,
+    refs INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS gc_queue (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL
+);
+"""
+
+# Bytes per packed chunk reference: the digest, then the chunk length as a little-endian uint32
+DIGEST_BYTES = 32
+REFERENCE_BYTES = DIGEST_BYTES + 4
+
+
+def pack_chunks(chunks):
+    return b''.join(bytes.fromhex(digest) + length.to_bytes(4, 'little') for digest, length in chunks)
+
+
+def unpack_chunks(blob):
+    return [[blob[i:i + DIGEST_BYTES].hex(), int.from_bytes(blob[i + DIGEST_BYTES:i + REFERENCE_BYTES], 'little')]
+            for i in range(0, len(blob), REFERENCE_BYTES)]
+
+
+class BackupCatalog:
+    """Index of snapshots, file versions and chunk references in SQLite
+
+    A file version is one row covering the range of snapshots it appears
+    in, from ``first_seq`` to ``last_seq`` (NULL while it is still in the
+    newest snapshot of its source). Recording a snapshot therefore only
+    writes rows for files that changed, and "path X at time T" is one
+    index lookup for the snapshot and one for the version.
+
+    Chunks count the live versions that reference them. Expiring
+    snapshots only queues them; collect_garbage later drops the versions
+    that no remaining snapshot covers, a bounded batch at a time, and
+    releases chunks whose count reaches zero. Like EvaluationStore, the
+    database runs in WAL mode with one connection per thread.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _source_id(self, conn, source, create=False):
+        row = conn.execute("SELECT id FROM sources WHERE path = ?", (source,)).fetchone()
+        if row:
+            return row[0]
+        if not create:
+            return None
+        return conn.execute("INSERT INTO sources (path) VALUES (?)", (source,)).lastrowid
+
+    def add_snapshot(self, name, source, created, stats, files, parent_files=None, stored=None):
+        """Record a successful snapshot of ``source`` after the latest one
+
+        ``parent_files`` is the latest snapshot's file listing; entries of
+        ``files`` that are the very same objects are unchanged and cost
+        nothing. ``stored`` maps digests of chunks written by this run to
+        their size on disk.
+        """
+        parent_files = parent_files or {}
+        stored = stored or {}
+        with self._connect() as conn:
+            source_id = self._source_id(conn, source, create=True)
+            parent_seq = self._latest_seq(conn, source_id)
+            seq = conn.execute(
+                "INSERT INTO snapshots (name, source_id, created, status, stats) VALUES (?, ?, ?, 'Success', ?)",
+                (name, source_id, created, json.dumps(stats)),
+            ).lastrowid
+            changed = [(path, entry) for path, entry in files.items() if parent_files.get(path) is not entry]
+            removed = list(parent_files.keys() - files.keys())
+            if parent_seq is not None:
+                conn.executemany(
+                    "UPDATE versions SET last_seq = ? WHERE last_seq IS NULL AND path_id = "
+                    "(SELECT id FROM paths WHERE source_id = ? AND path = ?)",
+                    [(parent_seq, source_id, path) for path in removed + [p for p, _ in changed if p in parent_files]],
+                )
+            conn.executemany("INSERT OR IGNORE INTO paths (source_id, path) VALUES (?, ?)",
+                             [(source_id, path) for path, _ in changed])
+            conn.executemany(
+                "INSERT INTO versions (path_id, source_id, first_seq, size, mtime_ns, mode, root, chunks) "
+                "VALUES ((SELECT id FROM paths WHERE source_id = ? AND path = ?), ?, ?, ?, ?, ?, ?, ?)",
+                [(source_id, path, source_id, seq, entry['size'], entry['mtime_ns'], entry['mode'], entry['root'],
+                  pack_chunks(entry['chunks'])) for path, entry in changed],
+            )
+            conn.executemany(
+                "INSERT INTO chunks (digest, length, stored, refs) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (digest) DO UPDATE SET refs = refs + 1, stored = COALESCE(stored, excluded.stored)",
+                [(bytes.fromhex(digest), length, stored.get(digest))
+                 for _, entry in changed for digest, length in entry['chunks']],
+            )
+        return seq
+
+    def record_failure(self, source, created, stats):
+        with self._connect() as conn:
+            source_id = self._source_id(conn, source, create=True)
+            conn.execute("INSERT INTO snapshots (source_id, created, status, stats) VALUES (?, ?, 'Error', ?)",
+                         (source_id, created, json.dumps(stats)))
+
+    def _latest_seq(self, conn, source_id, before=None):
+        query = "SELECT MAX(seq) FROM snapshots WHERE source_id = ? AND status = 'Success'"
+        args = [source_id]
+        if before is not None:
+            query += " AND seq < ?"
+            args.append(before)
+        return conn.execute(query, args).fetchone()[0]
+
+    def _run(self, row):
+        seq, name, source, created, status, stats = row
+        return {'seq': seq, 'id': name, 'source': source, 'created': created, 'status': status,
+                **json.loads(stats)}
+
+    _RUN_COLUMNS = ("SELECT s.seq, s.name, src.path, s.created, s.status, s.stats "
+                    "FROM snapshots s JOIN sources src ON src.id = s.source_id")
+
+    def runs(self, limit=50, before=None, source=None):
+        """Backup runs, newest first; pass the last ``seq`` seen as ``before`` for the next page"""
+        query, args = self._RUN_COLUMNS + " WHERE 1", []
+        if before is not None:
+            query += " AND s.seq < ?"
+            args.append(before)
+        if source is not None:
+            query += " AND src.path = ?"
+            args.append(source)
+        query += " ORDER BY s.seq DESC LIMIT ?"
+        args.append(limit)
+        return [self._run(row) for row in self._connect().execute(query, args)]
+
+    def run(self, name):
+        row = self._connect().execute(self._RUN_COLUMNS + " WHERE s.name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown snapshot {name!r}")
+        return self._run(row)
+
+    def summary(self):
+        """Run counts, the latest successful run and bytes on disk referenced by live chunks"""
+        conn = self._connect()
+        total, succeeded = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'Success'), 0) FROM snapshots").fetchone()
+        row = conn.execute(self._RUN_COLUMNS + " WHERE s.status = 'Success' ORDER BY s.seq DESC LIMIT 1").fetchone()
+        chunks, stored = conn.execute("SELECT COUNT(*), COALESCE(SUM(stored), 0) FROM chunks").fetchone()
+        return {'runs': total, 'succeeded': succeeded, 'latest': self._run(row) if row else None,
+                'chunks': chunks, 'stored_bytes': stored}
+
+    def snapshot_at(self, timestamp, source=None):
+        """Name of the newest snapshot taken at or before ``timestamp``"""
+        conn = self._connect()
+        if source is None:
+            row = conn.execute(
+                "SELECT name FROM snapshots WHERE created <= ? AND status = 'Success' "
+                "ORDER BY created DESC LIMIT 1", (timestamp,)).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT s.name FROM snapshots s JOIN sources src ON src.id = s.source_id "
+                "WHERE src.path = ? AND s.created <= ? AND s.status = 'Success' ORDER BY s.created DESC LIMIT 1",
+                (source, timestamp)).fetchone()
+        return row[0] if row else None
+
+    def latest(self, source=None):
+        return self.snapshot_at(float('inf'), source)
+
+    def _version(self, row):
+        size, mtime_ns, mode, root, chunks = row
+        return {'size': size, 'mtime_ns': mtime_ns, 'mode': mode, 'root': root, 'chunks': unpack_chunks(chunks)}
+
+    def files(self, name):
+        """{path: entry} of every file in a snapshot"""
+        conn = self._connect()
+        seq, source_id = conn.execute("SELECT seq, source_id FROM snapshots WHERE name = ?", (name,)).fetchone()
+        rows = conn.execute(
+            "SELECT p.path, v.size, v.mtime_ns, v.mode, v.root, v.chunks FROM versions v "
+            "JOIN paths p ON p.id = v.path_id "
+            "WHERE v.source_id = ? AND v.first_seq <= ? AND (v.last_seq IS NULL OR v.last_seq >= ?)",
+            (source_id, seq, seq))
+        return {row[0]: self._version(row[1:]) for row in rows}
+
+    def file_at(self, source, path, timestamp):
+        """The version of ``path`` in the newest snapshot of ``source`` at or before ``timestamp``, or None"""
+        conn = self._connect()
+        source_id = self._source_id(conn, source)
+        row = conn.execute(
+            "SELECT seq, name FROM snapshots WHERE source_id = ? AND created <= ? AND status = 'Success' "
+            "ORDER BY created DESC LIMIT 1", (source_id, timestamp)).fetchone()
+        if row is None:
+            return None
+        seq, name = row
+        row = conn.execute(
+            "SELECT v.first_seq, v.last_seq, v.size, v.mtime_ns, v.mode, v.root, v.chunks FROM versions v "
+            "WHERE v.path_id = (SELECT id FROM paths WHERE source_id = ? AND path = ?) AND v.first_seq <= ? "
+            "ORDER BY v.first_seq DESC LIMIT 1", (source_id, path, seq)).fetchone()
+        if row is None or (row[1] is not None and row[1] < seq):
+            return None
+        return {'snapshot': name, **self._version(row[2:])}
+
+    def file_history(self, source, path, limit=50, before=None):
+        """Versions of one file, newest first, with the creation time of the snapshot each first appeared in"""
+        conn = self._connect()
+        query = ("SELECT v.first_seq, s.name, s.created, v.size, v.mtime_ns, v.root FROM versions v "
+                 "JOIN snapshots s ON s.seq = v.first_seq "
+                 "WHERE v.path_id = (SELECT p.id FROM paths p JOIN sources src ON src.id = p.source_id "
+                 "WHERE src.path = ? AND p.path = ?)")
+        args = [source, path]
+        if before is not None:
+            query += " AND v.first_seq < ?"
+            args.append(before)
+        query += " ORDER BY v.first_seq DESC LIMIT ?"
+        args.append(limit)
+        return [{'seq': seq, 'snapshot': name, 'created': created, 'size': size, 'mtime_ns': mtime_ns,
+                 'root': root} for seq, name, created, size, mtime_ns, root in conn.execute(query, args)]
+
+    def expire(self, before, keep_last=1):
+        """Drop snapshots created before ``before``, keeping each source's newest ``keep_last``
+
+        The dropped snapshots' file versions and chunks are only queued;
+        collect_garbage frees them. Returns the number of snapshots dropped.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, source_id, status FROM snapshots s WHERE created < ? AND seq NOT IN "
+                "(SELECT seq FROM snapshots k WHERE k.source_id = s.source_id AND k.status = 'Success' "
+                "ORDER BY k.seq DESC LIMIT ?)", (before, keep_last)).fetchall()
+            conn.executemany("DELETE FROM snapshots WHERE seq = ?", [(seq,) for seq, _, _ in rows])
+            conn.executemany("INSERT INTO gc_queue (source_id, seq) VALUES (?, ?)",
+                             [(source_id, seq) for seq, source_id, status in rows if status == 'Success'])
+        return len(rows)
+
+    def collect_garbage(self, budget=10000):
+        """Free up to ``budget`` dead file versions; returns what was freed and whether work remains
+
+        A version is dead once no remaining snapshot of its source lies in
+        its range. Around a dropped snapshot those are exactly the versions
+        that started after the previous remaining snapshot and ended before
+        the next one, which the range index finds without a scan.
+        """
+        freed = {'versions': 0, 'chunks': [], 'stored_bytes': 0}
+        with self._connect() as conn:
+            for queue_id, source_id, seq in conn.execute(
+                    "SELECT id, source_id, seq FROM gc_queue ORDER BY id").fetchall():
+                left = budget - freed['versions']
+                if left <= 0:
+                    break
+                previous = self._latest_seq(conn, source_id, before=seq) or 0
+                following = conn.execute(
+                    "SELECT MIN(seq) FROM snapshots WHERE source_id = ? AND seq > ? AND status = 'Success'",
+                    (source_id, seq)).fetchone()[0]
+                if following is None:
+                    # Nothing newer remains, so versions still open are dead as well
+                    condition, args = "(v.last_seq IS NULL OR v.last_seq > ?)", [previous]
+                else:
+                    condition, args = "v.last_seq > ? AND v.last_seq < ?", [previous, following]
+                dead = conn.execute(
+                    f"SELECT v.id, v.path_id, v.chunks FROM versions v WHERE v.source_id = ? AND {condition} "
+                    f"AND v.first_seq > ? LIMIT ?", [source_id, *args, previous, left]).fetchall()
+                conn.executemany("DELETE FROM versions WHERE id = ?", [(version_id,) for version_id, _, _ in dead])
+                conn.executemany("UPDATE chunks SET refs = refs - 1 WHERE digest = ?",
+                                 [(bytes.fromhex(digest),) for _, _, blob in dead
+                                  for digest, _ in unpack_chunks(blob)])
+                conn.executemany("DELETE FROM paths WHERE id = ? AND NOT EXISTS "
+                                 "(SELECT 1 FROM versions WHERE path_id = ?)",
+                                 [(path_id, path_id) for path_id in {path_id for _, path_id, _ in dead}])
+                freed['versions'] += len(dead)
+                if len(dead) < left:
+                    conn.execute("DELETE FROM gc_queue WHERE id = ?", (queue_id,))
+            released = conn.execute("SELECT digest, COALESCE(stored, 0) FROM chunks WHERE refs <= 0").fetchall()
+            conn.execute("DELETE FROM chunks WHERE refs <= 0")
+        freed['chunks'] = [digest.hex() for digest, _ in released]
+        freed['stored_bytes'] = sum(size for _, size in released)
+        freed['pending'] = self._connect().execute("SELECT COUNT(*) FROM gc_queue").fetchone()[0]
+        return freed
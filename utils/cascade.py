@@ -0,0 +1,230 @@
+import time
+
+import numpy as np
+
+
+class CascadeStage:
+    """One detector in a cascade: a scoring function plus its decision band
+
+    ``scorer`` maps a batch of events to attack probabilities. Events scoring
+    below ``low`` are dismissed as benign, events above ``high`` are flagged
+    as attacks and everything in between is escalated to the next stage. The
+    last stage of a cascade decides every event it sees with ``threshold``.
+    ``features`` optionally turns the cascade input into this stage's input,
+    e.g. a LogBatch of raw lines into a feature matrix.
+    """
+
+    def __init__(self, name, scorer, low=0.0, high=1.0, threshold=0.5, features=None):
+        self.name = name
+        self.scorer = scorer
+        self.features = features
+        self.low = low
+        self.high = high
+        self.threshold = threshold
+        self.events = 0
+        self.decided = 0
+        self.seconds = 0.0
+
+    def score(self, X):
+        start = time.perf_counter()
+        if self.features is not None:
+            X = self.features(X)
+        scores = np.asarray(self.scorer(X), dtype=np.float64).ravel()
+        self.seconds += time.perf_counter() - start
+        self.events += len(scores)
+        return scores
+
+    @property
+    def seconds_per_event(self):
+        return self.seconds / self.events if self.events else 0.0
+
+    def reset_stats(self):
+        self.events = 0
+        self.decided = 0
+        self.seconds = 0.0
+
+
+def proba_scorer(model):
+    """Attack probability from anything with an sklearn-style predict_proba"""
+    def score(X):
+        return model.predict_proba(X)[:, 1]
+    return score
+
+
+def rnn_scorer(model, batch_size=4096):
+    """Attack probability from a Keras sequence model fed one timestep per event"""
+    def score(X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 2:
+            X = X.reshape((X.shape[0], 1, X.shape[1]))
+        if len(X) <= batch_size:
+            # Calling the model directly skips predict()'s per-call setup on small batches
+            return np.asarray(model(X, training=False)).ravel()
+        return model.predict(X, batch_size=batch_size, verbose=0).ravel()
+    return score
+
+
+def _as_batch(X):
+    # Arrays and LogBatches both support row selection with an index array
+    return X if hasattr(X, 'take') else np.asarray(X)
+
+
+def _low_threshold(positive_scores, allowed_misses):
+    # Highest cut that dismisses at most ``allowed_misses`` attacks (score < low)
+    if len(positive_scores) == 0:
+        return 0.0
+    ordered = np.sort(positive_scores)
+    return float(ordered[min(allowed_misses, len(ordered) - 1)])
+
+
+def _high_threshold(negative_scores, allowed_false_alarms):
+    # Lowest cut that flags at most ``allowed_false_alarms`` benign events (score > high)
+    if len(negative_scores) == 0:
+        return 1.0
+    ordered = np.sort(negative_scores)[::-1]
+    return float(ordered[min(allowed_false_alarms, len(ordered) - 1)])
+
+
+class CascadeDetector:
+    """Run cheap detectors first and escalate only the events they are unsure about
+
+    Stages are ordered from cheapest to most expensive. ``calibrate`` sets
+    each escalating stage's band on validation data so the cascade as a whole
+    dismisses at most ``1 - target_recall`` of the attacks and flags at most
+    ``max_false_alarm_rate`` of the benign events before the final stage.
+    """
+
+    def __init__(self, stages):
+        if not stages:
+            raise ValueError("A cascade needs at least one stage")
+        self.stages = list(stages)
+        self.calibration_ = None
+
+    def decide(self, X):
+        """Return (labels, deciding stage index) for a batch of events"""
+        X = _as_batch(X)
+        n = len(X)
+        labels = np.zeros(n, dtype=np.int64)
+        decided_by = np.full(n, -1, dtype=np.int64)
+        pending = np.arange(n)
+        last = len(self.stages) - 1
+        for index, stage in enumerate(self.stages):
+            if len(pending) == 0:
+                break
+            scores = stage.score(X[pending])
+            if index == last:
+                labels[pending] = scores >= stage.threshold
+                decided_by[pending] = index
+                stage.decided += len(pending)
+                break
+            benign = scores < stage.low
+            attack = scores > stage.high
+            done = benign | attack
+            labels[pending[attack]] = 1
+            decided_by[pending[done]] = index
+            stage.decided += int(done.sum())
+            pending = pending[~done]
+        return labels, decided_by
+
+    def predict(self, X):
+        return self.decide(X)[0]
+
+    def calibrate(self, X_val, y_val, target_recall=0.99, max_false_alarm_rate=0.01, final_threshold=0.5):
+        """Tune every stage's thresholds on labelled validation events"""
+        X_val = _as_batch(X_val)
+        y_val = np.asarray(y_val).astype(bool)
+        n_positive = int(y_val.sum())
+        n_negative = len(y_val) - n_positive
+        n_escalating = len(self.stages) - 1
+        # The miss and false-alarm budgets are split evenly over the escalating stages
+        miss_budget = int(np.floor((1.0 - target_recall) * n_positive / max(n_escalating, 1)))
+        alarm_budget = int(np.floor(max_false_alarm_rate * n_negative / max(n_escalating, 1)))
+
+        pending = np.arange(len(y_val))
+        missed = 0
+        for index, stage in enumerate(self.stages):
+            scores = stage.score(X_val[pending])
+            truth = y_val[pending]
+            if index == n_escalating:
+                stage.threshold = self._final_threshold(scores, truth, missed, n_positive, target_recall,
+                                                        final_threshold)
+                break
+            low = _low_threshold(scores[truth], miss_budget)
+            high = _high_threshold(scores[~truth], alarm_budget)
+            # Overlapping cuts would decide the same event both ways; keep recall
+            stage.low, stage.high = min(low, high), high
+            missed += int(np.sum(truth & (scores < stage.low)))
+            pending = pending[(scores >= stage.low) & (scores <= stage.high)]
+            if len(pending) == 0:
+                break
+
+        for stage in self.stages:
+            stage.reset_stats()
+        labels, decided_by = self.decide(X_val)
+        self.calibration_ = {
+            'target_recall': target_recall,
+            'recall': float(labels[y_val].mean()) if n_positive else float('nan'),
+            'false_alarm_rate': float(labels[~y_val].mean()) if n_negative else float('nan'),
+            'stage_fractions': self._fractions(decided_by),
+        }
+        for stage in self.stages:
+            stage.reset_stats()
+        return self.calibration_
+
+    def _final_threshold(self, scores, truth, missed_earlier, n_positive, target_recall, default):
+        # Lower the last stage's cut only as far as the overall recall target needs
+        if n_positive == 0 or not truth.any():
+            return default
+        allowed = int(np.floor((1.0 - target_recall) * n_positive)) - missed_earlier
+        if allowed < 0:
+            return float(np.min(scores[truth]))
+        return min(default, _low_threshold(scores[truth], allowed))
+
+    def _fractions(self, decided_by):
+        total = max(len(decided_by), 1)
+        return {stage.name: float(np.sum(decided_by == i)) / total for i, stage in enumerate(self.stages)}
+
+    def report(self):
+        """Traffic share, cost and throughput gain over running the final stage on everything"""
+        total = self.stages[0].events
+        final = self.stages[-1]
+        spent = sum(stage.seconds for stage in self.stages)
+        baseline = final.seconds_per_event * total
+        return {
+            'events': total,
+            'stages': [
+                {
+                    'name': stage.name,
+                    'scored_fraction': stage.events / total if total else 0.0,
+                    'decided_fraction': stage.decided / total if total else 0.0,
+                    'microseconds_per_event': stage.seconds_per_event * 1e6,
+                    'low': stage.low,
+                    'high': stage.high,
+                    'threshold': stage.threshold if stage is final else None,
+                }
+                for stage in self.stages
+            ],
+            'events_per_second': total / spent if spent else 0.0,
+            'throughput_gain': baseline / spent if spent else 0.0,
+        }
+
+    def format_report(self):
+        report = self.report()
+        lines = [f"Cascade over {report['events']} events"]
+        for stage in report['stages']:
+            if stage['threshold'] is None:
+                cut = f"band [{stage['low']:.3f}, {stage['high']:.3f}]"
+            else:
+                cut = f"threshold {stage['threshold']:.3f}"
+            lines.append(
+                f"  {stage['name']:<16} scored {stage['scored_fraction']:6.1%}  "
+                f"decided {stage['decided_fraction']:6.1%}  "
+                f"{stage['microseconds_per_event']:9.1f} us/event  {cut}"
+            )
+        lines.append(f"  {report['events_per_second']:.0f} events/s, "
+                     f"{report['throughput_gain']:.1f}x faster than the final stage alone")
+        return '\n'.join(lines)
+
+    def reset_stats(self):
+        for stage in self.stages:
+            stage.reset_stats()
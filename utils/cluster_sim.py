@@ -0,0 +1,486 @@
+import heapq
+import time
+
+import numpy as np
+
+# Container states
+RUNNING, ISOLATED, FROZEN, STOPPED, RESTARTING = range(5)
+STATE_NAMES = ('running', 'isolated', 'frozen', 'stopped', 'restarting')
+
+# Isolation action -> container state it leaves behind
+ACTIONS = {'network': ISOLATED, 'freeze': FROZEN, 'stop': STOPPED}
+# Killed processes lose their in-flight work and are restarted by the container's supervisor;
+# frozen ones keep their work and stay suspended, through container restarts, until unfrozen
+PROCESS_ACTIONS = ('kill', 'freeze')
+
+# Median seconds from an isolation decision until it is enforced
+ACTION_LATENCY = {'network': 2.0, 'freeze': 0.3, 'stop': 10.0, 'kill': 0.1}
+
+# Processes started in every container: (command, role). Workers serve requests,
+# and the container takes no traffic while its proxy is down
+PROCESS_TEMPLATE = (('app-server', 'worker'), ('app-server', 'worker'), ('envoy', 'proxy'), ('fluent-bit', 'agent'))
+
+REQUESTS_PER_CORE = 200.0
+SERVICE_TIME = 0.02
+# Work a container queues before it sheds requests, in seconds of its capacity
+QUEUE_SECONDS = 5.0
+
+# Seconds until the load balancer notices a change in reachability, and until a new replica is ready
+HEALTH_CHECK = 5.0
+READY_DELAY = 5.0
+RESTART_DELAY = 10.0
+PROCESS_RESTART_DELAY = 1.0
+
+# Request latency histogram edges in seconds
+LATENCY_BINS = np.geomspace(1e-3, 60.0, 121)
+
+# Event kinds, in dispatch order
+(TICK, ATTACK, SPREAD, DETECT, ENFORCE, ENFORCE_PROCESS, ROUTE, OOM, RESTARTED, REPLACE, CRASH,
+ PROCESS_START, UNFREEZE_PROCESS) = range(13)
+
+
+class Process:
+    """One process of a container"""
+
+    __slots__ = ('pid', 'container', 'command', 'role', 'up', 'isolated', 'frozen')
+
+    def __init__(self, pid, container, command, role):
+        self.pid = pid
+        self.container = container
+        self.command = command
+        self.role = role
+        self.up = True
+        self.isolated = False
+        self.frozen = False
+
+
+class ClusterSimulation:
+    """Discrete-event simulation of a container cluster under attack and isolation
+
+    Lifecycle changes (attacks, lateral movement, detection, isolation,
+    health checks, OOM kills, restarts, process crashes) are events on one
+    heap. Request traffic is a fluid model: every ``tick`` seconds, all
+    containers' arrivals, queues, served requests and latencies are advanced
+    at once as arrays, so the cost of a tick does not grow with the request
+    rate and thousands of containers run an hour in seconds.
+
+    Each container is a replica of a service; services split their load over
+    the replicas the load balancer routes to. Network policy ``allowed``
+    lists the services each service may connect to, which is also where an
+    attacker on a compromised container can move next.
+    """
+
+    def __init__(self, containers=1000, services=None, seed=0, tick=1.0, attacks_per_hour=6.0,
+                 spread_interval=120.0, detection_delay=90.0, response='network', replace_after=120.0,
+                 leak_fraction=0.02, crashes_per_hour=None, memory_limit=512.0, peers=3):
+        if response is not None and response not in ACTIONS:
+            raise ValueError(f"Unknown isolation action {response!r}")
+        self.rng = rng = np.random.default_rng(seed)
+        self.n = n = containers
+        self.services = services = services or max(1, containers // 50)
+        self.tick = tick
+        self.attacks_per_hour = attacks_per_hour
+        self.spread_interval = spread_interval
+        self.detection_delay = detection_delay
+        self.response = response
+        self.replace_after = replace_after
+        self.memory_limit = memory_limit
+
+        self.service = np.arange(n) % services
+        self.replicas = [np.flatnonzero(self.service == s) for s in range(services)]
+        self.replica_count = np.bincount(self.service, minlength=services)
+        cores = rng.choice([0.5, 1.0, 2.0], services)
+        self.cpu_limit = cores[self.service]
+        # Requests per second per service; healthy replicas run at 10-60% of capacity
+        self.rate = cores * REQUESTS_PER_CORE * rng.uniform(0.1, 0.6, services) * self.replica_count
+        # Services may call up to ``peers`` services of the next tier
+        self.allowed = [rng.choice(np.arange(s + 1, services), min(peers, services - s - 1), replace=False)
+                        if s + 1 < services else np.array([], dtype=np.int64) for s in range(services)]
+
+        self.state = np.full(n, RUNNING, dtype=np.int8)
+        self.routed = np.ones(n, dtype=bool)
+        self.isolated = np.zeros(n, dtype=bool)
+        self.backlog = np.zeros(n)
+        self.generation = np.zeros(n, dtype=np.int64)
+        self.memory_base = rng.uniform(0.3, 0.6, n) * memory_limit
+        # MB per second; a leaking container runs out of memory within the hour
+        self.memory_growth = np.where(rng.random(n) < leak_fraction, rng.uniform(0.2, 1.0, n), 0.0)
+        self.compromised = np.zeros(n, dtype=bool)
+        self.compromised_at = np.zeros(n)
+        self.infection = np.zeros(n, dtype=np.int64)
+
+        per_container = len(PROCESS_TEMPLATE)
+        self.processes = [Process(pid, pid // per_container, *PROCESS_TEMPLATE[pid % per_container])
+                          for pid in range(n * per_container)]
+        self.workers_total = sum(role == 'worker' for _, role in PROCESS_TEMPLATE)
+        self.workers_up = np.full(n, self.workers_total)
+        self.proxy_up = np.ones(n, dtype=bool)
+        self.crashes_per_hour = len(self.processes) / 24.0 if crashes_per_hour is None else crashes_per_hour
+
+        self.now = 0.0
+        self._events = []
+        self._sequence = 0
+        self.events_processed = 0
+        self._handlers = (self._tick, self._attack, self._spread, self._detect, self._enforce,
+                          self._enforce_process, self._route, self._oom, self._restarted, self._replace,
+                          self._crash, self._process_start, self._unfreeze_process)
+
+        self.minutes = {}
+        self.totals = dict.fromkeys(('arrived', 'served', 'dropped_isolation', 'dropped_failure',
+                                     'dropped_overload', 'dropped_unrouted'), 0.0)
+        self.latency_hist = np.zeros(len(LATENCY_BINS) + 1)
+        self.counters = dict.fromkeys(('compromises', 'spread_attempts', 'spread_blocked', 'detections',
+                                       'isolations', 'process_isolations', 'process_unfreezes', 'ooms', 'restarts',
+                                       'replacements', 'process_crashes'), 0)
+        self.dwell_time = []
+
+        self.schedule(tick, TICK)
+        for c in np.flatnonzero(self.memory_growth):
+            self._schedule_oom(c)
+        self._next_attack()
+        self._next_crash()
+
+    def schedule(self, at, kind, target=0, arg=0):
+        self._sequence += 1
+        heapq.heappush(self._events, (at, self._sequence, kind, target, arg))
+
+    def run(self, until):
+        """Process events before simulated time ``until``; returns the report
+
+        Events at exactly ``until`` wait for the next call, so a run ends on a
+        whole tick instead of opening one more minute with a single tick in it.
+        """
+        events, handlers = self._events, self._handlers
+        started = time.perf_counter()
+        processed = 0
+        while events and events[0][0] < until:
+            at, _, kind, target, arg = heapq.heappop(events)
+            self.now = at
+            handlers[kind](target, arg)
+            processed += 1
+        self.now = until
+        self.events_processed += processed
+        self.wall_seconds = time.perf_counter() - started
+        return self.report()
+
+    def isolate(self, containers, action='network', at=None):
+        """Decide at time ``at`` (default now) to isolate containers; each is enforced after the action latency"""
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown isolation action {action!r}")
+        at = self.now if at is None else at
+        for c in containers:
+            self.schedule(at + self._latency(action), ENFORCE, int(c), action)
+
+    def isolate_processes(self, command, action='kill', at=None):
+        """Isolate every process running ``command``; returns how many match"""
+        if action not in PROCESS_ACTIONS:
+            raise ValueError(f"Unknown process action {action!r}")
+        at = self.now if at is None else at
+        matched = [p.pid for p in self.processes if p.command == command]
+        for pid in matched:
+            self.schedule(at + self._latency(action), ENFORCE_PROCESS, pid, action)
+        return len(matched)
+
+    def unfreeze_processes(self, command, at=None):
+        """Resume every frozen process running ``command``; returns how many were frozen"""
+        at = self.now if at is None else at
+        frozen = [p.pid for p in self.processes if p.command == command and p.frozen]
+        for pid in frozen:
+            self.schedule(at + self._latency('freeze'), UNFREEZE_PROCESS, pid)
+        return len(frozen)
+
+    def _latency(self, action):
+        return ACTION_LATENCY[action] * self.rng.lognormal(0.0, 0.5)
+
+    def reachable(self):
+        return (self.state == RUNNING) & self.proxy_up
+
+    def _tick(self, target, arg):
+        dt = self.tick
+        routed = self.routed
+        count = np.bincount(self.service, routed, self.services)
+        share = np.divide(self.rate, count, out=np.zeros(self.services), where=count > 0)
+        arrivals = share[self.service] * routed * dt
+        unrouted = self.rate * (count == 0) * dt
+        # Services left without replicas because every one of them was isolated
+        unrouted_isolation = float(unrouted[np.bincount(self.service, self.isolated, self.services)
+                                            == self.replica_count].sum())
+        unrouted = float(unrouted.sum())
+        reachable = self.reachable()
+        lost = np.where(reachable, 0.0, arrivals)
+        capacity = np.where(reachable, self.cpu_limit * REQUESTS_PER_CORE * self.workers_up / self.workers_total, 0.0)
+        work = self.backlog + arrivals - lost
+        served = np.minimum(work, capacity * dt)
+        backlog = work - served
+        overflow = np.maximum(backlog - capacity * QUEUE_SECONDS, 0.0)
+        self.backlog = backlog - overflow
+
+        busy = served > 0
+        utilization = np.minimum(arrivals[busy] / (capacity[busy] * dt), 0.99)
+        latency = SERVICE_TIME / (1.0 - utilization) + self.backlog[busy] / capacity[busy]
+        self.latency_hist += np.bincount(np.searchsorted(LATENCY_BINS, latency), served[busy],
+                                         len(LATENCY_BINS) + 1)
+
+        lost_isolation = float(lost[self.isolated].sum())
+        step = {
+            'arrived': float(arrivals.sum()) + unrouted,
+            'served': float(served.sum()),
+            'dropped_isolation': lost_isolation + unrouted_isolation,
+            'dropped_failure': float(lost.sum()) - lost_isolation,
+            'dropped_overload': float(overflow.sum()),
+            'dropped_unrouted': unrouted - unrouted_isolation,
+        }
+        minute = self.minutes.get(int(self.now // 60))
+        if minute is None:
+            minute = self.minutes[int(self.now // 60)] = dict.fromkeys(step, 0.0)
+            minute['latency_ms'] = 0.0
+            minute['seconds'] = 0.0
+        minute['seconds'] += dt
+        for key, value in step.items():
+            minute[key] += value
+            self.totals[key] += value
+        if busy.any():
+            minute['latency_ms'] += 1000.0 * float(latency @ served[busy])
+        minute['isolated'] = int(self.isolated.sum())
+        minute['compromised'] = int(self.compromised.sum())
+        minute['reachable'] = int(reachable.sum())
+        self.schedule(self.now + dt, TICK)
+
+    def _next_attack(self):
+        if self.attacks_per_hour > 0:
+            self.schedule(self.now + self.rng.exponential(3600.0 / self.attacks_per_hour), ATTACK)
+
+    def _attack(self, target, arg):
+        c = int(self.rng.integers(self.n))
+        if self.state[c] == RUNNING:
+            self._compromise(c)
+        self._next_attack()
+
+    def _compromise(self, c):
+        self.compromised[c] = True
+        self.compromised_at[c] = self.now
+        self.infection[c] += 1
+        self.counters['compromises'] += 1
+        infection = int(self.infection[c])
+        self.schedule(self.now + self.rng.exponential(self.detection_delay), DETECT, c, infection)
+        self.schedule(self.now + self.rng.exponential(self.spread_interval), SPREAD, c, infection)
+
+    def _spread(self, c, infection):
+        if self.infection[c] != infection or not self.compromised[c]:
+            return
+        self.counters['spread_attempts'] += 1
+        if self.state[c] != RUNNING:
+            # Isolation cut the attacker off; it stops trying from here
+            self.counters['spread_blocked'] += 1
+            return
+        peers = self.allowed[self.service[c]]
+        if len(peers):
+            replicas = self.replicas[peers[self.rng.integers(len(peers))]]
+            victim = int(replicas[self.rng.integers(len(replicas))])
+            if self.state[victim] == RUNNING and not self.compromised[victim]:
+                self._compromise(victim)
+        self.schedule(self.now + self.rng.exponential(self.spread_interval), SPREAD, c, infection)
+
+    def _detect(self, c, infection):
+        if self.infection[c] != infection or not self.compromised[c]:
+            return
+        self.counters['detections'] += 1
+        if self.response is not None and self.state[c] in (RUNNING, RESTARTING):
+            self.schedule(self.now + self._latency(self.response), ENFORCE, c, self.response)
+
+    def _enforce(self, c, action):
+        if self.state[c] in (ISOLATED, FROZEN, STOPPED):
+            return
+        self.counters['isolations'] += 1
+        if self.compromised[c]:
+            self.dwell_time.append(self.now - self.compromised_at[c])
+        self.state[c] = ACTIONS[action]
+        self.isolated[c] = True
+        self.totals['dropped_isolation'] += float(self.backlog[c])
+        self.backlog[c] = 0.0
+        self.generation[c] += 1
+        self.schedule(self.now + self.rng.uniform(0.0, HEALTH_CHECK) + HEALTH_CHECK, ROUTE, c)
+        if self.replace_after is not None:
+            self.schedule(self.now + self.replace_after, REPLACE, c, int(self.generation[c]))
+
+    def _enforce_process(self, pid, action):
+        process = self.processes[pid]
+        if process.frozen or (action == 'kill' and not process.up):
+            return
+        self.counters['process_isolations'] += 1
+        process.isolated = True
+        c = process.container
+        if process.role == 'proxy':
+            self.isolated[c] = True
+        if action == 'freeze':
+            # Suspended in place: queued work waits for the process to resume
+            process.frozen = True
+            self._set_process(process, False)
+            return
+        # A killed worker's share of the queue, or everything behind a killed proxy, is lost
+        if process.role == 'proxy':
+            lost = float(self.backlog[c])
+        elif process.role == 'worker':
+            lost = float(self.backlog[c]) / max(int(self.workers_up[c]), 1)
+        else:
+            lost = 0.0
+        self.totals['dropped_isolation'] += lost
+        self.backlog[c] -= lost
+        self._set_process(process, False)
+        if self.state[c] == RUNNING:
+            self.schedule(self.now + PROCESS_RESTART_DELAY * self.rng.lognormal(0.0, 0.5), PROCESS_START, pid,
+                          int(self.generation[c]))
+
+    def _set_process(self, process, up):
+        if process.up == up:
+            return
+        process.up = up
+        c = process.container
+        if process.role == 'worker':
+            self.workers_up[c] += 1 if up else -1
+        elif process.role == 'proxy':
+            self.proxy_up[c] = up
+            self.schedule(self.now + self.rng.uniform(0.0, HEALTH_CHECK) + (HEALTH_CHECK if not up else 0.0),
+                          ROUTE, c)
+
+    def _route(self, c, arg):
+        # A health check reports what it sees when it runs
+        self.routed[c] = self.state[c] == RUNNING and self.proxy_up[c]
+
+    def _schedule_oom(self, c):
+        growth = self.memory_growth[c]
+        if growth > 0:
+            left = (self.memory_limit - self.memory_base[c]) / growth
+            self.schedule(self.now + left, OOM, int(c), int(self.generation[c]))
+
+    def _oom(self, c, generation):
+        if self.generation[c] != generation or self.state[c] != RUNNING:
+            return
+        self.counters['ooms'] += 1
+        self.state[c] = RESTARTING
+        self.totals['dropped_failure'] += float(self.backlog[c])
+        self.backlog[c] = 0.0
+        self.generation[c] += 1
+        self.schedule(self.now + self.rng.uniform(0.0, HEALTH_CHECK) + HEALTH_CHECK, ROUTE, c)
+        self.schedule(self.now + RESTART_DELAY * self.rng.lognormal(0.0, 0.3), RESTARTED, c,
+                      int(self.generation[c]))
+
+    def _start(self, c):
+        """Fresh processes and memory for a container that starts running"""
+        self.state[c] = RUNNING
+        self.generation[c] += 1
+        self.memory_base[c] = self.rng.uniform(0.3, 0.6) * self.memory_limit
+        per_container = len(PROCESS_TEMPLATE)
+        processes = self.processes[c * per_container:(c + 1) * per_container]
+        for process in processes:
+            process.up = not process.frozen
+        self.workers_up[c] = sum(p.up and p.role == 'worker' for p in processes)
+        self.proxy_up[c] = all(p.up for p in processes if p.role == 'proxy')
+        self.isolated[c] = not self.proxy_up[c]
+        self.schedule(self.now + READY_DELAY, ROUTE, c)
+        self._schedule_oom(c)
+
+    def _restarted(self, c, generation):
+        if self.generation[c] != generation or self.state[c] != RESTARTING:
+            return
+        self.counters['restarts'] += 1
+        self._start(c)
+
+    def _replace(self, c, generation):
+        """The orchestrator brings up a clean replica; the isolated one is kept aside for forensics"""
+        if self.generation[c] != generation:
+            return
+        self.counters['replacements'] += 1
+        self.compromised[c] = False
+        self._start(c)
+
+    def _next_crash(self):
+        if self.crashes_per_hour > 0:
+            self.schedule(self.now + self.rng.exponential(3600.0 / self.crashes_per_hour), CRASH)
+
+    def _crash(self, target, arg):
+        process = self.processes[int(self.rng.integers(len(self.processes)))]
+        if process.up and self.state[process.container] == RUNNING:
+            self.counters['process_crashes'] += 1
+            self._set_process(process, False)
+            self.schedule(self.now + PROCESS_RESTART_DELAY * self.rng.lognormal(0.0, 0.5), PROCESS_START,
+                          process.pid, int(self.generation[process.container]))
+        self._next_crash()
+
+    def _process_start(self, pid, generation):
+        process = self.processes[pid]
+        c = process.container
+        if not process.frozen and self.generation[c] == generation:
+            if process.role == 'proxy':
+                self.isolated[c] = False
+            self._set_process(process, True)
+
+    def _unfreeze_process(self, pid, arg):
+        process = self.processes[pid]
+        if not process.frozen:
+            return
+        self.counters['process_unfreezes'] += 1
+        process.frozen = False
+        c = process.container
+        # Containers that are not running bring it back up when they next start
+        if self.state[c] == RUNNING:
+            if process.role == 'proxy':
+                self.isolated[c] = False
+            self._set_process(process, True)
+
+    def latency_percentiles(self, quantiles=(50, 95, 99)):
+        """Request latency percentiles in milliseconds over everything served so far"""
+        total = self.latency_hist.sum()
+        if not total:
+            return {f'p{q}': None for q in quantiles}
+        cumulative = np.cumsum(self.latency_hist) / total
+        edges = np.concatenate([LATENCY_BINS, LATENCY_BINS[-1:]])
+        return {f'p{q}': round(1000.0 * float(edges[np.searchsorted(cumulative, q / 100.0)]), 1)
+                for q in quantiles}
+
+    def timeline(self):
+        """Per-minute throughput (requests/s), drops, mean latency and container counts
+
+        Rates are over the simulated seconds each minute actually covered.
+        """
+        rows = []
+        for minute in sorted(self.minutes):
+            values = self.minutes[minute]
+            dropped = sum(v for k, v in values.items() if k.startswith('dropped_'))
+            rows.append({
+                'minute': minute,
+                'seconds': values['seconds'],
+                'throughput': values['served'] / values['seconds'],
+                'dropped': dropped,
+                'latency_ms': values['latency_ms'] / values['served'] if values['served'] else None,
+                'isolated': values['isolated'],
+                'compromised': values['compromised'],
+                'reachable': values['reachable'],
+            })
+        return rows
+
+    def report(self):
+        totals = self.totals
+        arrived = totals['arrived'] or 1.0
+        dropped = sum(v for k, v in totals.items() if k.startswith('dropped_'))
+        return {
+            'containers': self.n,
+            'services': self.services,
+            'processes': len(self.processes),
+            'simulated_seconds': self.now,
+            'wall_seconds': round(getattr(self, 'wall_seconds', 0.0), 3),
+            'events': self.events_processed,
+            'requests': {key: round(value) for key, value in totals.items()},
+            'throughput_rps': round(totals['served'] / self.now, 1) if self.now else 0.0,
+            'availability_pct': round(100.0 * totals['served'] / arrived, 3),
+            'isolation_impact_pct': round(100.0 * totals['dropped_isolation'] / arrived, 3),
+            'dropped_pct': round(100.0 * dropped / arrived, 3),
+            'latency_ms': self.latency_percentiles(),
+            'isolation': {
+                **self.counters,
+                'isolated_now': int(self.isolated.sum()),
+                'compromised_now': int(self.compromised.sum()),
+                'mean_dwell_seconds': round(float(np.mean(self.dwell_time)), 1) if self.dwell_time else None,
+            },
+            'states': {name: int((self.state == state).sum()) for state, name in enumerate(STATE_NAMES)},
+        }
@@ -0,0 +1,289 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.log_parser import LogBatch, parse_lines, format_ipv4
+
+# Attack stages in kill-chain order and the stage each AttackSim attack type belongs to
+STAGES = ['Initial Access', 'Execution', 'Privilege Escalation', 'Exfiltration', 'Impact']
+
+ATTACK_STAGES = {
+    'Failed password attempt': 0,
+    'Unauthorized access': 0,
+    'SQL injection': 0,
+    'Cross-site scripting (XSS)': 0,
+    'Intrusion detected': 1,
+    'Malicious payload detected': 1,
+    'Privilege escalation': 2,
+    'Data exfiltration': 3,
+    'DDoS attack': 4,
+}
+
+# Base severity (0-10) of a single event of each attack type
+ATTACK_SEVERITY = {
+    'Failed password attempt': 2.0,
+    'Cross-site scripting (XSS)': 4.0,
+    'Unauthorized access': 5.0,
+    'SQL injection': 6.0,
+    'Intrusion detected': 6.0,
+    'DDoS attack': 6.5,
+    'Malicious payload detected': 7.0,
+    'Privilege escalation': 8.0,
+    'Data exfiltration': 9.0,
+}
+
+SEVERITY_LABELS = [(8.0, 'Critical'), (6.0, 'High'), (4.0, 'Medium'), (0.0, 'Low')]
+
+
+class Incident:
+    """Events from related sources that arrived close together in time"""
+
+    __slots__ = ('incident_id', 'first_seen', 'last_seen', 'events', 'sources', 'type_counts',
+                 'stage_first_seen', 'keys', 'members')
+
+    def __init__(self, incident_id, timestamp):
+        self.incident_id = incident_id
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.events = 0
+        self.sources = set()
+        self.type_counts = {}
+        self.stage_first_seen = {}
+        self.keys = []
+        self.members = [incident_id]
+
+    def add(self, timestamp, ip, attack_type, stage):
+        self.events += 1
+        self.first_seen = min(self.first_seen, timestamp)
+        self.last_seen = max(self.last_seen, timestamp)
+        self.sources.add(ip)
+        self.type_counts[attack_type] = self.type_counts.get(attack_type, 0) + 1
+        if stage is not None and timestamp < self.stage_first_seen.get(stage, math.inf):
+            self.stage_first_seen[stage] = timestamp
+
+    def absorb(self, other):
+        self.events += other.events
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+        self.sources |= other.sources
+        for attack_type, count in other.type_counts.items():
+            self.type_counts[attack_type] = self.type_counts.get(attack_type, 0) + count
+        for stage, timestamp in other.stage_first_seen.items():
+            if timestamp < self.stage_first_seen.get(stage, math.inf):
+                self.stage_first_seen[stage] = timestamp
+        self.keys.extend(other.keys)
+        self.members.extend(other.members)
+
+    @property
+    def stage_progression(self):
+        return [STAGES[stage] for stage, _ in sorted(self.stage_first_seen.items(), key=lambda item: item[1])]
+
+    @property
+    def severity(self):
+        """0-10: worst event, plus stage progression, spread across sources and volume"""
+        worst = max((ATTACK_SEVERITY.get(t, 3.0) for t in self.type_counts), default=0.0)
+        progression = 1.0 * (len(self.stage_first_seen) - 1) if self.stage_first_seen else 0.0
+        spread = 0.5 * math.log2(len(self.sources)) if self.sources else 0.0
+        volume = 0.5 * math.log10(self.events) if self.events else 0.0
+        return round(min(10.0, worst + progression + spread + volume), 1)
+
+    @property
+    def severity_label(self):
+        severity = self.severity
+        return next(label for floor, label in SEVERITY_LABELS if severity >= floor)
+
+    @property
+    def incident_type(self):
+        """Recovery plan category for the incident"""
+        types = self.type_counts
+        stages = self.stage_first_seen
+        if 'Data exfiltration' in types:
+            return 'Data Breach'
+        if 'Malicious payload detected' in types and 2 in stages:
+            return 'Ransomware'
+        if types.get('DDoS attack', 0) * 2 >= self.events:
+            return 'DDoS Attack'
+        return 'System Compromise'
+
+    def to_dict(self):
+        return {
+            'Incident': self.incident_id,
+            'Type': self.incident_type,
+            'Severity': self.severity,
+            'Level': self.severity_label,
+            'Events': self.events,
+            'Sources': len(self.sources),
+            'First Seen': np.datetime64(int(self.first_seen), 's'),
+            'Last Seen': np.datetime64(int(self.last_seen), 's'),
+            'Stages': ' → '.join(self.stage_progression),
+            'Source IPs': ', '.join(format_ipv4(ip) for ip in sorted(self.sources)[:5]),
+        }
+
+
+class IncidentCorrelator:
+    """Streaming union-find over sources, merging events into incidents
+
+    Every event touches two keys: its source IP and its source subnet. A key
+    remembers the incident it last joined and stays live for ``ip_window``
+    (or ``subnet_window``) seconds of event time; an event whose live keys
+    point at different incidents unions them. Incidents with no event for
+    longer than the larger window can no longer be joined, so they are
+    closed and their keys dropped: memory is bounded by the active incidents,
+    not by the length of the stream.
+    """
+
+    def __init__(self, ip_window=900, subnet_window=300, subnet_prefix=24, max_closed=10000, on_close=None):
+        self.ip_window = ip_window
+        self.subnet_window = subnet_window
+        self.subnet_shift = 32 - subnet_prefix
+        self.horizon = max(ip_window, subnet_window)
+        self.max_closed = max_closed
+        self.on_close = on_close
+        self.parent = {}
+        self.incidents = OrderedDict()
+        self.keys = {}
+        self.closed = []
+        self.next_id = 1
+        self.clock = -math.inf
+        self.events = 0
+
+    def find(self, incident_id):
+        root = incident_id
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[incident_id] != root:
+            self.parent[incident_id], incident_id = root, self.parent[incident_id]
+        return root
+
+    def _union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        # Merge the smaller incident into the larger so key lists move at most log(n) times
+        if self.incidents[a].events < self.incidents[b].events:
+            a, b = b, a
+        self.incidents[a].absorb(self.incidents.pop(b))
+        self.parent[b] = a
+        return a
+
+    def _live(self, key, timestamp, window):
+        entry = self.keys.get(key)
+        if entry is None or timestamp - entry[1] > window:
+            return None
+        return self.find(entry[0])
+
+    def _touch(self, key, incident_id, timestamp):
+        entry = self.keys.get(key)
+        if entry is None or self.find(entry[0]) != incident_id:
+            # Whoever owns a key last is responsible for dropping it on close
+            self.incidents[incident_id].keys.append(key)
+        self.keys[key] = (incident_id, max(timestamp, entry[1]) if entry else timestamp)
+
+    def add_event(self, timestamp, ip, attack_type):
+        ip_key = ('ip', ip)
+        net_key = ('net', ip >> self.subnet_shift)
+        by_ip = self._live(ip_key, timestamp, self.ip_window)
+        by_net = self._live(net_key, timestamp, self.subnet_window)
+
+        if by_ip is None and by_net is None:
+            incident_id = self.next_id
+            self.next_id += 1
+            self.parent[incident_id] = incident_id
+            self.incidents[incident_id] = Incident(incident_id, timestamp)
+        elif by_ip is None or by_net is None or by_ip == by_net:
+            incident_id = by_ip if by_ip is not None else by_net
+        else:
+            incident_id = self._union(by_ip, by_net)
+
+        incident = self.incidents[incident_id]
+        incident.add(timestamp, ip, attack_type, ATTACK_STAGES.get(attack_type))
+        self.incidents.move_to_end(incident_id)
+        self._touch(ip_key, incident_id, timestamp)
+        self._touch(net_key, incident_id, timestamp)
+        self.events += 1
+        if timestamp > self.clock:
+            self.clock = timestamp
+
+    def expire(self, now=None):
+        """Close incidents that no future event can join; returns them"""
+        now = self.clock if now is None else now
+        closed = []
+        # Incidents are kept in order of last update, so the stale ones are at the front
+        while self.incidents:
+            incident_id, incident = next(iter(self.incidents.items()))
+            if now - incident.last_seen <= self.horizon:
+                break
+            closed.append(self._close(incident_id))
+        return closed
+
+    def _close(self, incident_id):
+        incident = self.incidents.pop(incident_id)
+        for key in incident.keys:
+            entry = self.keys.get(key)
+            if entry is not None and self.find(entry[0]) == incident_id:
+                del self.keys[key]
+        # Drop the union-find entries of every incident merged into this one
+        for member in incident.members:
+            del self.parent[member]
+        self.closed.append(incident)
+        if self.max_closed is not None and len(self.closed) > self.max_closed:
+            del self.closed[:len(self.closed) - self.max_closed]
+        if self.on_close is not None:
+            self.on_close(incident)
+        return incident
+
+    def process(self, batch):
+        """Correlate a batch of log lines in timestamp order; returns incidents closed by it"""
+        if not isinstance(batch, LogBatch):
+            batch = parse_lines(batch)
+        usable = batch.ip_valid & ~np.isnat(batch.timestamp)
+        order = np.flatnonzero(usable)
+        seconds = batch.timestamp[order].astype(np.int64)
+        order = order[np.argsort(seconds, kind='stable')]
+        seconds = batch.timestamp[order].astype(np.int64).tolist()
+        ips = batch.ip[order].tolist()
+        codes, attack_types = batch.column('attack_type')
+        names = [attack_types[c] for c in codes[order].tolist()]
+
+        closed = []
+        last_expiry = None
+        for timestamp, ip, attack_type in zip(seconds, ips, names):
+            self.add_event(timestamp, ip, attack_type)
+            # Expiry only needs to run when event time has moved on
+            if last_expiry is None or timestamp - last_expiry >= 60:
+                closed.extend(self.expire(timestamp))
+                last_expiry = timestamp
+        return closed
+
+    def flush(self):
+        """Close every active incident, e.g. at the end of a log file"""
+        closed = []
+        while self.incidents:
+            closed.append(self._close(next(iter(self.incidents))))
+        return closed
+
+    def active(self):
+        return list(self.incidents.values())
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'active_incidents': len(self.incidents),
+            'live_keys': len(self.keys),
+            'union_find_entries': len(self.parent),
+            'closed_incidents': len(self.closed),
+        }
+
+
+def correlate_log(path, chunk_bytes=4 * 1024 * 1024, **options):
+    """All incidents in a log file, most severe first"""
+    from utils.log_parser import read_log
+
+    correlator = IncidentCorrelator(max_closed=None, **options)
+    incidents = []
+    for batch in read_log(path, chunk_bytes=chunk_bytes):
+        incidents.extend(correlator.process(batch))
+    incidents.extend(correlator.flush())
+    incidents.sort(key=lambda incident: (incident.severity, incident.events), reverse=True)
+    return incidents
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+
+
+class DeepTrainingDriver:
+    """Epoch loop around a compiled Keras model with early stopping and checkpoint/resume
+
+    * Input is fed through ``tf.data`` with batching and prefetching, so the
+      next batch is prepared while the current one trains.
+    * Large batches get a scaled learning rate (``'linear'`` or ``'sqrt'``
+      against ``base_batch_size``), reached after a short linear warmup.
+    * Validation loss drives early stopping; the best weights are restored
+      at the end.
+    * Every ``checkpoint_every`` epochs the model (with optimizer state) and
+      the driver state are written to ``checkpoint_dir``. Each epoch shuffles
+      with a seed derived from the epoch number, so a resumed run replays
+      exactly the batches the interrupted run would have seen. The state
+      records a fingerprint of the data, model architecture and driver
+      settings; a checkpoint from a different run is discarded, not resumed.
+    """
+
+    def __init__(self, model, checkpoint_dir=None, batch_size=256, base_batch_size=32, base_learning_rate=1e-3,
+                 lr_scaling='sqrt', warmup_epochs=3, validation_split=0.1, patience=20, min_delta=1e-4,
+                 checkpoint_every=5, seed=42, verbose=True):
+        if lr_scaling not in ('linear', 'sqrt', None):
+            raise ValueError("lr_scaling must be 'linear', 'sqrt' or None")
+        self.model = model
+        self.checkpoint_dir = checkpoint_dir
+        self.batch_size = batch_size
+        self.base_batch_size = base_batch_size
+        self.base_learning_rate = base_learning_rate
+        self.lr_scaling = lr_scaling
+        self.warmup_epochs = warmup_epochs
+        self.validation_split = validation_split
+        self.patience = patience
+        self.min_delta = min_delta
+        self.checkpoint_every = checkpoint_every
+        self.seed = seed
+        self.verbose = verbose
+        self.history = []
+
+    # -- schedule -------------------------------------------------------------
+
+    @property
+    def target_learning_rate(self):
+        ratio = self.batch_size / self.base_batch_size
+        if self.lr_scaling == 'linear':
+            return self.base_learning_rate * ratio
+        if self.lr_scaling == 'sqrt':
+            return self.base_learning_rate * math.sqrt(ratio)
+        return self.base_learning_rate
+
+    def learning_rate(self, epoch):
+        target = self.target_learning_rate
+        if epoch >= self.warmup_epochs:
+            return target
+        return self.base_learning_rate + (target - self.base_learning_rate) * (epoch + 1) / (self.warmup_epochs + 1)
+
+    # -- data -------------------------------------------------------------------
+
+    def split(self, X, y):
+        rng = np.random.default_rng(self.seed)
+        order = rng.permutation(len(y))
+        n_val = int(round(len(y) * self.validation_split))
+        val, train = order[:n_val], order[n_val:]
+        return X[train], y[train], X[val], y[val]
+
+    def dataset(self, X, y, epoch=None):
+        data = tf.data.Dataset.from_tensor_slices((X, y))
+        if epoch is not None:
+            data = data.shuffle(len(y), seed=self.seed + epoch, reshuffle_each_iteration=False)
+        return data.batch(self.batch_size).prefetch(tf.data.AUTOTUNE)
+
+    # -- checkpoints ----------------------------------------------------------
+
+    def _paths(self):
+        return (os.path.join(self.checkpoint_dir, 'latest.keras'),
+                os.path.join(self.checkpoint_dir, 'best.weights.h5'),
+                os.path.join(self.checkpoint_dir, 'state.json'))
+
+    def fingerprint(self, X, y, X_val, y_val):
+        """Hash of the training data, model architecture and the settings that shape a run"""
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (X, y, X_val, y_val):
+            digest.update(repr((array.shape, array.dtype.str)).encode())
+            digest.update(np.ascontiguousarray(array).data)
+        # Layer configs without their names, which Keras numbers per process
+        layers = [(type(layer).__name__, {k: v for k, v in layer.get_config().items() if k != 'name'})
+                  for layer in self.model.layers]
+        digest.update(json.dumps(layers, sort_keys=True, default=str).encode())
+        digest.update(repr((self.batch_size, self.base_batch_size, self.base_learning_rate, self.lr_scaling,
+                            self.warmup_epochs, self.validation_split, self.seed)).encode())
+        return digest.hexdigest()
+
+    def _save_checkpoint(self, state):
+        model_path, _, state_path = self._paths()
+        # Write to temporary names and swap in, so a crash never leaves a torn checkpoint
+        tmp_model = model_path.replace('.keras', '.tmp.keras')
+        self.model.save(tmp_model)
+        os.replace(tmp_model, model_path)
+        tmp_state = state_path + '.tmp'
+        with open(tmp_state, 'w') as f:
+            json.dump({**state, 'history': self.history}, f)
+        os.replace(tmp_state, state_path)
+
+    def _save_best(self):
+        _, best_path, _ = self._paths()
+        tmp_best = best_path.replace('.weights.h5', '.tmp.weights.h5')
+        self.model.save_weights(tmp_best)
+        os.replace(tmp_best, best_path)
+
+    def _restore(self, fingerprint):
+        model_path, best_path, state_path = self._paths()
+        if not (os.path.exists(model_path) and os.path.exists(state_path)):
+            return None
+        with open(state_path) as f:
+            state = json.load(f)
+        if state.get('fingerprint') != fingerprint:
+            # Another dataset, architecture or configuration: its weights must not seed this run
+            if self.verbose:
+                print(f"Ignoring checkpoint in {self.checkpoint_dir} from a different training run")
+            for path in (model_path, best_path, state_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return None
+        self.model = load_model(model_path)
+        self.history = state.pop('history', [])
+        if self.verbose:
+            print(f"Resuming from checkpoint at epoch {state['epoch']}")
+        return state
+
+    # -- training ---------------------------------------------------------------
+
+    def fit(self, X, y, epochs=500, X_val=None, y_val=None):
+        """Train until ``epochs`` or early stopping; returns the per-epoch history"""
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float32)
+        if X_val is None:
+            X, y, X_val, y_val = self.split(X, y)
+        else:
+            X_val = np.asarray(X_val, dtype=np.float32)
+            y_val = np.asarray(y_val, dtype=np.float32)
+
+        state = {'epoch': 0, 'best_loss': float('inf'), 'best_epoch': -1, 'wait': 0}
+        self._best_weights = None
+        if self.checkpoint_dir:
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            state['fingerprint'] = self.fingerprint(X, y, X_val, y_val)
+            state = self._restore(state['fingerprint']) or state
+        else:
+            self.history = []
+
+        val_data = self.dataset(X_val, y_val) if len(y_val) else None
+        # A run that already stopped early has nothing left to resume
+        first_epoch = epochs if state['wait'] >= self.patience else state['epoch']
+        for epoch in range(first_epoch, epochs):
+            lr = self.learning_rate(epoch)
+            self.model.optimizer.learning_rate.assign(lr)
+
+            start = time.perf_counter()
+            result = self.model.fit(self.dataset(X, y, epoch), validation_data=val_data,
+                                    initial_epoch=epoch, epochs=epoch + 1, verbose=0)
+            seconds = time.perf_counter() - start
+
+            metrics = {k: float(v[-1]) for k, v in result.history.items()}
+            metrics.update({'epoch': epoch + 1, 'learning_rate': lr, 'seconds': seconds,
+                            'samples_per_second': len(y) / seconds if seconds else float('inf')})
+            self.history.append(metrics)
+            if self.verbose:
+                print(f"Epoch {epoch + 1}/{epochs} - loss {metrics['loss']:.4f}"
+                      f" - val_loss {metrics.get('val_loss', float('nan')):.4f}"
+                      f" - {metrics['samples_per_second']:.0f} samples/s")
+
+            monitored = metrics.get('val_loss', metrics['loss'])
+            if monitored < state['best_loss'] - self.min_delta:
+                state.update(best_loss=monitored, best_epoch=epoch + 1, wait=0)
+                if self.checkpoint_dir:
+                    self._save_best()
+                else:
+                    self._best_weights = self.model.get_weights()
+            else:
+                state['wait'] += 1
+            state['epoch'] = epoch + 1
+
+            stop = state['wait'] >= self.patience
+            if self.checkpoint_dir and (stop or state['epoch'] % self.checkpoint_every == 0 or state['epoch'] == epochs):
+                self._save_checkpoint(state)
+            if stop:
+                if self.verbose:
+                    print(f"Early stopping at epoch {epoch + 1}, best epoch {state['best_epoch']}")
+                break
+
+        self._restore_best()
+        return self.history
+
+    def _restore_best(self):
+        if self.checkpoint_dir:
+            _, best_path, _ = self._paths()
+            if os.path.exists(best_path):
+                self.model.load_weights(best_path)
+        elif self._best_weights is not None:
+            self.model.set_weights(self._best_weights)
+
+    def throughput(self):
+        """Mean training throughput in samples/s over the epochs run so far"""
+        rates = [h['samples_per_second'] for h in self.history]
+        return sum(rates) / len(rates) if rates else 0.0
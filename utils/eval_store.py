@@ -0,0 +1,139 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    dataset TEXT NOT NULL,
+    pipeline TEXT NOT NULL,
+    params TEXT NOT NULL,
+    fold TEXT NOT NULL,
+    n_resources INTEGER,
+    score REAL,
+    fit_time REAL,
+    artifact TEXT,
+    params_blob BLOB NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (dataset, pipeline, params, fold)
+);
+CREATE INDEX IF NOT EXISTS evaluations_by_search ON evaluations (dataset, pipeline, n_resources);
+"""
+
+# Fold name used for the final refit on the whole training set
+REFIT_FOLD = 'refit'
+
+
+def params_key(params):
+    """Canonical text form of a parameter dict, independent of key order"""
+    return repr(sorted((k, repr(v)) for k, v in params.items()))
+
+
+class EvaluationStore:
+    """Persistent record of cross-validation fits, shared between training runs
+
+    Each row maps (dataset hash, pipeline spec, parameters, fold) to the fold
+    score, the fit time and optionally a saved model artifact. The store is a
+    SQLite database in WAL mode with one connection per thread, so parallel
+    searches in one process, and separate training processes, can read and
+    write it at the same time.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def __getstate__(self):
+        return {'path': self.path, 'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self.timeout = state['timeout']
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, dataset, pipeline, params_list, fold):
+        """Return {params_key: (score, fit_time)} for the candidates already fitted on this fold"""
+        keys = [params_key(p) for p in params_list]
+        found = {}
+        conn = self._connect()
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT params, score, fit_time FROM evaluations "
+                f"WHERE dataset = ? AND pipeline = ? AND fold = ? AND params IN ({','.join('?' * len(chunk))})",
+                [dataset, pipeline, fold, *chunk],
+            )
+            for key, score, fit_time in rows:
+                found[key] = (float('nan') if score is None else score, fit_time)
+        return found
+
+    def record(self, dataset, pipeline, rows):
+        """Store (params, fold, n_resources, score, fit_time) tuples from one wave of fits"""
+        now = time.time()
+        values = [
+            (dataset, pipeline, params_key(params), fold, n_resources, score, fit_time,
+             pickle.dumps(params), now)
+            for params, fold, n_resources, score, fit_time in rows
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO evaluations "
+                "(dataset, pipeline, params, fold, n_resources, score, fit_time, params_blob, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values,
+            )
+
+    def record_artifact(self, dataset, pipeline, params, score, fit_time, artifact):
+        """Record the refit of a winning candidate and where its model was saved"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO evaluations "
+                "(dataset, pipeline, params, fold, score, fit_time, artifact, params_blob, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (dataset, pipeline, params_key(params), REFIT_FOLD, score, fit_time, artifact,
+                 pickle.dumps(params), time.time()),
+            )
+
+    def best_candidates(self, dataset, pipeline, n_resources, n_folds, limit=10):
+        """Best previously completed candidates at the given resource level, best first"""
+        rows = self._connect().execute(
+            "SELECT params_blob, AVG(score) AS mean_score FROM evaluations "
+            "WHERE dataset = ? AND pipeline = ? AND n_resources = ? AND fold != ? AND score IS NOT NULL "
+            "GROUP BY params HAVING COUNT(*) >= ? ORDER BY mean_score DESC LIMIT ?",
+            (dataset, pipeline, n_resources, REFIT_FOLD, n_folds, limit),
+        )
+        return [(pickle.loads(blob), mean_score) for blob, mean_score in rows]
+
+    def artifact(self, dataset, pipeline, params):
+        row = self._connect().execute(
+            "SELECT artifact FROM evaluations WHERE dataset = ? AND pipeline = ? AND params = ? AND fold = ?",
+            (dataset, pipeline, params_key(params), REFIT_FOLD),
+        ).fetchone()
+        return row[0] if row else None
+
+    def count(self, dataset=None, pipeline=None):
+        query, args = "SELECT COUNT(*) FROM evaluations WHERE fold != ?", [REFIT_FOLD]
+        if dataset is not None:
+            query += " AND dataset = ?"
+            args.append(dataset)
+        if pipeline is not None:
+            query += " AND pipeline = ?"
+            args.append(pipeline)
+        return self._connect().execute(query, args).fetchone()[0]
@@ -1,29 +1,35 @@
 import requests
 from datetime import datetime, timedelta
 
-def get_recent_exploits(days_back=7):
+# Note: This is a simulated API endpoint; benchmarks point it at a local stand-in
+API_URL = "https://exploit-db.com/api/exploits"
+
+def get_recent_exploits(days_back=7, with_codes=False):
+    """Recent Exploit-DB entries as [id, title, type, platform, date], plus their codes (CVE ids) if with_codes"""
     try:
-        # Note: This is a simulated API endpoint
-        url = "https://exploit-db.com/api/exploits"
+        url = API_URL
         params = {
             "start_date": (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d"),
             "end_date": datetime.now().strftime("%Y-%m-%d")
         }
         
-        response = requests.get(url, params=params)
+        response = requests.get(url, params=params, timeout=10)
         if response.status_code == 200:
             data = response.json()
             exploits = []
             for exploit in data.get('exploits', []):
-                exploits.append([
+                row = [
                     exploit.get('id'),
                     exploit.get('title'),
                     exploit.get('type'),
                     exploit.get('platform'),
                     exploit.get('date')
-                ])
+                ]
+                if with_codes:
+                    row.append(exploit.get('codes') or '')
+                exploits.append(row)
             return exploits
         return None
     except Exception as e:
-        st.error(f"Error fetching Exploit-DB data: {str(e)}")
+        print(f"Error fetching Exploit-DB data: {str(e)}")
         return None
@@ -0,0 +1,128 @@
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+CVE_ID = re.compile(r'CVE-\d{4}-\d{4,}', re.I)
+
+# Terms added to a category's name when matching exploit titles
+CATEGORY_TERMS = {
+    'SQL Injection': 'sql injection sqli blind union query database',
+    'Remote Code Execution': 'remote code execution rce command injection arbitrary deserialization upload',
+    'Buffer Overflow': 'buffer overflow stack heap overrun memory corruption seh',
+    'Cross-Site Scripting': 'cross site scripting xss stored reflected dom',
+    'Authentication Bypass': 'authentication bypass auth login unauthenticated credentials privilege',
+}
+
+# Exploit-DB types and platforms that fit each system type, and words to look for in titles
+SYSTEM_PROFILES = {
+    'Web Application': ({'webapps'}, {'php', 'asp', 'aspx', 'jsp', 'cgi', 'java', 'nodejs', 'python', 'ruby',
+                                      'multiple'}, 'web http cms plugin wordpress joomla drupal admin panel'),
+    'Network Service': ({'remote', 'dos'}, {'hardware', 'multiple', 'linux', 'windows', 'unix', 'bsd'},
+                        'server service daemon remote network router ftp smtp ssh snmp'),
+    'Operating System': ({'local'}, {'windows', 'linux', 'macos', 'osx', 'freebsd', 'unix', 'android', 'ios',
+                                     'solaris'}, 'kernel privilege escalation local driver windows linux'),
+    'Database': ({'remote', 'webapps'}, {'multiple', 'linux', 'windows'},
+                 'database mysql mariadb postgresql oracle mssql mongodb redis sqlite'),
+}
+
+# Relevance is a weighted sum of these parts, each scaled to 0..1
+WEIGHTS = {'text': 0.5, 'platform': 0.2, 'recency': 0.15, 'cvss': 0.15}
+HALF_LIFE_DAYS = 180.0
+# Exploits whose CVE has no known score count as medium severity
+DEFAULT_CVSS = 5.0
+
+
+class ExploitRanker:
+    """Relevance ranking of Exploit-DB entries for a pentest's system type and categories
+
+    Titles, types and platforms are indexed once as an L2-normalised
+    TF-IDF matrix; ranking is one sparse matrix-vector product for the
+    cosine similarity to the query plus vectorised platform, recency and
+    CVSS terms, and the top k come from a partial sort. Rows are
+    ``[id, title, type, platform, date]`` as exploit_db returns them,
+    optionally followed by Exploit-DB's ``codes`` field listing CVE ids.
+    ``cve_scores`` maps CVE ids to CVSS base scores.
+    """
+
+    def __init__(self, exploits, cve_scores=None):
+        self.exploits = exploits
+        self.vectorizer = TfidfVectorizer(sublinear_tf=True, stop_words='english', dtype=np.float32)
+        self.matrix = self.vectorizer.fit_transform(
+            f'{row[1]} {row[2] or ""} {row[3] or ""}' for row in exploits).tocsr() if exploits else None
+        # Types and platforms as codes into their few distinct values
+        self.type_names, self.types = np.unique([str(row[2] or '').lower() for row in exploits],
+                                                return_inverse=True)
+        self.platform_names, self.platforms = np.unique([str(row[3] or '').lower() for row in exploits],
+                                                        return_inverse=True)
+        dates = pd.to_datetime(pd.Series([row[4] for row in exploits], dtype=object), errors='coerce')
+        # Days since the epoch; undated exploits count as very old
+        self.days = (dates.values.astype('datetime64[D]').astype(np.float64))
+        self.days[dates.isna().values] = -np.inf
+        self.cvss = np.full(len(exploits), DEFAULT_CVSS, dtype=np.float32)
+        self.cves = [self._cve(row) for row in exploits]
+        self._profiles = {}
+        if cve_scores:
+            self.update_cvss(cve_scores)
+
+    @staticmethod
+    def _cve(row):
+        match = CVE_ID.search(' '.join(str(field) for field in row[5:6] + row[1:2] if field))
+        return match.group(0).upper() if match else None
+
+    def __len__(self):
+        return len(self.exploits)
+
+    def update_cvss(self, cve_scores):
+        """Take CVSS base scores from a ``{cve_id: score}`` mapping, e.g. from nvd_helper"""
+        for i, cve in enumerate(self.cves):
+            if cve is not None and cve_scores.get(cve) is not None:
+                self.cvss[i] = cve_scores[cve]
+
+    def _platform_match(self, system_type):
+        """Per-exploit 0..1 fit of type and platform to a system type, computed once per type"""
+        match = self._profiles.get(system_type)
+        if match is None:
+            types, platforms, _ = SYSTEM_PROFILES.get(system_type, (set(), set(), ''))
+            type_fit = np.isin(self.type_names, list(types))[self.types]
+            platform_fit = np.isin(self.platform_names, list(platforms))[self.platforms]
+            match = self._profiles[system_type] = (0.5 * type_fit + 0.5 * platform_fit).astype(np.float32)
+        return match
+
+    def query(self, system_type, categories):
+        terms = [f'{category} {CATEGORY_TERMS.get(category, "")}' for category in categories]
+        return ' '.join(terms + [SYSTEM_PROFILES.get(system_type, (None, None, ''))[2]])
+
+    def rank(self, system_type, categories, k=5, now=None):
+        """Indices and scores of the ``k`` most relevant exploits, best first, and how many matched
+
+        Only exploits sharing a term with the selected categories are
+        candidates; system type terms add to the similarity but do not
+        make an exploit a candidate on their own.
+        """
+        if not len(self) or not categories:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32), 0
+        vectors = self.vectorizer.transform([self.query(None, categories), self.query(system_type, categories)])
+        # Rows are L2-normalised, so a dot product is the cosine similarity
+        products = self.matrix @ vectors.T.toarray()
+        candidates = products[:, 0] > 0
+        similarity = products[:, 1]
+        today = (now if now is not None else time.time()) / 86400.0
+        recency = np.exp2(-np.maximum(today - self.days, 0.0) / HALF_LIFE_DAYS)
+        score = (WEIGHTS['text'] * similarity + WEIGHTS['platform'] * self._platform_match(system_type)
+                 + WEIGHTS['recency'] * recency + WEIGHTS['cvss'] * self.cvss / 10.0)
+        score = np.where(candidates, score, -np.inf)
+        matched = int(candidates.sum())
+        k = min(k, matched)
+        if k == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32), 0
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top], kind='stable')]
+        return top, score[top], matched
+
+    def top(self, system_type, categories, k=5, now=None):
+        """The ``k`` most relevant exploit rows with their relevance appended, and the number of matches"""
+        indices, scores, matched = self.rank(system_type, categories, k, now)
+        return [list(self.exploits[i][:5]) + [round(float(s), 3)] for i, s in zip(indices, scores)], matched
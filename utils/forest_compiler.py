@@ -0,0 +1,219 @@
+import time
+
+import numpy as np
+import sklearn
+from sklearn.pipeline import Pipeline
+
+# Scikit-learn stores per-node class fractions from 1.4 onwards; older
+# releases store weighted counts and normalize inside predict_proba.
+_SKLEARN_VERSION = tuple(int(p) for p in sklearn.__version__.split('.')[:2] if p.isdigit())
+_VALUES_ARE_FRACTIONS = _SKLEARN_VERSION >= (1, 4)
+
+# Largest batch the compiled path serves. Its cost grows with batch size,
+# while the stock forest mostly pays a fixed per-tree dispatch cost. For a
+# 100-tree forest the compiled path is 9x faster at 1 row, 1.35x at 300,
+# even at 500 and 0.26x at 10k, so larger batches go to the stock model.
+MAX_COMPILED_BATCH = 256
+
+
+def _float32_floor(threshold):
+    """Round float64 thresholds down to the largest float32 not above them"""
+    reduced = threshold.astype(np.float32)
+    too_high = reduced.astype(np.float64) > threshold
+    reduced[too_high] = np.nextafter(reduced[too_high], np.float32(-np.inf))
+    return reduced
+
+
+class CompiledForest:
+    """Random forest flattened into packed node arrays for batched inference
+
+    Every tree is laid out back to back in ``feature``, ``threshold``,
+    ``children`` and ``value``. ``children[2 * node + go_left]`` holds the
+    next node, so a whole batch is pushed through all trees one level at a
+    time with a handful of NumPy gathers per level.
+
+    Batches of more than ``max_batch`` rows are passed to ``stock``, the
+    fitted model this was compiled from, when one is given.
+    """
+
+    def __init__(self, forest, preprocessor=None, threshold_dtype=np.float64, chunk_size=4096, stock=None,
+                 max_batch=MAX_COMPILED_BATCH):
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        self.preprocessor = preprocessor
+        self.classes_ = forest.classes_
+        self.n_features = forest.n_features_in_
+        self.n_trees = len(forest.estimators_)
+        self.chunk_size = chunk_size
+        self.stock = stock
+        self.max_batch = max_batch
+
+        features, thresholds, lefts, rights, values, missing_left, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        n_classes = len(self.classes_)
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            value = tree.value[:, 0, :n_classes].astype(np.float64)
+            if not _VALUES_ARE_FRACTIONS:
+                normalizer = value.sum(axis=1)
+                normalizer[normalizer == 0.0] = 1.0
+                value /= normalizer[:, np.newaxis]
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(left)
+            rights.append(right)
+            values.append(value)
+            mgl = getattr(tree, 'missing_go_to_left', None)
+            missing_left.append(np.zeros(tree.node_count, dtype=bool) if mgl is None else mgl.astype(bool))
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        threshold = np.concatenate(thresholds).astype(np.float64)
+        if np.dtype(threshold_dtype) == np.float32:
+            # Inputs are compared as float32, so flooring keeps every split exact
+            self.threshold = _float32_floor(threshold)
+        elif np.dtype(threshold_dtype) == np.float64:
+            self.threshold = threshold
+        else:
+            raise ValueError("threshold_dtype must be float32 or float64")
+        self.children = np.column_stack([np.concatenate(rights), np.concatenate(lefts)]).astype(np.intp).ravel()
+        self.is_leaf = np.concatenate(lefts) == np.arange(offset)
+        self.value = np.concatenate(values)
+        self.missing_go_to_left = np.concatenate(missing_left)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _prepare(self, X):
+        if isinstance(X, dict):
+            X = np.array([list(X.values())])
+        if self.preprocessor is not None:
+            X = self.preprocessor.transform(X)
+        # Trees are fitted on float32 inputs, comparisons must use the same cast
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input with {self.n_features} features, got shape {X.shape}")
+        return X
+
+    def _leaves(self, X):
+        """Return the leaf reached by every sample in every tree, shape (n_trees, n_samples)"""
+        n_samples = X.shape[0]
+        flat = X.ravel()
+        leaves = np.repeat(self.roots, n_samples)
+        row_offsets = np.tile(np.arange(n_samples, dtype=np.intp) * self.n_features, self.n_trees)
+        has_nan = np.isnan(flat).any()
+
+        # Only (tree, sample) paths that have not reached a leaf are carried
+        # to the next level, so shallow trees stop costing work early
+        active = np.flatnonzero(~self.is_leaf[leaves])
+        nodes = leaves[active]
+        offsets = row_offsets[active]
+        while len(active):
+            x = flat[offsets + self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_go_to_left[nodes]
+            nodes = self.children[2 * nodes + go_left]
+
+            done = self.is_leaf[nodes]
+            if done.any():
+                leaves[active[done]] = nodes[done]
+                remaining = ~done
+                active = active[remaining]
+                nodes = nodes[remaining]
+                offsets = offsets[remaining]
+        return leaves.reshape(self.n_trees, n_samples)
+
+    def _predict_proba_chunk(self, X):
+        leaves = self._leaves(X)
+        proba = np.zeros((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        # Accumulate tree by tree in estimator order to match the stock summation
+        for tree_leaves in leaves:
+            proba += self.value[tree_leaves]
+        proba /= self.n_trees
+        return proba
+
+    def _use_stock(self, X):
+        return (self.stock is not None and self.max_batch is not None and not isinstance(X, dict)
+                and len(X) > self.max_batch)
+
+    def predict_proba(self, X):
+        if self._use_stock(X):
+            return self.stock.predict_proba(X)
+        X = self._prepare(X)
+        if X.shape[0] <= self.chunk_size:
+            return self._predict_proba_chunk(X)
+        return np.vstack([self._predict_proba_chunk(X[i:i + self.chunk_size])
+                          for i in range(0, X.shape[0], self.chunk_size)])
+
+    def predict(self, X):
+        if self._use_stock(X):
+            return self.stock.predict(X)
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+
+
+def compile_forest(model, threshold_dtype=np.float64, chunk_size=4096, max_batch=MAX_COMPILED_BATCH):
+    """Compile a fitted RandomForestClassifier, or a Pipeline ending in one
+
+    Batches above ``max_batch`` rows still go to ``model``; None compiles every batch.
+    """
+    preprocessor = None
+    forest = model
+    if isinstance(model, Pipeline):
+        forest = model.steps[-1][1]
+        if len(model.steps) > 1:
+            preprocessor = model[:-1]
+    if not hasattr(forest, 'estimators_') or not hasattr(forest.estimators_[0], 'tree_'):
+        raise TypeError(f"Cannot compile {type(forest).__name__}: expected a fitted tree ensemble")
+    return CompiledForest(forest, preprocessor=preprocessor, threshold_dtype=threshold_dtype,
+                          chunk_size=chunk_size, stock=model, max_batch=max_batch)
+
+
+def benchmark_forest(model, X, batch_sizes=(1, 10, 100, 1000), repeats=20, **compile_kwargs):
+    """Compare stock and compiled prediction latency and check the outputs match
+
+    Every batch size runs compiled unless ``max_batch`` is passed explicitly.
+    """
+    # Otherwise batches above MAX_COMPILED_BATCH would time the stock model against itself
+    compile_kwargs.setdefault('max_batch', None)
+    compiled = compile_forest(model, **compile_kwargs)
+    results = []
+    for batch_size in batch_sizes:
+        batch = X[:batch_size]
+        expected = model.predict(batch)
+        actual = compiled.predict(batch)
+        if not np.array_equal(expected, actual):
+            raise AssertionError(f"Compiled predictions differ from stock predictions at batch size {batch_size}")
+        if not np.array_equal(model.predict_proba(batch), compiled.predict_proba(batch)):
+            raise AssertionError(f"Compiled probabilities differ from stock probabilities at batch size {batch_size}")
+
+        timings = {}
+        for label, predict in (('stock', model.predict), ('compiled', compiled.predict)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                predict(batch)
+            timings[label] = (time.perf_counter() - start) / repeats
+
+        results.append({
+            'batch_size': len(batch),
+            'stock_ms': timings['stock'] * 1000,
+            'compiled_ms': timings['compiled'] * 1000,
+            'speedup': timings['stock'] / timings['compiled'] if timings['compiled'] else float('inf'),
+        })
+    return results
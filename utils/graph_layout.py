@@ -0,0 +1,217 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Layouts kept per process; a topology seen again is drawn without any layout work
+CACHE_ENTRIES = 16
+
+# Nearest nodes that repel each node individually per iteration
+REPULSION_NEIGHBORS = 8
+
+# Cells per side of the grid whose centroids stand in for distant nodes
+FAR_GRID = 8
+
+# Nodes per block when summing the far-field repulsion
+BLOCK = 4096
+
+# Share of a new topology's nodes that must already have positions to warm-start from them
+WARM_START_OVERLAP = 0.5
+
+
+def index_edges(nodes, edges):
+    """Node ids and edge list as (n,) ids and a deduplicated (m, 2) int array of node indices"""
+    nodes = list(dict.fromkeys(nodes))
+    index = {node: i for i, node in enumerate(nodes)}
+    pairs = np.array([(index[a], index[b]) for a, b in edges if a in index and b in index],
+                     dtype=np.int64).reshape(-1, 2)
+    pairs = np.sort(pairs, axis=1)
+    pairs = np.unique(pairs[pairs[:, 0] != pairs[:, 1]], axis=0)
+    return nodes, pairs
+
+
+def topology_key(nodes, pairs):
+    """Digest identifying a topology: its node ids and its indexed edges"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update('\0'.join(map(str, nodes)).encode('utf-8'))
+    digest.update(np.ascontiguousarray(pairs, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def _far_field(pos, k):
+    """Repulsion on every node from the grid cells it is not in, each cell acting as one mass at its centroid"""
+    n = len(pos)
+    low = pos.min(axis=0)
+    size = np.maximum(pos.max(axis=0) - low, 1e-9)
+    grid = np.minimum(((pos - low) / size * FAR_GRID).astype(np.int64), FAR_GRID - 1)
+    cell = grid[:, 0] * FAR_GRID + grid[:, 1]
+    mass = np.bincount(cell, minlength=FAR_GRID * FAR_GRID).astype(np.float64)
+    occupied = np.flatnonzero(mass)
+    mass, centroid_x, centroid_y = (mass[occupied], np.bincount(cell, pos[:, 0])[occupied] / mass[occupied],
+                                    np.bincount(cell, pos[:, 1])[occupied] / mass[occupied])
+    own = np.searchsorted(occupied, cell)
+    force = np.zeros((n, 2))
+    for start in range(0, n, BLOCK):
+        block = slice(start, start + BLOCK)
+        dx = pos[block, 0, np.newaxis] - centroid_x
+        dy = pos[block, 1, np.newaxis] - centroid_y
+        weight = mass * (k * k) / np.maximum(dx * dx + dy * dy, 1e-18)
+        # A node's own cell is left to the exact nearest-neighbour term
+        weight[np.arange(len(dx)), own[block]] = 0.0
+        force[block, 0] = (weight * dx).sum(axis=1)
+        force[block, 1] = (weight * dy).sum(axis=1)
+    return force
+
+
+def force_layout(n, pairs, positions=None, iterations=40, temperature=0.1, seed=0):
+    """Fruchterman-Reingold layout in O(n log n + m) per iteration
+
+    Repulsion between nearby nodes is exact but limited to each node's
+    ``REPULSION_NEIGHBORS`` nearest within twice the ideal edge length,
+    found with a k-d tree; repulsion from the rest of the graph comes from
+    the centroids of a coarse grid, as in Barnes-Hut. Edge attraction is
+    accumulated with bincount. ``positions`` warm-starts the layout, e.g.
+    from a previous topology.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2)) if positions is None else np.array(positions, dtype=np.float64)
+    if n < 2:
+        return pos
+    k = np.sqrt(1.0 / n)
+    a, b = pairs[:, 0], pairs[:, 1]
+    neighbors = min(REPULSION_NEIGHBORS + 1, n)
+    step = temperature / (iterations + 1)
+    for iteration in range(iterations):
+        _, near = cKDTree(pos).query(pos, k=neighbors, distance_upper_bound=2 * k)
+        # Missing neighbours come back as index n; point them at the node itself so they add nothing
+        near = np.where(near == n, np.arange(n)[:, np.newaxis], near)
+        delta = pos[:, np.newaxis, :] - pos[near]
+        dist2 = np.maximum(np.einsum('ijk,ijk->ij', delta, delta), 1e-18)
+        disp = (delta * (k * k / dist2)[:, :, np.newaxis]).sum(axis=1) + _far_field(pos, k)
+        delta = pos[a] - pos[b]
+        dist = np.maximum(np.hypot(delta[:, 0], delta[:, 1]), 1e-9)
+        pull = delta * (dist / k)[:, np.newaxis]
+        for axis in range(2):
+            disp[:, axis] += np.bincount(b, pull[:, axis], n) - np.bincount(a, pull[:, axis], n)
+        length = np.maximum(np.hypot(disp[:, 0], disp[:, 1]), 1e-9)
+        limit = temperature - step * iteration
+        pos += disp * (np.minimum(length, limit) / length)[:, np.newaxis]
+    return pos
+
+
+def _place_new(n, pairs, pos, known, seed):
+    """Positions for nodes without one: the mean of placed neighbours, or random inside the layout"""
+    rng = np.random.default_rng(seed)
+    low, high = (pos[known].min(axis=0), pos[known].max(axis=0)) if known.any() else (np.zeros(2), np.ones(2))
+    jitter = np.sqrt(1.0 / max(n, 1))
+    for _ in range(3):
+        missing = ~known
+        if not missing.any():
+            break
+        # Each pass places nodes one hop further from the already placed part
+        both = np.concatenate([pairs, pairs[:, ::-1]])
+        usable = known[both[:, 1]] & missing[both[:, 0]]
+        target, source = both[usable, 0], both[usable, 1]
+        count = np.bincount(target, minlength=n)
+        reached = count > 0
+        for axis in range(2):
+            total = np.bincount(target, pos[source, axis], n)
+            pos[reached, axis] = total[reached] / count[reached]
+        pos[reached] += rng.normal(scale=jitter, size=(int(reached.sum()), 2))
+        known = known | reached
+    missing = ~known
+    pos[missing] = low + rng.random((int(missing.sum()), 2)) * (high - low)
+    return pos
+
+
+class LayoutCache:
+    """Layouts keyed by topology, warm-starting changed topologies from the last layout
+
+    An unchanged topology is a dictionary hit. When nodes or edges change,
+    nodes that are still present keep their last positions, new ones start
+    next to their neighbours, and a short, cooler layout run settles them.
+    """
+
+    def __init__(self, entries=CACHE_ENTRIES, iterations=40, warm_iterations=15):
+        self.entries = entries
+        self.iterations = iterations
+        self.warm_iterations = warm_iterations
+        self._layouts = OrderedDict()
+        self.hits = 0
+        self.warm_starts = 0
+        self.cold_starts = 0
+
+    def layout(self, nodes, pairs):
+        """(n, 2) positions for indexed nodes and edges, as returned by index_edges"""
+        key = topology_key(nodes, pairs)
+        cached = self._layouts.get(key)
+        if cached is not None:
+            self._layouts.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        n = len(nodes)
+        positions = None
+        if self._layouts:
+            previous_nodes, previous = next(reversed(self._layouts.values()))
+            where = {node: i for i, node in enumerate(previous_nodes)}
+            old = np.array([where.get(node, -1) for node in nodes], dtype=np.int64)
+            known = old >= 0
+            if n and known.mean() >= WARM_START_OVERLAP:
+                positions = np.zeros((n, 2))
+                positions[known] = previous[old[known]]
+                positions = _place_new(n, pairs, positions, known, seed=n)
+
+        if positions is None:
+            self.cold_starts += 1
+            positions = force_layout(n, pairs, iterations=self.iterations)
+        else:
+            self.warm_starts += 1
+            positions = force_layout(n, pairs, positions, iterations=self.warm_iterations,
+                                     temperature=np.sqrt(1.0 / max(n, 1)))
+        self._layouts[key] = (list(nodes), positions)
+        if len(self._layouts) > self.entries:
+            self._layouts.popitem(last=False)
+        return positions
+
+
+def edge_segments(pos, pairs):
+    """x and y arrays drawing every edge as one polyline broken by NaNs"""
+    segments = np.full((len(pairs), 3, 2), np.nan)
+    segments[:, 0] = pos[pairs[:, 0]]
+    segments[:, 1] = pos[pairs[:, 1]]
+    segments = segments.reshape(-1, 2)
+    return segments[:, 0], segments[:, 1]
+
+
+def aggregate_grid(pos, pairs, cells):
+    """Bin nodes into a ``cells`` x ``cells`` grid over the layout
+
+    Returns the centroid and node count of every occupied cell, the cell of
+    every node, and the weighted edges between distinct cells.
+    """
+    low = pos.min(axis=0)
+    size = np.maximum(pos.max(axis=0) - low, 1e-9)
+    grid = np.minimum(((pos - low) / size * cells).astype(np.int64), cells - 1)
+    cell_ids, cell_of = np.unique(grid[:, 0] * cells + grid[:, 1], return_inverse=True)
+    counts = np.bincount(cell_of)
+    centroids = np.stack([np.bincount(cell_of, pos[:, axis]) / counts for axis in range(2)], axis=1)
+    links = np.sort(cell_of[pairs], axis=1)
+    links = links[links[:, 0] != links[:, 1]]
+    links, weights = np.unique(links, axis=0, return_counts=True)
+    return centroids, counts, cell_of, links.reshape(-1, 2), weights
+
+
+def decimate_edges(pairs, limit, keep=None, seed=0):
+    """At most ``limit`` edges, always keeping those touching nodes flagged in ``keep``"""
+    if len(pairs) <= limit:
+        return pairs
+    rng = np.random.default_rng(seed)
+    priority = rng.random(len(pairs))
+    if keep is not None:
+        priority[keep[pairs[:, 0]] | keep[pairs[:, 1]]] = -1.0
+    return pairs[np.sort(np.argpartition(priority, limit)[:limit])]
+
+
+default_cache = LayoutCache()
@@ -0,0 +1,315 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+FIELDS = ('cpu_percent', 'memory_percent', 'net_rx_bytes', 'net_tx_bytes', 'disk_read_bytes', 'disk_write_bytes')
+
+SECTOR_BYTES = 512
+
+
+class RingBuffer:
+    """Fixed-size circular store of timestamped rows; appends never allocate"""
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity, width), dtype=np.float32)
+        self.count = 0
+        self.head = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, row):
+        with self._lock:
+            self.times[self.head] = timestamp
+            self.values[self.head] = row
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def snapshot(self, since=None):
+        """Chronological copy of (times, values), optionally only rows after ``since``
+
+        Rows at or before ``since`` are located by binary search and never
+        copied, so polling for new rows costs O(new rows), not O(capacity).
+        """
+        with self._lock:
+            start = (self.head - self.count) % self.capacity
+            if start + self.count <= self.capacity:
+                segments = [(start, start + self.count)]
+            else:
+                segments = [(start, self.capacity), (0, self.head)]
+            if since is not None:
+                while segments and self.times[segments[0][1] - 1] <= since:
+                    segments.pop(0)
+                if segments:
+                    first, last = segments[0]
+                    segments[0] = (first + int(np.searchsorted(self.times[first:last], since, side='right')), last)
+            if not segments:
+                return np.zeros(0), np.zeros((0, self.values.shape[1]), dtype=self.values.dtype)
+            times = np.concatenate([self.times[first:last] for first, last in segments])
+            values = np.concatenate([self.values[first:last] for first, last in segments])
+        return times, values
+
+    def latest(self):
+        with self._lock:
+            if not self.count:
+                return None, None
+            index = (self.head - 1) % self.capacity
+            return self.times[index], self.values[index].copy()
+
+
+def _minmax_candidates(y, threshold, ratio):
+    """Indices of the min and max of ``threshold * ratio / 2`` equal chunks, plus both ends"""
+    n = len(y)
+    chunks = threshold * ratio // 2
+    edges = np.linspace(1, n - 1, chunks + 1).astype(np.int64)
+    size = int(np.diff(edges).max())
+    # Pad every chunk to the same width so min/max run as one 2-D reduction
+    index = np.minimum(edges[:-1, np.newaxis] + np.arange(size), edges[1:, np.newaxis] - 1)
+    block = y[index]
+    rows = np.arange(chunks)
+    picks = np.concatenate([index[rows, block.argmin(axis=1)], index[rows, block.argmax(axis=1)]])
+    return np.unique(np.concatenate([[0, n - 1], picks]))
+
+
+def lttb(x, y, threshold, ratio=4):
+    """Largest-Triangle-Three-Buckets downsampling to ``threshold`` points
+
+    Keeps the first and last point and, from each bucket in between, the
+    point forming the largest triangle with the point kept from the previous
+    bucket and the mean of the next bucket, so peaks and dips survive.
+    Long series are first reduced to the min and max of ``ratio`` chunks per
+    output point (MinMaxLTTB), which leaves the selected shape intact while
+    making the cost depend on the output size rather than the input size.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    candidates = None
+    if ratio and n > threshold * ratio * 2:
+        candidates = _minmax_candidates(y, threshold, ratio)
+        x, y = x[candidates], y[candidates]
+        n = len(x)
+        if threshold >= n:
+            return candidates
+
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    # Mean of every bucket at once, used as the third vertex of the previous bucket's triangles
+    sizes = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes, x[-1]).tolist()
+    mean_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes, y[-1]).tolist()
+
+    xs, ys, bounds = x.tolist(), y.tolist(), edges.tolist()
+    selected = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        ax, ay = xs[previous], ys[previous]
+        cx, cy = mean_x[bucket + 1], mean_y[bucket + 1]
+        # Twice the triangle area is |p*y + q*x + r| for fixed a and c
+        p, q = ax - cx, cy - ay
+        r = -p * ay - q * ax
+        best, best_area = bounds[bucket], -1.0
+        for i in range(bounds[bucket], bounds[bucket + 1]):
+            area = abs(p * ys[i] + q * xs[i] + r)
+            if area > best_area:
+                best, best_area = i, area
+        previous = best
+        selected.append(best)
+    selected.append(n - 1)
+    selected = np.array(selected, dtype=np.int64)
+    return selected if candidates is None else candidates[selected]
+
+
+def _read_cpu():
+    with open('/proc/stat') as f:
+        fields = [int(v) for v in f.readline().split()[1:]]
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return sum(fields[:8]), idle
+
+
+def _read_memory():
+    info = {}
+    with open('/proc/meminfo') as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            info[key] = int(value.split()[0])
+    total = info.get('MemTotal', 0)
+    available = info.get('MemAvailable', info.get('MemFree', 0))
+    return 100.0 * (1 - available / total) if total else 0.0
+
+
+def _read_network():
+    rx = tx = 0
+    with open('/proc/net/dev') as f:
+        for line in f.readlines()[2:]:
+            name, data = line.split(':', 1)
+            if name.strip() == 'lo':
+                continue
+            values = data.split()
+            rx += int(values[0])
+            tx += int(values[8])
+    return rx, tx
+
+
+def _whole_disks():
+    try:
+        return {d for d in os.listdir('/sys/block') if not d.startswith(('loop', 'ram', 'zram'))}
+    except OSError:
+        return None
+
+
+def _read_disks(disks):
+    read = written = 0
+    with open('/proc/diskstats') as f:
+        for line in f:
+            values = line.split()
+            if len(values) < 10 or (disks is not None and values[2] not in disks):
+                continue
+            read += int(values[5])
+            written += int(values[9])
+    return read * SECTOR_BYTES, written * SECTOR_BYTES
+
+
+class HostMetricsSampler:
+    """Background thread sampling /proc counters into a RingBuffer
+
+    CPU and memory are stored as percentages; network and disk counters as
+    bytes per second over the last interval. At the default 1 s interval a
+    24-hour buffer holds 86,400 rows, about 2 MB. With a ``store`` (a
+    TimeSeriesStore) every sample is also kept as ``host.<field>`` series,
+    rolled up for ranges longer than the buffer.
+    """
+
+    def __init__(self, interval=1.0, retention=24 * 3600, store=None, flush_every=60):
+        self.interval = interval
+        self.retention = retention
+        self.buffer = RingBuffer(int(retention / interval), len(FIELDS))
+        self.store = store
+        self.flush_every = flush_every
+        self.samples = 0
+        self._disks = _whole_disks()
+        self._stop = threading.Event()
+        self._thread = None
+        self._previous = None
+        self.errors = 0
+
+    @staticmethod
+    def available():
+        return all(os.path.exists(p) for p in ('/proc/stat', '/proc/meminfo', '/proc/net/dev'))
+
+    def _counters(self):
+        total, idle = _read_cpu()
+        rx, tx = _read_network()
+        try:
+            disk_read, disk_write = _read_disks(self._disks)
+        except OSError:
+            disk_read = disk_write = 0
+        return time.time(), total, idle, rx, tx, disk_read, disk_write
+
+    def sample(self):
+        """Take one sample; the first call only primes the counters"""
+        current = self._counters()
+        memory = _read_memory()
+        previous, self._previous = self._previous, current
+        if previous is None:
+            return None
+        elapsed = max(current[0] - previous[0], 1e-6)
+        total = current[1] - previous[1]
+        busy = total - (current[2] - previous[2])
+        row = (
+            100.0 * busy / total if total > 0 else 0.0,
+            memory,
+            *((c - p) / elapsed for c, p in zip(current[3:], previous[3:])),
+        )
+        self.buffer.append(current[0], row)
+        if self.store is not None:
+            self.store.append_row(current[0], dict(zip(FIELDS, row)), prefix='host.')
+            self.samples += 1
+            if self.samples % self.flush_every == 0:
+                self.store.flush()
+        return row
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except (OSError, ValueError, IndexError):
+                self.errors += 1
+            next_tick += self.interval
+            # Sleep to the next tick boundary so sampling does not drift
+            self._stop.wait(max(0.0, next_tick - time.monotonic()))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='host-metrics', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def series(self, field, seconds=None, max_points=None):
+        """(timestamps, values) of one field, LTTB-downsampled to ``max_points``"""
+        since = time.time() - seconds if seconds else None
+        times, values = self.buffer.snapshot(since)
+        column = values[:, FIELDS.index(field)]
+        if max_points is not None and len(times) > max_points:
+            keep = lttb(times, column, max_points)
+            times, column = times[keep], column[keep]
+        return times, column
+
+
+class LiveSeries:
+    """A viewer's downsampled copy of some sampler fields, kept current by pulling only new rows
+
+    The first ``refresh`` downsamples the last ``seconds`` of every field to
+    ``max_points``. Later calls append the rows sampled since, drop the ones
+    that left the window and, once a field holds twice ``max_points``, run
+    LTTB over that short array again. The work and the size of the result per
+    refresh therefore depend on ``max_points`` and the rows since the last
+    refresh, not on how much history the sampler holds.
+    """
+
+    def __init__(self, sampler, fields, seconds, max_points=1000):
+        self.sampler = sampler
+        self.fields = list(fields)
+        self.seconds = seconds
+        self.max_points = max_points
+        self.columns = [FIELDS.index(field) for field in self.fields]
+        self.times = None
+        self.values = None
+        self.last_time = None
+
+    def refresh(self, now=None):
+        """Pull new rows; returns how many were appended to each field"""
+        now = time.time() if now is None else now
+        since = now - self.seconds if self.last_time is None else self.last_time
+        times, values = self.sampler.buffer.snapshot(since)
+        if self.times is None:
+            self.times = [np.zeros(0) for _ in self.fields]
+            self.values = [np.zeros(0, dtype=np.float32) for _ in self.fields]
+        for i, column in enumerate(self.columns):
+            field_times = np.concatenate([self.times[i], times])
+            field_values = np.concatenate([self.values[i], values[:, column]])
+            first = np.searchsorted(field_times, now - self.seconds, side='right')
+            field_times, field_values = field_times[first:], field_values[first:]
+            if len(field_times) > 2 * self.max_points or (self.last_time is None and len(field_times) > self.max_points):
+                keep = lttb(field_times, field_values, self.max_points)
+                field_times, field_values = field_times[keep], field_values[keep]
+            self.times[i], self.values[i] = field_times, field_values
+        if len(times):
+            self.last_time = times[-1]
+        elif self.last_time is None:
+            self.last_time = since
+        return len(times)
+
+    def series(self, field):
+        i = self.fields.index(field)
+        return self.times[i], self.values[i]
@@ -0,0 +1,300 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# "YYYY-mm-dd HH:MM:SS - ip - attack type - breach term", as written by AttackSim
+TIMESTAMP_WIDTH = 19
+SEPARATOR = b' - '
+MAX_IPV4_WIDTH = 15
+TEXT_FIELDS = ('message', 'attack_type', 'breach_term')
+# Messages up to this many bytes are compared as rows of one padded matrix; longer ones one by one,
+# so a single huge line does not size the matrix for every line of the batch
+MAX_MESSAGE_WIDTH = 256
+# Odd 64-bit multiplier mixing the words of a row into one hash
+_ROW_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _gather(buf, starts, lengths, width):
+    """Copy variable-length byte ranges into a zero-padded (n, width) matrix"""
+    # Starts of fields on short lines may lie past the end of the buffer
+    if len(starts) and int(starts.max()) + width > len(buf):
+        buf = np.concatenate([buf, np.zeros(int(starts.max()) + width - len(buf), dtype=np.uint8)])
+    # Row gathers from a strided window view are one memcpy per line
+    rows = sliding_window_view(buf, width)[starts]
+    if (lengths < width).any():
+        # Widths here are at most MAX_MESSAGE_WIDTH, so int16 keeps the mask comparison small
+        np.multiply(rows, np.arange(width, dtype=np.int16) < np.minimum(lengths, width).astype(np.int16)[:, np.newaxis],
+                    out=rows)
+    return rows
+
+
+def _row_bits(flags):
+    """16-bit mask per row of a (n, 16) boolean matrix, bit j set for column j"""
+    # Each little-endian word holds eight 0/1 bytes; the multiply gathers them into its top byte
+    words = flags.view('<u8') * np.uint64(0x0102040810204080) >> np.uint64(56)
+    return (words[:, 0] | words[:, 1] << np.uint64(8)).astype(np.uint16)
+
+
+# Column of the lowest set bit of every 16-bit mask, 16 for none
+_LOWEST_BIT = np.array([16] + [(m & -m).bit_length() - 1 for m in range(1, 1 << 16)], dtype=np.uint8)
+
+
+def _parse_ipv4(window, lengths):
+    """Vectorized dotted-quad parser over a (n, 16) byte matrix; returns (ip, valid)
+
+    Octets have one to three digits and no leading zero, as for ``ipaddress``.
+    """
+    n = len(window)
+    window = np.ascontiguousarray(window)
+    inside = ((np.uint32(1) << np.minimum(lengths, 16).astype(np.uint32)) - 1).astype(np.uint16)
+    is_dot = window == 46
+    # Bytes below '0' wrap around, so one comparison finds the digits
+    dots = _row_bits(is_dot) & inside
+    stray = _row_bits(~(is_dot | (window - np.uint8(48) <= 9))) & inside
+    valid = (lengths >= 7) & (lengths <= MAX_IPV4_WIDTH) & (stray == 0)
+
+    # The three dots split the line into octets ending at each dot and at the end
+    ends = []
+    for _ in range(3):
+        ends.append(_LOWEST_BIT[dots].astype(np.int16))
+        dots &= dots - np.uint16(1)
+    valid &= (dots == 0) & (ends[-1] < 16)
+    ends.append(np.minimum(lengths, 16).astype(np.int16))
+
+    # Little-endian 4-byte words starting at every byte of the matrix, behind three bytes of padding,
+    # so word row + end holds the three bytes before column ``end`` of a line and that column
+    padded = np.concatenate([np.zeros(3, dtype=np.uint8), window.ravel()])
+    words = np.ndarray(n * 16, dtype='<u4', buffer=padded, strides=(1,))
+    row = np.arange(n, dtype=np.int64) * 16
+    value = np.zeros(n, dtype=np.uint32)
+    first = np.zeros(n, dtype=np.int16)
+    for end in ends:
+        width = end - first
+        valid &= (width >= 1) & (width <= 3)
+        word = words[row + np.minimum(end, MAX_IPV4_WIDTH)]
+        # Hundreds, tens and ones digits; bytes before the octet are masked by its width
+        hundreds, tens, ones = ((word >> np.uint32(shift) & np.uint32(255)) - np.uint32(48) for shift in (0, 8, 16))
+        octet = ones + np.where(width > 1, tens * 10, 0) + np.where(width > 2, hundreds * 100, 0)
+        leading = np.where(width > 2, hundreds, tens)
+        valid &= (octet <= 255) & ((width == 1) | (leading != 0))
+        value = (value << np.uint32(8)) | (octet & np.uint32(255))
+        first = end + np.int16(1)
+    return np.where(valid, value, 0).astype(np.uint32), valid
+
+
+def _parse_timestamps(stamps, framed):
+    """Vectorized "YYYY-mm-dd HH:MM:SS" parser; malformed stamps become NaT"""
+    # Bytes below '0' wrap around, so a single bound checks every digit
+    digits = stamps - np.uint8(48)
+
+    def number(first, last):
+        value = np.zeros(len(stamps), dtype=np.int32)
+        for j in range(first, last):
+            value *= 10
+            value += digits[:, j]
+        return value
+
+    digit_columns = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+    valid = framed & np.all(digits[:, digit_columns] <= 9, axis=1)
+    valid &= np.all(stamps[:, [4, 7, 10, 13, 16]] == np.frombuffer(b'-- ::', dtype=np.uint8), axis=1)
+    year, month, day = number(0, 4), number(5, 7), number(8, 10)
+    hour, minute, second = number(11, 13), number(14, 16), number(17, 19)
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (hour <= 23) & (minute <= 59) & (second <= 59)
+
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype('datetime64[M]')
+    days = months.astype('datetime64[D]') + np.where(valid, day - 1, 0).astype('timedelta64[D]')
+    # Day 31 of a 30-day month rolls into the next month; reject it
+    valid &= days.astype('datetime64[M]') == months
+    seconds = days.astype('datetime64[s]') + (hour * 3600 + minute * 60 + second).astype('timedelta64[s]')
+    return np.where(valid, seconds, np.datetime64('NaT'))
+
+
+def factorize_rows(matrix):
+    """Exact codes for the distinct rows of a uint8 matrix, via 8-byte column words"""
+    n, width = matrix.shape
+    padded = -width % 8
+    if padded:
+        matrix = np.hstack([matrix, np.zeros((n, padded), dtype=np.uint8)])
+    words = np.ascontiguousarray(matrix).view(np.uint64)
+    if not n or not words.shape[1]:
+        return np.zeros(n, dtype=np.int64)
+    # One factorize over a hash of every row, kept if each row equals the first row with its code
+    hashed = words[:, 0].copy()
+    for column in range(1, words.shape[1]):
+        hashed *= _ROW_HASH_MULTIPLIER
+        hashed += words[:, column]
+    codes, _ = pd.factorize(hashed)
+    if np.array_equal(words, words[first_occurrence(codes)[codes]]):
+        return codes
+    # A hash collision: combine exact codes column by column instead
+    codes = np.zeros(n, dtype=np.int64)
+    for column in range(words.shape[1]):
+        word_codes, word_uniques = pd.factorize(words[:, column])
+        codes, _ = pd.factorize(codes * len(word_uniques) + word_codes)
+    return codes
+
+
+def _word_width(lengths):
+    """Longest length rounded up to whole 8-byte words, so factorize_rows need not pad"""
+    return max(-(-int(lengths.max()) // 8) * 8, 8)
+
+
+def _message_codes(buf, starts, lengths):
+    """Codes of the distinct messages; short ones are matched as matrix rows, the rest as bytes"""
+    short = lengths <= MAX_MESSAGE_WIDTH
+    if short.all():
+        return factorize_rows(_gather(buf, starts, lengths, _word_width(lengths)))
+    codes = np.empty(len(starts), dtype=np.int64)
+    distinct = 0
+    if short.any():
+        codes[short] = factorize_rows(_gather(buf, starts[short], lengths[short], _word_width(lengths[short])))
+        distinct = int(codes[short].max()) + 1
+    # Short and long messages differ in length, so their codes cannot collide
+    index = {}
+    codes[~short] = [distinct + index.setdefault(bytes(buf[s:s + l]), len(index))
+                     for s, l in zip(starts[~short].tolist(), lengths[~short].tolist())]
+    return codes
+
+
+def first_occurrence(codes):
+    """Index of the first line carrying each code 0..max(codes)"""
+    first = np.empty(int(codes.max()) + 1, dtype=np.int64)
+    # Writing in reverse leaves the earliest index for every code in place
+    first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    return first
+
+
+def format_ipv4(ip):
+    ip = int(ip)
+    return f"{ip >> 24}.{(ip >> 16) & 255}.{(ip >> 8) & 255}.{ip & 255}"
+
+
+class LogBatch:
+    """Columnar view of a batch of attack log lines
+
+    Timestamps and IPv4 addresses are NumPy arrays. Text fields are stored as
+    integer codes into small tables of distinct values, so any per-string
+    work (rule matching, labelling) runs once per distinct value rather than
+    once per line. Lines that do not follow the log format keep their whole
+    text as the message, with ``ip_valid`` false and a NaT timestamp.
+    """
+
+    def __init__(self, timestamp, ip, ip_valid, codes, uniques):
+        self.timestamp = timestamp
+        self.ip = ip
+        self.ip_valid = ip_valid
+        self.codes = codes
+        self.uniques = uniques
+
+    def __len__(self):
+        return len(self.ip)
+
+    def take(self, indices, axis=0):
+        codes = {field: column[indices] for field, column in self.codes.items()}
+        return LogBatch(self.timestamp[indices], self.ip[indices], self.ip_valid[indices], codes, self.uniques)
+
+    def __getitem__(self, indices):
+        return self.take(indices)
+
+    def column(self, field):
+        """(codes, distinct values) for one of the text fields"""
+        return self.codes[field], self.uniques[field]
+
+    def values(self, field):
+        codes, uniques = self.column(field)
+        return np.asarray(uniques, dtype=object)[codes]
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'timestamp': self.timestamp,
+            'ip': [format_ipv4(ip) if ok else None for ip, ok in zip(self.ip, self.ip_valid)],
+            'attack_type': self.values('attack_type'),
+            'breach_term': self.values('breach_term'),
+        })
+
+
+def parse_bytes(data):
+    """Parse newline-separated log text into a LogBatch without a per-line Python loop"""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if len(buf) and buf[-1] != 10:
+        buf = np.append(buf, np.uint8(10))
+    ends = np.flatnonzero(buf == 10)
+    starts = np.concatenate([[0], ends[:-1] + 1]).astype(np.int64)
+    # Tolerate CRLF line endings
+    ends = ends - ((ends > starts) & (buf[np.maximum(ends - 1, 0)] == 13))
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    lengths = ends - starts
+    n = len(starts)
+    if n == 0:
+        empty = {field: np.zeros(0, dtype=np.int64) for field in TEXT_FIELDS}
+        return LogBatch(np.zeros(0, dtype='datetime64[s]'), np.zeros(0, dtype=np.uint32),
+                        np.zeros(0, dtype=bool), empty, {field: [] for field in TEXT_FIELDS})
+
+    sep_width = len(SEPARATOR)
+    head = _gather(buf, starts, np.minimum(lengths, TIMESTAMP_WIDTH + sep_width), TIMESTAMP_WIDTH + sep_width)
+    framed = (lengths > TIMESTAMP_WIDTH + sep_width) & np.all(
+        head[:, TIMESTAMP_WIDTH:] == np.frombuffer(SEPARATOR, dtype=np.uint8), axis=1)
+
+    ip_start = starts + TIMESTAMP_WIDTH + sep_width
+    window = _gather(buf, ip_start, np.clip(ends - ip_start, 0, MAX_IPV4_WIDTH + 1), MAX_IPV4_WIDTH + 1)
+    spaces = window == 32
+    ip_length = np.where(spaces.any(axis=1), spaces.argmax(axis=1), MAX_IPV4_WIDTH + 1)
+    after_ip = ip_start + ip_length
+    framed &= after_ip + sep_width <= ends
+    follows = _gather(buf, after_ip, np.full(n, sep_width), sep_width)
+    framed &= np.all(follows == np.frombuffer(SEPARATOR, dtype=np.uint8), axis=1)
+
+    ip, ip_valid = _parse_ipv4(window, ip_length)
+    ip_valid &= framed
+
+    timestamp = _parse_timestamps(head[:, :TIMESTAMP_WIDTH], framed)
+
+    message_start = np.where(framed, after_ip + sep_width, starts)
+    message_length = ends - message_start
+    message_codes = _message_codes(buf, message_start, message_length)
+    first = first_occurrence(message_codes)
+    messages = [bytes(buf[s:s + l]).decode('utf-8', 'replace')
+                for s, l in zip(message_start[first], message_length[first])]
+
+    attack_types, breach_terms = [], []
+    attack_index, breach_index = {}, {}
+    attack_of_message = np.empty(len(messages), dtype=np.int64)
+    breach_of_message = np.empty(len(messages), dtype=np.int64)
+    for i, message in enumerate(messages):
+        attack, sep, breach = message.rpartition(' - ')
+        if not sep:
+            attack, breach = message, ''
+        attack_of_message[i] = attack_index.setdefault(attack, len(attack_index))
+        breach_of_message[i] = breach_index.setdefault(breach, len(breach_index))
+    attack_types = list(attack_index)
+    breach_terms = list(breach_index)
+
+    codes = {
+        'message': message_codes,
+        'attack_type': attack_of_message[message_codes],
+        'breach_term': breach_of_message[message_codes],
+    }
+    uniques = {'message': messages, 'attack_type': attack_types, 'breach_term': breach_terms}
+    return LogBatch(timestamp, ip, ip_valid, codes, uniques)
+
+
+def parse_lines(lines):
+    return parse_bytes('\n'.join(lines).encode('utf-8'))
+
+
+def read_log(path, chunk_bytes=None):
+    """Parse a whole log file, or yield LogBatch chunks of about ``chunk_bytes`` each"""
+    if chunk_bytes is None:
+        with open(path, 'rb') as f:
+            return parse_bytes(f.read())
+    return _read_chunks(path, chunk_bytes)
+
+
+def _read_chunks(path, chunk_bytes):
+    with open(path, 'rb') as f:
+        while True:
+            lines = f.readlines(chunk_bytes)
+            if not lines:
+                break
+            yield parse_bytes(b''.join(lines))
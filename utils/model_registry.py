@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+
+import joblib
+
+KERAS_SUFFIXES = ('.h5', '.keras')
+
+# Models loaded by this process, shared by every caller while any of them holds a reference
+_loaded = weakref.WeakValueDictionary()
+_loaded_lock = threading.Lock()
+
+
+def _load_file(path):
+    if path.endswith(KERAS_SUFFIXES):
+        from tensorflow.keras.models import load_model
+        return load_model(path)
+    # Uncompressed joblib files map their NumPy arrays straight from the page
+    # cache, so every process loading the same artifact shares those pages
+    return joblib.load(path, mmap_mode='r')
+
+
+def _cache_key(path):
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def load_shared(path):
+    """Load a model file once per process and return the shared instance
+
+    The cache holds models weakly: callers loading the same unchanged file
+    get the same object, and it is freed once the last of them drops it, so
+    nothing needs releasing. Callers must treat the returned model as read-only.
+    """
+    key = _cache_key(path)
+    with _loaded_lock:
+        model = _loaded.get(key)
+        if model is None:
+            model = _load_file(key[0])
+            try:
+                _loaded[key] = model
+            except TypeError:
+                # Objects without weak reference support are not shared
+                pass
+        return model
+
+
+def loaded_models():
+    """Paths of the models currently shared in this process"""
+    with _loaded_lock:
+        return sorted(key[0] for key in _loaded.keys())
+
+
+def _atomic_write(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Versioned model artifacts with metadata, metrics and a promotable "current" version
+
+    Layout: ``<root>/<name>/<version>/model.joblib`` (or ``model.h5``) next to
+    ``metadata.json``. ``<root>/<name>/CURRENT`` names the live version and is
+    replaced atomically, so readers see either the old or the new version and
+    never a partial write. Every promotion is appended to ``history.json``,
+    which is what ``rollback`` walks back through.
+    """
+
+    def __init__(self, root='models'):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _model_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def versions(self, name):
+        directory = self._model_dir(name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(v for v in os.listdir(directory) if v.startswith('v') and v[1:].isdigit())
+
+    def register(self, name, model, metrics=None, metadata=None, fmt=None):
+        """Store a new version of ``name`` and return its version id"""
+        fmt = fmt or ('keras' if hasattr(model, 'save') and not hasattr(model, 'get_params') else 'joblib')
+        os.makedirs(self._model_dir(name), exist_ok=True)
+        with self._lock:
+            existing = self.versions(name)
+            number = int(existing[-1][1:]) + 1 if existing else 1
+            # Claim the version directory first; mkdir fails if another process won the race
+            while True:
+                version = f'v{number:04d}'
+                try:
+                    os.mkdir(os.path.join(self._model_dir(name), version))
+                    break
+                except FileExistsError:
+                    number += 1
+
+        version_dir = os.path.join(self._model_dir(name), version)
+        artifact = os.path.join(version_dir, 'model.h5' if fmt == 'keras' else 'model.joblib')
+        if fmt == 'keras':
+            model.save(artifact)
+        else:
+            joblib.dump(model, artifact)
+
+        info = {
+            'name': name,
+            'version': version,
+            'format': fmt,
+            'artifact': os.path.basename(artifact),
+            'sha256': _sha256(artifact),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'model_type': type(model).__name__,
+            'metrics': metrics or {},
+            'metadata': metadata or {},
+        }
+        _atomic_write(os.path.join(version_dir, 'metadata.json'), json.dumps(info, indent=2, default=str))
+        return version
+
+    def metadata(self, name, version=None):
+        version = version or self.current_version(name)
+        if version is None:
+            return None
+        with open(os.path.join(self._model_dir(name), version, 'metadata.json')) as f:
+            return json.load(f)
+
+    def artifact_path(self, name, version=None):
+        info = self.metadata(name, version)
+        if info is None:
+            raise LookupError(f"No current version registered for model '{name}'")
+        return os.path.join(self._model_dir(name), info['version'], info['artifact'])
+
+    def current_version(self, name):
+        try:
+            with open(os.path.join(self._model_dir(name), 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def history(self, name):
+        try:
+            with open(os.path.join(self._model_dir(name), 'history.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def promote(self, name, version):
+        """Atomically make ``version`` the current version of ``name``"""
+        if version not in self.versions(name):
+            raise LookupError(f"Model '{name}' has no version {version}")
+        with self._lock:
+            history = self.history(name)
+            history.append({'version': version, 'promoted': datetime.now().isoformat(timespec='seconds')})
+            _atomic_write(os.path.join(self._model_dir(name), 'history.json'), json.dumps(history, indent=2))
+            _atomic_write(os.path.join(self._model_dir(name), 'CURRENT'), version)
+        return version
+
+    def rollback(self, name):
+        """Restore the version that was current before the latest promotion"""
+        with self._lock:
+            history = self.history(name)
+            if len(history) < 2:
+                raise LookupError(f"Model '{name}' has no earlier promoted version to roll back to")
+            history.pop()
+            previous = history[-1]['version']
+            _atomic_write(os.path.join(self._model_dir(name), 'history.json'), json.dumps(history, indent=2))
+            _atomic_write(os.path.join(self._model_dir(name), 'CURRENT'), previous)
+        return previous
+
+    def promote_if_better(self, name, version, metric='accuracy'):
+        """Promote ``version`` when it beats the current version on ``metric``"""
+        current = self.metadata(name)
+        candidate = self.metadata(name, version)
+        if current is None or candidate['metrics'].get(metric, float('-inf')) >= current['metrics'].get(metric, float('-inf')):
+            self.promote(name, version)
+            return True
+        return False
+
+    def load(self, name, version=None):
+        """Return (model, version) for the shared in-process copy, freed once no caller holds it"""
+        info = self.metadata(name, version)
+        if info is None:
+            raise LookupError(f"No current version registered for model '{name}'")
+        return load_shared(self.artifact_path(name, info['version'])), info['version']
+
+    @contextmanager
+    def use(self, name, version=None):
+        """Hold a model for the duration of a ``with`` block"""
+        yield load_shared(self.artifact_path(name, version))
@@ -45,22 +45,7 @@ def get_recent_cves(days_back=7, severity_filter=None):
                 retry_delay *= 2
 
         # Process and format CVE data
-        formatted_cves = []
-        for cve in r:
-            cvss_data = extract_cvss_data(cve)
-
-            if severity_filter and cvss_data['severity'] != severity_filter:
-                continue
-
-            formatted_cves.append([
-                cve.id,
-                cve.descriptions[0].value if cve.descriptions else "No description available",
-                cvss_data['score'],
-                cve.published,
-                cvss_data['severity'],
-                cvss_data['vector'],
-                cvss_data['attack_vector']
-            ])
+        formatted_cves = format_cves(r, severity_filter)
 
         print(f"Found {len(formatted_cves)} CVEs")
         return formatted_cves
@@ -68,6 +53,26 @@ def get_recent_cves(days_back=7, severity_filter=None):
         print(f"Error fetching NVD data: {str(e)}")
         return None
 
+def format_cves(cves, severity_filter=None):
+    """Table rows of CVE objects: id, description, score, published, severity, vector, attack vector"""
+    formatted_cves = []
+    for cve in cves:
+        cvss_data = extract_cvss_data(cve)
+
+        if severity_filter and cvss_data['severity'] != severity_filter:
+            continue
+
+        formatted_cves.append([
+            cve.id,
+            cve.descriptions[0].value if cve.descriptions else "No description available",
+            cvss_data['score'],
+            cve.published,
+            cvss_data['severity'],
+            cvss_data['vector'],
+            cvss_data['attack_vector']
+        ])
+    return formatted_cves
+
 def extract_cvss_data(cve):
     """Extract CVSS scoring data from a CVE object"""
     data = {
@@ -179,10 +184,11 @@ def get_cve_details(cve_id):
         print(f"Error fetching CVE details: {str(e)}")
         return None
 
-def analyze_vulnerability_trends(days_back=30):
-    """Analyze vulnerability trends from collected CVE data"""
+def analyze_vulnerability_trends(days_back=30, cves=None):
+    """Analyze vulnerability trends from collected CVE data, fetching the last days_back days unless cves is given"""
     try:
-        cves = get_recent_cves(days_back)
+        if cves is None:
+            cves = get_recent_cves(days_back)
         if not cves:
             return None
 
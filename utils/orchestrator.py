@@ -0,0 +1,227 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # installed alongside scikit-learn, but optional here
+    threadpool_limits = None
+
+# Arrays already attached in this process, keyed by their .npy path
+_attached = {}
+
+
+class SharedArray(np.ndarray):
+    """Read-only memory-mapped array that pickles as a reference to its file
+
+    Workers receive the path instead of the data and map the same pages, so a
+    training matrix is written once no matter how many fold fits use it.
+    Arrays derived by slicing or fancy indexing pickle as ordinary arrays.
+    """
+
+    def __array_finalize__(self, obj):
+        self._shared_path = None
+
+    def __reduce__(self):
+        if self._shared_path is not None:
+            return _attach, (self._shared_path,)
+        return np.asarray(self).__reduce__()
+
+
+def _attach(path):
+    array = _attached.get(path)
+    if array is None:
+        array = np.load(path, mmap_mode='r').view(SharedArray)
+        array._shared_path = path
+        _attached[path] = array
+    return array
+
+
+def _init_worker():
+    # Every worker is one CPU of the budget; BLAS threads would oversubscribe it
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[var] = '1'
+    if threadpool_limits is not None:
+        threadpool_limits(1)
+
+
+def _run_task(func, args, kwargs):
+    start = time.process_time()
+    result = func(*args, **kwargs)
+    return result, time.process_time() - start
+
+
+class PoolParallel:
+    """joblib.Parallel-compatible front end to the orchestrator's shared pool"""
+
+    def __init__(self, orchestrator, name):
+        self.orchestrator = orchestrator
+        self.name = name
+        self._last_progress = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __call__(self, tasks):
+        futures = [self.orchestrator.submit(self.name, func, args, kwargs) for func, args, kwargs in tasks]
+        results = [future.result() for future in futures]
+        now = time.perf_counter()
+        if now - self._last_progress >= self.orchestrator.progress_interval:
+            self._last_progress = now
+            self.orchestrator.emit(self.name, 'progress', self.orchestrator.stats[self.name].copy())
+        return results
+
+
+class TrainingOrchestrator:
+    """Run several model searches on one global worker pool
+
+    ``n_workers`` processes are started once and shared by every model. At
+    most ``cpu_budget`` fold fits are in flight at any time, so concurrent
+    searches queue for CPUs instead of each starting their own pool. Per-model
+    CPU time, task counts and wall time are tracked in ``stats``.
+    """
+
+    def __init__(self, n_workers=None, cpu_budget=None, workdir=None, on_event=None, progress_interval=1.0):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.cpu_budget = min(cpu_budget or self.n_workers, self.n_workers)
+        self.on_event = on_event or _print_event
+        self.progress_interval = progress_interval
+        self._workdir = workdir
+        self._own_workdir = workdir is None
+        self._slots = threading.BoundedSemaphore(self.cpu_budget)
+        self._lock = threading.Lock()
+        self._pool = None
+        self.stats = {}
+
+    def __enter__(self):
+        if self._own_workdir:
+            self._workdir = tempfile.mkdtemp(prefix='darkshield-train-')
+        os.makedirs(self._workdir, exist_ok=True)
+        self._pool = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._pool.shutdown(wait=True)
+        self._pool = None
+        _attached.clear()
+        if self._own_workdir:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+        return False
+
+    def share(self, array, name=None):
+        """Write an array once to the work directory and return a shared memory map of it"""
+        name = name or f'array_{len(os.listdir(self._workdir))}'
+        path = os.path.join(self._workdir, f'{name}.npy')
+        np.save(path, np.ascontiguousarray(array))
+        return _attach(path)
+
+    def parallel(self, name):
+        """Return a joblib-style parallel backend whose tasks are accounted to ``name``"""
+        self.stats.setdefault(name, {'tasks': 0, 'in_flight': 0, 'cpu_seconds': 0.0, 'wall_seconds': 0.0})
+        return PoolParallel(self, name)
+
+    def emit(self, name, event, payload=None):
+        self.on_event(name, event, payload)
+
+    def submit(self, name, func, args, kwargs):
+        self._slots.acquire()
+        with self._lock:
+            self.stats[name]['in_flight'] += 1
+        try:
+            future = self._pool.submit(_run_task, func, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        outer = _UnwrapFuture(future)
+
+        def done(_):
+            self._slots.release()
+            with self._lock:
+                stats = self.stats[name]
+                stats['in_flight'] -= 1
+                stats['tasks'] += 1
+                if not future.cancelled() and future.exception() is None:
+                    stats['cpu_seconds'] += future.result()[1]
+
+        future.add_done_callback(done)
+        return outer
+
+    def run(self, jobs):
+        """Run ``{name: callable}`` jobs concurrently and return ``{name: result}``
+
+        Each callable drives one model search in a thread of this process and
+        should send its fits through ``self.parallel(name)``. Results are
+        emitted as each model finishes rather than in submission order.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(jobs) or 1) as drivers:
+            futures = {}
+            for name, job in jobs.items():
+                self.parallel(name)
+                self.emit(name, 'started')
+                futures[drivers.submit(self._timed, name, job)] = name
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = e
+                    self.emit(name, 'failed', e)
+                    continue
+                self.emit(name, 'finished', results[name])
+        self.emit(None, 'summary', self.summary())
+        return results
+
+    def _timed(self, name, job):
+        start = time.perf_counter()
+        try:
+            return job()
+        finally:
+            self.stats[name]['wall_seconds'] = time.perf_counter() - start
+
+    def summary(self):
+        """CPU accounting across all models: busy CPU seconds against the budget"""
+        wall = time.perf_counter() - self._start
+        cpu = sum(s['cpu_seconds'] for s in self.stats.values())
+        return {
+            'workers': self.n_workers,
+            'cpu_budget': self.cpu_budget,
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'utilization': cpu / (wall * self.cpu_budget) if wall else 0.0,
+            'models': {name: dict(s) for name, s in self.stats.items()},
+        }
+
+
+class _UnwrapFuture:
+    """Future view that drops the CPU timing attached by the worker"""
+
+    def __init__(self, future):
+        self._future = future
+
+    def result(self, timeout=None):
+        return self._future.result(timeout)[0]
+
+
+def _print_event(name, event, payload=None):
+    if event == 'started':
+        print(f'[{name}] started')
+    elif event == 'progress':
+        print(f"[{name}] {payload['tasks']} fits done, {payload['cpu_seconds']:.1f} CPU s")
+    elif event == 'finished':
+        print(f'[{name}] finished: {payload}')
+    elif event == 'failed':
+        print(f'[{name}] failed: {payload}')
+    elif event == 'summary':
+        print(f"Trained {len(payload['models'])} models in {payload['wall_seconds']:.1f}s "
+              f"on {payload['cpu_budget']} CPUs ({payload['utilization']:.0%} utilization)")
@@ -0,0 +1,75 @@
+"""Pentest checks, one module per vulnerability category
+
+A check is an async probe registered with ``@check``. The engine runs it
+once per injection point of a target and per payload, so the probe only
+sends its requests and says whether the response shows the flaw. Adding a
+category is adding a module here and importing it at the bottom.
+"""
+
+CHECKS = []
+
+# Test depth is 1 to MAX_DEPTH; deeper scans try more payloads and crawl further
+MAX_DEPTH = 5
+
+
+class Check:
+    """One registered probe and the targets, payloads and depths it applies to"""
+
+    __slots__ = ('name', 'category', 'kind', 'probe', 'payloads', 'applies', 'intrusive', 'disruptive',
+                 'min_depth', 'severity')
+
+    def __init__(self, name, category, kind, probe, payloads, applies, intrusive, disruptive, min_depth, severity):
+        self.name = name
+        self.category = category
+        self.kind = kind
+        self.probe = probe
+        self.payloads = payloads
+        self.applies = applies
+        self.intrusive = intrusive or disruptive
+        self.disruptive = disruptive
+        self.min_depth = min_depth
+        self.severity = severity
+
+    def payloads_at(self, depth):
+        """Leading share of the payloads, most common first, tried at ``depth``"""
+        count = -(-len(self.payloads) * depth // MAX_DEPTH)
+        return self.payloads[:max(1, count)]
+
+
+def injectable(point):
+    """Points with a parameter or column to put payloads in"""
+    return point['field'] is not None
+
+
+def root_only(point):
+    """The single target-wide point, for checks that look at the target as a whole"""
+    return point['field'] is None
+
+
+def check(category, name, kind, payloads=(None,), applies=injectable, intrusive=False, disruptive=False,
+          min_depth=1, severity='medium'):
+    """Register ``probe(session, point, payload)``, which returns a finding dict or None
+
+    ``kind`` is the target type the probe speaks to ('http' or 'sqlite').
+    Intrusive checks exploit the flaw or authenticate, so safe mode never
+    runs them; disruptive ones may also take the target down and run
+    last.
+    """
+    def register(probe):
+        CHECKS.append(Check(name, category, kind, probe, tuple(payloads), applies, intrusive, disruptive,
+                            min_depth, severity))
+        return probe
+    return register
+
+
+def checks_for(categories, kind, depth):
+    return [c for c in CHECKS if c.category in categories and c.kind == kind and c.min_depth <= depth]
+
+
+from utils.pentest_checks import (authentication_bypass, buffer_overflow, cross_site_scripting,  # noqa: E402
+                                  remote_code_execution, sql_injection)
+
+# Category modules in the order the pentest page lists them
+MODULES = (sql_injection, remote_code_execution, buffer_overflow, cross_site_scripting, authentication_bypass)
+CATEGORIES = [module.CATEGORY for module in MODULES]
+REMEDIATION = {module.CATEGORY: module.REMEDIATION for module in MODULES}
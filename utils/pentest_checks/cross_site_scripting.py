@@ -0,0 +1,44 @@
+from utils.pentest_checks import check
+
+CATEGORY = 'Cross-Site Scripting'
+REMEDIATION = [
+    "HTML-escape user input when rendering it, using the template engine's autoescaping",
+    "Set a Content-Security-Policy that forbids inline scripts",
+    "Sanitize stored rich text with an allow-list HTML sanitizer",
+]
+
+# Markup that would run script if reflected verbatim
+REFLECTED = (
+    '<script>alert(7331)</script>',
+    '"><svg onload=alert(7331)>',
+    "'><img src=x onerror=alert(7331)>",
+    '<details open ontoggle=alert(7331)>',
+    '<ScRiPt>alert(7331)</sCrIpT>',
+)
+
+# LIKE patterns of script content stored in text columns
+STORED = ('%<script%', '%onerror=%', '%onload=%', '%javascript:%', '%<iframe%')
+
+
+@check(CATEGORY, 'Reflected cross-site scripting', 'http', payloads=REFLECTED, severity='medium')
+async def reflected(session, point, payload):
+    response = await session.send(point, payload)
+    if payload in response.text and 'html' in response.headers.get('content-type', 'text/html'):
+        return {'title': f"{point['field']!r} is reflected without escaping", 'evidence': payload}
+    return None
+
+
+def _text_column(point):
+    # Columns with text affinity, as SQLite derives it from the declared type
+    return point['field'] is not None and (not point['type'] or any(t in point['type'] for t in ('CHAR', 'CLOB', 'TEXT')))
+
+
+@check(CATEGORY, 'Stored script content', 'sqlite', payloads=STORED, applies=_text_column, severity='medium')
+async def stored(session, point, payload):
+    table, column = session.quote(point['table']), session.quote(point['field'])
+    rows = await session.query(f'SELECT COUNT(*), MIN(rowid) FROM {table} WHERE {column} LIKE ?', (payload,))
+    count, first = rows[0]
+    if count:
+        return {'title': f"{point['table']}.{point['field']} holds script markup",
+                'evidence': f"{count} row(s) match {payload!r}, first rowid {first}"}
+    return None
@@ -0,0 +1,49 @@
+import re
+
+from utils.pentest_checks import check
+
+CATEGORY = 'Remote Code Execution'
+REMEDIATION = [
+    "Never pass user input to a shell; call programs with an argument list",
+    "Validate input such as host names against a strict pattern",
+    "Do not render user input as a template; pass it to templates as data",
+]
+
+# Errors a shell prints when injected metacharacters break its parsing
+SHELL_ERRORS = re.compile(r'\b(?:ba)?sh: (?:-c: )?(?:line )?\d+: [^<\n]*|unexpected EOF while looking for matching')
+
+# 1337 * 7331: only an evaluated expression puts the product in the response
+PRODUCT = '9801547'
+
+
+@check(CATEGORY, 'Shell metacharacter handling', 'http', payloads=("'", '`', '$(', '"', ';('),
+       severity='high')
+async def shell_errors(session, point, payload):
+    baseline = await session.baseline(point)
+    if SHELL_ERRORS.search(baseline.text):
+        return None
+    response = await session.send(point, point['fields'][point['field']] + payload)
+    match = SHELL_ERRORS.search(response.text)
+    if match:
+        return {'title': f"{point['field']!r} reaches a shell command line", 'evidence': match.group(0)}
+    return None
+
+
+@check(CATEGORY, 'OS command injection', 'http', intrusive=True, severity='critical',
+       payloads=(';echo $((1337*7331))', '|echo $((1337*7331))', '&&echo $((1337*7331))',
+                 '$(echo $((1337*7331)))', '`echo $((1337*7331))`'))
+async def command_injection(session, point, payload):
+    response = await session.send(point, point['fields'][point['field']] + payload)
+    if PRODUCT in response.text:
+        return {'title': f"Commands injected through {point['field']!r} run on the server",
+                'evidence': f'{payload!r} printed {PRODUCT}'}
+    return None
+
+
+@check(CATEGORY, 'Server-side template injection', 'http', intrusive=True, severity='critical',
+       payloads=('{{1337*7331}}', '${1337*7331}', '<%= 1337*7331 %>', '#{1337*7331}'))
+async def template_injection(session, point, payload):
+    response = await session.send(point, payload)
+    if PRODUCT in response.text:
+        return {'title': f"{point['field']!r} is evaluated as a template", 'evidence': f'{payload!r} rendered {PRODUCT}'}
+    return None
@@ -0,0 +1,52 @@
+import re
+
+from utils.pentest_checks import check
+
+CATEGORY = 'SQL Injection'
+REMEDIATION = [
+    "Use parameterized queries or an ORM for every database call",
+    "Never show database errors to clients",
+    "Give the application's database account only the privileges it needs",
+]
+
+# Messages databases and drivers put in error pages
+ERROR_SIGNATURES = re.compile(r'sqlite3?\.\w*Error|unrecognized token|SQL syntax|syntax error at or near'
+                              r'|ORA-\d{5}|SQLSTATE\[|Unclosed quotation mark|near "[^"]*": syntax error', re.I)
+
+# Always-true and always-false conditions for numeric, quoted and commented contexts
+BOOLEAN_PAIRS = (
+    (' AND 1=1', ' AND 1=2'),
+    ("' AND '1'='1", "' AND '1'='2"),
+    (' AND 1=1-- ', ' AND 1=2-- '),
+    ("' AND 1=1-- ", "' AND 1=2-- "),
+    ('" AND "1"="1', '" AND "1"="2'),
+)
+
+
+@check(CATEGORY, 'Error-based SQL injection', 'http', severity='high',
+       payloads=("'", '"', "')", "';", '\\', "' OR", '"))', "'||'"))
+async def error_based(session, point, payload):
+    baseline = await session.baseline(point)
+    if ERROR_SIGNATURES.search(baseline.text):
+        return None
+    response = await session.send(point, point['fields'][point['field']] + payload)
+    match = ERROR_SIGNATURES.search(response.text)
+    if match:
+        return {'title': f"Database error from {point['field']!r}", 'evidence': f'HTTP {response.status}: {match.group(0)}'}
+    return None
+
+
+@check(CATEGORY, 'Boolean-based blind SQL injection', 'http', payloads=BOOLEAN_PAIRS, min_depth=2,
+       severity='high')
+async def boolean_based(session, point, payload):
+    original = point['fields'][point['field']]
+    baseline = await session.baseline(point)
+    true = await session.send(point, original + payload[0])
+    if (true.status, true.text) != (baseline.status, baseline.text):
+        return None
+    false = await session.send(point, original + payload[1])
+    if (false.status, false.text) == (baseline.status, baseline.text):
+        return None
+    return {'title': f"{point['field']!r} changes the query's result",
+            'evidence': f'true condition matches the original response, false condition gives HTTP {false.status} '
+                        f'with {len(false.text)} bytes instead of {len(baseline.text)}'}
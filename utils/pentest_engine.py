@@ -0,0 +1,364 @@
+import asyncio
+import re
+import sqlite3
+import ssl
+import time
+from contextlib import closing
+from html import unescape
+from urllib.parse import urlencode, urljoin, urlsplit, parse_qsl
+
+from utils import pentest_checks
+
+# HTTP methods that change resources; safe mode never sends them
+UNSAFE_METHODS = ('PUT', 'PATCH', 'DELETE')
+# Largest query string or body safe mode lets out, so no probe can flood a parser
+SAFE_MAX_PAYLOAD = 2048
+MAX_RESPONSE = 1024 * 1024
+USER_AGENT = 'DarkShield-Pentest/1.0'
+
+LINK = re.compile(r'''<a\b[^>]*\bhref\s*=\s*["']([^"'#]+)''', re.I)
+FORM = re.compile(r'<form\b([^>]*)>(.*?)</form>', re.I | re.S)
+INPUT = re.compile(r'<(?:input|textarea|select)\b([^>]*)>', re.I)
+ATTRIBUTE = re.compile(r'''(\w+)\s*=\s*["']([^"']*)["']''')
+STATUS_LINE = re.compile(r'HTTP/\d(?:\.\d)?\s+(\d{3})\b')
+
+
+class SafeModeViolation(Exception):
+    """A probe tried something safe mode does not allow against a live target"""
+
+
+class ProtocolError(Exception):
+    """A target answered with something that is not HTTP, e.g. an SSH banner"""
+
+
+class Response:
+    __slots__ = ('status', 'headers', 'text')
+
+    def __init__(self, status, headers, text):
+        self.status = status
+        self.headers = headers
+        self.text = text
+
+
+class _Session:
+    """Per-target connection state shared by every probe of one scan"""
+
+    def __init__(self, url, safe_mode, per_target, timeout, stats):
+        self.url = url
+        self.safe_mode = safe_mode
+        self.timeout = timeout
+        self.stats = stats
+        self._target = asyncio.Semaphore(per_target)
+        self._shared = {}
+
+    def shared(self, key, factory):
+        """Await ``factory()`` once per scan and hand every caller the same result, e.g. a baseline response"""
+        task = self._shared.get(key)
+        if task is None:
+            task = self._shared[key] = asyncio.ensure_future(factory())
+        return asyncio.shield(task)
+
+    async def _limited(self, operation):
+        # Waiting for a slot does not count against the timeout, only the exchange itself
+        async with self._target:
+            self.stats['requests'] += 1
+            return await asyncio.wait_for(operation, self.timeout)
+
+
+class HttpSession(_Session):
+    """HTTP/1.1 client over asyncio streams, one connection per request"""
+
+    kind = 'http'
+
+    def __init__(self, url, *args):
+        super().__init__(url, *args)
+        parts = urlsplit(url)
+        if not parts.hostname:
+            raise ValueError('no host in URL')
+        self.host = parts.hostname
+        self.tls = parts.scheme == 'https'
+        self.port = parts.port or (443 if self.tls else 80)
+        self.base = parts.path.rstrip('/')
+
+    async def request(self, method, path, fields=None, headers=None):
+        method = method.upper()
+        fields = urlencode(fields or {})
+        body = fields.encode('utf-8') if method == 'POST' else b''
+        if fields and method != 'POST':
+            path += ('&' if '?' in path else '?') + fields
+        if self.safe_mode:
+            if method in UNSAFE_METHODS:
+                raise SafeModeViolation(f'{method} is not allowed in safe mode')
+            if len(body) + len(path) > SAFE_MAX_PAYLOAD:
+                raise SafeModeViolation(f'{len(body) + len(path)}-byte request exceeds the safe mode limit')
+        lines = [f'{method} {self.base}{path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'User-Agent: {USER_AGENT}',
+                 'Accept: */*', 'Connection: close']
+        if method == 'POST':
+            lines += ['Content-Type: application/x-www-form-urlencoded', f'Content-Length: {len(body)}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        message = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+        return await self._limited(self._exchange(message))
+
+    async def _exchange(self, message):
+        reader, writer = await asyncio.open_connection(self.host, self.port,
+                                                       ssl=ssl.create_default_context() if self.tls else None)
+        try:
+            writer.write(message)
+            await writer.drain()
+            raw = await reader.read(MAX_RESPONSE)
+            while len(raw) < MAX_RESPONSE:
+                more = await reader.read(MAX_RESPONSE - len(raw))
+                if not more:
+                    break
+                raw += more
+        finally:
+            writer.close()
+        head, _, body = raw.partition(b'\r\n\r\n')
+        if not head:
+            raise EOFError('empty response')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        status = STATUS_LINE.match(status_line)
+        if status is None:
+            raise ProtocolError(f'not an HTTP response: {status_line[:80]!r}')
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = _dechunk(body)
+        return Response(int(status.group(1)), headers, body.decode('utf-8', 'replace'))
+
+    async def send(self, point, value=None):
+        """Request a point with its field set to ``value``, or with its defaults if None"""
+        fields = dict(point['fields'])
+        if value is not None:
+            fields[point['field']] = value
+        return await self.request(point['method'], point['path'], fields)
+
+    def baseline(self, point):
+        return self.shared(('baseline', point['method'], point['path']), lambda: self.send(point))
+
+    async def discover(self, depth):
+        """Crawl same-origin links and forms breadth-first and return their injection points
+
+        Every parameter of a link or form is a point, plus one target-wide
+        point with no field. Deeper scans visit more pages.
+        """
+        points = {('GET', '/', None): {'method': 'GET', 'path': '/', 'fields': {}, 'field': None}}
+        queue, seen = ['/'], {'/'}
+        pages = 0
+        while queue and pages < 4 * depth:
+            page = queue.pop(0)
+            pages += 1
+            try:
+                text = (await self.request('GET', page)).text
+            except (OSError, EOFError, ProtocolError, asyncio.TimeoutError, SafeModeViolation):
+                if page == '/':
+                    raise
+                continue
+            endpoints = []
+            for href in LINK.findall(text):
+                endpoints.append(('GET', unescape(href), {}))
+            for attributes, content in FORM.findall(text):
+                form = dict(ATTRIBUTE.findall(attributes))
+                inputs = [dict(ATTRIBUTE.findall(tag)) for tag in INPUT.findall(content)]
+                endpoints.append((form.get('method', 'GET').upper(), unescape(form.get('action') or page),
+                                  {i['name']: i.get('value', 'test') for i in inputs if 'name' in i}))
+            for method, href, fields in endpoints:
+                try:
+                    parts = urlsplit(urljoin(f'{self.url}{page}', href))
+                except ValueError:
+                    # A malformed link on the page, e.g. an unclosed IPv6 host
+                    continue
+                if parts.netloc and parts.netloc != urlsplit(self.url).netloc:
+                    continue
+                path = parts.path[len(self.base):] or '/'
+                fields = {**dict(parse_qsl(parts.query)), **fields}
+                if path not in seen:
+                    seen.add(path)
+                    queue.append(path)
+                for name in fields:
+                    points.setdefault((method, path, name), {'method': method, 'path': path, 'fields': fields,
+                                                             'field': name})
+        return list(points.values())
+
+
+class DatabaseSession(_Session):
+    """SQLite client that runs queries in worker threads; safe mode opens the file read-only"""
+
+    kind = 'sqlite'
+
+    def __init__(self, url, *args):
+        super().__init__(url, *args)
+        self.path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url[len('sqlite:'):]
+
+    @staticmethod
+    def quote(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def _query(self, sql, params):
+        mode = 'ro' if self.safe_mode else 'rw'
+        with closing(sqlite3.connect(f'file:{self.path}?mode={mode}', uri=True)) as connection:
+            try:
+                return connection.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as exc:
+                if 'readonly' in str(exc):
+                    raise SafeModeViolation(f'writes are not allowed in safe mode: {exc}') from exc
+                raise
+
+    async def query(self, sql, params=()):
+        return await self._limited(asyncio.to_thread(self._query, sql, params))
+
+    async def discover(self, depth):
+        """One point per table column, plus one for the database as a whole"""
+        points = [{'table': None, 'type': '', 'field': None}]
+        tables = await self.query("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        for (table,) in tables:
+            for row in await self.query(f'PRAGMA table_info({self.quote(table)})'):
+                points.append({'table': table, 'type': (row[2] or '').upper(), 'field': row[1]})
+        return points
+
+
+SESSIONS = {'http': HttpSession, 'https': HttpSession, 'sqlite': DatabaseSession}
+
+
+def _dechunk(body):
+    data = b''
+    while body:
+        size, _, rest = body.partition(b'\r\n')
+        length = int(size.split(b';')[0] or b'0', 16)
+        if length == 0:
+            break
+        data += rest[:length]
+        body = rest[length + 2:]
+    return data
+
+
+def _point_name(point):
+    if 'table' in point:
+        return 'database' if point['table'] is None else f"{point['table']}.{point['field']}"
+    return f"{point['method']} {point['path']}" + (f" [{point['field']}]" if point['field'] else '')
+
+
+async def stream_scan(targets, categories, depth=3, safe_mode=True, concurrency=32, per_target=4, timeout=5.0,
+                      stats=None):
+    """Run every applicable check against ``targets`` concurrently, yielding findings as they are confirmed
+
+    Targets are URLs: ``http(s)://host:port`` or ``sqlite:///path``. Each
+    target is crawled for injection points first; then one task per
+    check and point runs its payloads in turn, with at most
+    ``concurrency`` probes in flight overall and ``per_target`` requests
+    to one target, each request limited to ``timeout`` seconds. Once a
+    check confirms a flaw at a point, its remaining payloads there are
+    skipped. Disruptive checks run after all others, so a target they
+    knock over does not hide other findings. In safe mode intrusive checks are not scheduled and
+    sessions refuse anything that could change the target. ``stats`` is
+    updated in place as the scan runs.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(dict.fromkeys(('planned', 'done', 'found', 'skipped', 'blocked', 'timeouts', 'errors',
+                                'requests'), 0))
+    stats.update({'targets': len(targets), 'started': time.perf_counter(), 'target_errors': {}})
+    limit = asyncio.Semaphore(concurrency)
+    sessions = []
+    for url in targets:
+        # Targets are free text from the page; a malformed one is reported, the others are still scanned
+        try:
+            session_type = SESSIONS.get(urlsplit(url).scheme)
+            if session_type is None:
+                stats['target_errors'][url] = 'unsupported scheme'
+                continue
+            sessions.append(session_type(url, safe_mode, per_target, timeout, stats))
+        except ValueError as exc:
+            stats['target_errors'][url] = f'invalid URL: {exc}'
+
+    async def discover(session):
+        try:
+            return session, await session.discover(depth)
+        except (OSError, EOFError, ProtocolError, sqlite3.Error, asyncio.TimeoutError) as exc:
+            stats['target_errors'][session.url] = str(exc) or type(exc).__name__
+            return session, []
+
+    async def run(session, check, point, payloads):
+        # Payloads of one check at one point go in order, stopping at the first that confirms the flaw
+        for tried, payload in enumerate(payloads):
+            try:
+                async with limit:
+                    finding = await check.probe(session, point, payload)
+            except SafeModeViolation:
+                stats['blocked'] += 1
+                finding = None
+            except asyncio.TimeoutError:
+                stats['timeouts'] += 1
+                finding = None
+            except Exception:
+                # A failing probe or a broken check plugin costs one result, not the scan
+                stats['errors'] += 1
+                finding = None
+            stats['done'] += 1
+            if finding is not None:
+                stats['skipped'] += len(payloads) - tried - 1
+                return {'target': session.url, 'category': check.category, 'check': check.name,
+                        'severity': check.severity, 'point': _point_name(point),
+                        'payload': '' if payload is None else str(payload), **finding}
+        return None
+
+    phases = ([], [])
+    for session, points in await asyncio.gather(*(discover(s) for s in sessions)):
+        for check in pentest_checks.checks_for(categories, session.kind, depth):
+            payloads = check.payloads_at(depth)
+            probes = [(session, check, point, payloads) for point in points if check.applies(point)]
+            if safe_mode and check.intrusive:
+                stats['blocked'] += len(probes) * len(payloads)
+            else:
+                phases[check.disruptive].extend(probes)
+                stats['planned'] += len(probes) * len(payloads)
+    for probes in phases:
+        tasks = [asyncio.ensure_future(run(*probe)) for probe in probes]
+        try:
+            for future in asyncio.as_completed(tasks):
+                finding = await future
+                if finding is not None:
+                    stats['found'] += 1
+                    yield finding
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def run_scan(targets, categories, depth=3, safe_mode=True, concurrency=32, per_target=4, timeout=5.0,
+             on_finding=None, on_progress=None, progress_interval=0.2):
+    """Run a scan to completion and return its findings and statistics
+
+    ``on_finding`` is called with each finding as soon as it is confirmed,
+    and ``on_progress`` with the running statistics at most every
+    ``progress_interval`` seconds, both in the calling thread.
+    """
+    findings = []
+    stats = {}
+
+    def progress():
+        elapsed = max(time.perf_counter() - stats['started'], 1e-9)
+        return {**stats, 'elapsed': elapsed, 'checks_per_second': stats['done'] / elapsed}
+
+    async def collect():
+        async for finding in stream_scan(targets, categories, depth, safe_mode, concurrency, per_target, timeout,
+                                         stats):
+            findings.append(finding)
+            if on_finding is not None:
+                on_finding(finding)
+
+    async def main():
+        # Progress keeps ticking while no finding arrives
+        task = asyncio.ensure_future(collect())
+        while not task.done():
+            await asyncio.wait([task], timeout=progress_interval)
+            if on_progress is not None and 'started' in stats:
+                on_progress(progress())
+        return task.result()
+
+    asyncio.run(main())
+    report = progress()
+    del report['started']
+    report['findings'] = findings
+    return report
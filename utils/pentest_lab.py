@@ -0,0 +1,197 @@
+import html
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Seconds the web app answers 503 after its emulated buffer overflow "crashes" it
+CRASH_SECONDS = 2.0
+BUFFER_SIZE = 256
+
+SEED = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT NOT NULL, password TEXT, role TEXT);
+CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL);
+CREATE TABLE comments (id INTEGER PRIMARY KEY, author TEXT, body TEXT);
+INSERT INTO users (username, password, role) VALUES
+    ('admin', 'admin123', 'admin'),
+    ('alice', '$2b$12$KIXQJ0nWcW1lYx8b2eYyUe1m4k0JpXW3v9l7Jx5y0mZQm7hQe3r6y', 'user'),
+    ('svc_backup', '', 'service');
+INSERT INTO products (name, price) VALUES
+    ('widget', 9.99), ('gadget', 24.50), ('gizmo', 4.75), ('widget pro', 19.99);
+INSERT INTO comments (author, body) VALUES
+    ('alice', 'Works as described'),
+    ('mallory', 'Nice!<img src=x onerror=alert(document.cookie)>');
+"""
+
+INDEX = """<html><body><h1>Demo Shop</h1>
+<a href="/search?q=widget">Search</a> <a href="/products?id=1">Product</a>
+<a href="/comment?text=hello">Comment preview</a> <a href="/safe?q=hello">Escaped preview</a>
+<a href="/greet?name=guest">Greeting</a> <a href="/profile?name=guest">Profile</a>
+<a href="/ping?host=127.0.0.1">Network check</a> <a href="/about">About</a>
+<form action="/login" method="post"><input name="username"><input name="password" type="password"></form>
+</body></html>"""
+
+ABOUT = """<html><body><p>Demo Shop, a deliberately vulnerable app.</p>
+<a href="/">Home</a> <a href="/search?q=gizmo">Gizmos</a></body></html>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes of the stand-in web app; every flaw is emulated, nothing is executed"""
+
+    server_version = 'DemoHTTPD/1.0.2'
+    sys_version = ''
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._route(parse_qs(urlsplit(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self._route(parse_qs(self.rfile.read(length).decode('utf-8', 'replace')))
+
+    def _route(self, params):
+        if time.time() < self.server.crashed_until:
+            return self._reply(503, 'Service Unavailable')
+        path = urlsplit(self.path).path
+        value = lambda name, default='': params.get(name, [default])[0]
+        routes = {
+            '/': lambda: (200, INDEX),
+            '/about': lambda: (200, ABOUT),
+            '/search': lambda: self._search(value('q')),
+            '/products': lambda: self._product(value('id', '1')),
+            '/comment': lambda: (200, f"<p>Preview: {value('text')}</p>"),
+            '/safe': lambda: (200, f"<p>Preview: {html.escape(value('q'))}</p>"),
+            '/greet': lambda: (200, f"<p>Hello {self._template(value('name'))}</p>"),
+            '/profile': lambda: self._profile(value('name')),
+            '/ping': lambda: (200, f"<pre>{self._shell(value('host'))}</pre>"),
+            '/login': lambda: self._login(value('username'), value('password')),
+            # Only the exact path is protected; the trailing-slash alias and debug flag skip the check
+            '/admin': lambda: (200, '<h1>Admin console</h1>') if value('debug') == 'true'
+            or 'session=' in (self.headers.get('Cookie') or '') else (401, 'Unauthorized'),
+            '/admin/': lambda: (200, '<h1>Admin console</h1>'),
+        }
+        route = routes.get(path)
+        if route is None:
+            return self._reply(404, 'Not Found')
+        self._reply(*route())
+
+    def _reply(self, status, body, cookie=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if cookie:
+            self.send_header('Set-Cookie', f'session={cookie}; HttpOnly')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _query(self, sql):
+        with closing(sqlite3.connect(f'file:{self.server.database}?mode=ro', uri=True)) as connection:
+            return connection.execute(sql).fetchall()
+
+    def _search(self, q):
+        try:
+            rows = self._query(f"SELECT name, price FROM products WHERE name LIKE '%{q}%'")
+        except sqlite3.Error as exc:
+            return 500, f'<pre>sqlite3.{type(exc).__name__}: {html.escape(str(exc))}</pre>'
+        items = ''.join(f'<li>{html.escape(name)} ${price}</li>' for name, price in rows)
+        return 200, f'<p>Results for {html.escape(q)}</p><ul>{items}</ul>'
+
+    def _product(self, product_id):
+        try:
+            rows = self._query(f'SELECT name, price FROM products WHERE id = {product_id}')
+        except sqlite3.Error:
+            return 500, '<p>Something went wrong</p>'
+        return 200, ''.join(f'<h2>{html.escape(name)}</h2><p>${price}</p>' for name, price in rows)
+
+    def _login(self, username, password):
+        try:
+            rows = self._query(f"SELECT id FROM users WHERE username = '{username}' AND password = '{password}'")
+        except sqlite3.Error:
+            rows = []
+        if rows:
+            return 200, '<p>Welcome back</p>', f'demo-{rows[0][0]}'
+        return 401, '<p>Invalid username or password</p>', None
+
+    def _profile(self, name):
+        if len(name) > BUFFER_SIZE:
+            # A fixed-size name buffer overflows and takes the whole service down for a while
+            self.server.crashed_until = time.time() + CRASH_SECONDS
+            return 500, 'Segmentation fault (core dumped)'
+        return 200, f'<p>Profile of {html.escape(name)}</p>'
+
+    @staticmethod
+    def _template(text):
+        return re.sub(r'\{\{\s*(\d+)\s*\*\s*(\d+)\s*\}\}', lambda m: str(int(m.group(1)) * int(m.group(2))),
+                      html.escape(text))
+
+    @staticmethod
+    def _shell(host):
+        """Output of ``ping -c 1 <host>`` as a shell would give it, without running anything"""
+        if host.count("'") % 2 or host.count('"') % 2 or host.count('`') % 2:
+            return 'sh: 1: Syntax error: Unterminated quoted string'
+        if host.count('$(') > host.count(')'):
+            return 'sh: 1: Syntax error: end of file unexpected (expecting ")")'
+        output = [f'PING {html.escape(host.split(";")[0].split("|")[0].split("&")[0].strip())}: 56 data bytes']
+        for a, b in re.findall(r'(?:;|\||&&|\$\(|`)\s*echo \$\(\((\d+)\*(\d+)\)\)', host):
+            output.append(str(int(a) * int(b)))
+        return '\n'.join(output)
+
+
+class PentestLab:
+    """Deliberately vulnerable stand-in services on localhost for exercising the pentest engine
+
+    A small web app with SQL injection, reflected XSS, command and template
+    injection, an emulated buffer overflow and broken access control, and
+    the SQLite database behind it with weak credentials and stored script
+    content. Flaws are emulated in Python; no command is ever executed.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or tempfile.mkdtemp(prefix='darkshield-lab-')
+        self.database = os.path.join(self.root, 'lab.db')
+        self._server = None
+
+    @property
+    def http_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def database_url(self):
+        return f'sqlite:///{self.database}'
+
+    def start(self):
+        if self._server is not None:
+            return self
+        if os.path.exists(self.database):
+            os.remove(self.database)
+        with closing(sqlite3.connect(self.database)) as connection:
+            connection.executescript(SEED)
+            connection.commit()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.database = self.database
+        self._server.crashed_until = 0.0
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
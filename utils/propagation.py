@@ -0,0 +1,121 @@
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.sparse import csr_matrix
+from scipy.stats import mannwhitneyu
+
+from utils.reachability import MEMBERSHIP
+
+# Chance per time step that an attacker on one node compromises a neighbour
+RULE_PROBABILITY = 0.3
+MEMBER_PROBABILITY = 0.5
+
+# Trials simulated together as the columns of one state matrix
+BATCH_SIZE = 128
+
+
+def hazard_matrix(engine, rule_probability=RULE_PROBABILITY, member_probability=MEMBER_PROBABILITY):
+    """Transposed (target, source) matrix of per-step infection hazards over an engine's active edges
+
+    With hazards h = -log(1 - p), a node whose infected in-neighbours have
+    total hazard H escapes infection in a step with probability exp(-H),
+    exactly the product of the independent per-edge escape probabilities.
+    """
+    active = engine.active
+    probability = np.where(engine.kind[active] == MEMBERSHIP, member_probability, rule_probability)
+    hazard = -np.log1p(-np.clip(probability, 0.0, 1.0 - 1e-12))
+    return csr_matrix((hazard.astype(np.float32), (engine.dst[active], engine.src[active])),
+                      shape=(engine.n, engine.n))
+
+
+def _run_batch(hazard_t, sources, targets, hosts, steps, trials, seed):
+    """Simulate ``trials`` independent outbreaks at once; every column of the state is one trial"""
+    rng = np.random.default_rng(seed)
+    n = hazard_t.shape[0]
+    infected = np.zeros((n, trials), dtype=bool)
+    infected[rng.choice(sources, size=trials), np.arange(trials)] = True
+    first_infected = np.full((n, trials), np.inf, dtype=np.float32)
+    first_infected[infected] = 0
+    curve = np.zeros((steps + 1, trials), dtype=np.int32)
+    curve[0] = infected[hosts].sum(axis=0)
+    for step in range(1, steps + 1):
+        pressure = hazard_t @ infected.astype(np.float32)
+        exposed = (pressure > 0) & ~infected
+        # Only nodes with an infected in-neighbour in some trial can change this step
+        rows = np.flatnonzero(exposed.any(axis=1))
+        if not len(rows):
+            # Every trial has reached all it ever can
+            curve[step:] = curve[step - 1]
+            break
+        draws = rng.random((len(rows), trials), dtype=np.float32)
+        hit = exposed[rows] & (draws < -np.expm1(-pressure[rows]))
+        infected[rows] |= hit
+        first_infected[rows] = np.where(hit, np.float32(step), first_infected[rows])
+        curve[step] = infected[hosts].sum(axis=0)
+    time_to_target = first_infected[targets].min(axis=0) if len(targets) else np.full(trials, np.inf)
+    return curve, time_to_target, infected.sum(axis=1)
+
+
+def simulate_propagation(engine, sources, targets=(), trials=1000, steps=50, rule_probability=RULE_PROBABILITY,
+                         member_probability=MEMBER_PROBABILITY, seed=0, batch_size=BATCH_SIZE, n_jobs=1):
+    """Monte Carlo spread of a compromise over an engine's current topology
+
+    Every trial starts from one randomly chosen node of ``sources`` and
+    runs ``steps`` discrete time steps. Trials are split into fixed batches
+    seeded from one SeedSequence, so results depend on ``seed`` and
+    ``batch_size`` only, not on ``n_jobs``. Returns arrays over trials of
+    hosts compromised at the end ('infected') and steps until the first
+    node of ``targets`` falls ('time_to_target', inf when it never does),
+    the per-step percentiles of compromised hosts ('curve') and each node's
+    chance of being compromised ('node_probability').
+    """
+    source_nodes = np.array([engine.index[name] for name in sources], dtype=np.int64)
+    target_nodes = np.array([engine.index[name] for name in targets], dtype=np.int64)
+    if not len(source_nodes):
+        raise ValueError("At least one source is required")
+    hazard_t = hazard_matrix(engine, rule_probability, member_probability)
+    hosts = np.flatnonzero(engine.is_host)
+    sizes = [min(batch_size, trials - start) for start in range(0, trials, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    batches = Parallel(n_jobs=n_jobs)(
+        delayed(_run_batch)(hazard_t, source_nodes, target_nodes, hosts, steps, size, child)
+        for size, child in zip(sizes, seeds)
+    )
+    curve = np.concatenate([b[0] for b in batches], axis=1)
+    return {
+        'infected': curve[-1],
+        'time_to_target': np.concatenate([b[1] for b in batches]),
+        'curve': np.percentile(curve, [10, 50, 90], axis=1).T,
+        'node_probability': sum(b[2] for b in batches) / trials,
+        'trials': trials,
+        'steps': steps,
+    }
+
+
+def summarize(result):
+    infected = result['infected']
+    reached = np.isfinite(result['time_to_target'])
+    return {
+        'mean_infected': float(infected.mean()),
+        'p90_infected': float(np.percentile(infected, 90)),
+        'target_compromised_pct': float(100.0 * reached.mean()),
+        'median_time_to_target': float(np.median(result['time_to_target'][reached])) if reached.any() else None,
+    }
+
+
+def compare_strategies(engine, strategies, sources, targets=(), **options):
+    """Simulate each isolation strategy ({name: names to isolate}) and test it against no isolation
+
+    Every strategy runs with the same seed. Infected counts are compared to
+    the baseline with a one-sided Mann-Whitney U test.
+    """
+    baseline = simulate_propagation(engine, sources, targets, **options)
+    results = {'No isolation': (baseline, summarize(baseline))}
+    for name, isolate in strategies.items():
+        isolated = engine.clone()
+        isolated.isolate(isolate)
+        # A source inside an isolated segment still starts the outbreak there
+        result = simulate_propagation(isolated, sources, targets, **options)
+        summary = summarize(result)
+        summary['p_value'] = float(mannwhitneyu(result['infected'], baseline['infected'], alternative='less').pvalue)
+        results[name] = (result, summary)
+    return results
@@ -0,0 +1,366 @@
+import json
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+from utils.log_parser import LogBatch, parse_bytes, parse_lines
+
+# Series keys pack a dimension into the high bits and its value into the low 32
+ATTACK_TYPE, SUBNET = 0, 1
+DIMENSIONS = {ATTACK_TYPE: 'attack_type', SUBNET: 'subnet'}
+
+
+class RateAnomalyDetector:
+    """EWMA and seasonal z-scores over per-attack-type and per-subnet event rates
+
+    Events are counted into ticks of ``tick`` seconds of event time. When a
+    tick closes, every tracked series is updated at once with array
+    arithmetic: a fast EWMA mean/variance, and a slower one per seasonal
+    bucket (by default the hour of day). A series alerts when its count is
+    at least ``min_count`` and its z-score against the seasonal baseline
+    (or the EWMA baseline until that has warmed up) reaches ``sensitivity``.
+
+    All state lives in preallocated arrays of ``capacity`` series; when they
+    fill up, the series that have been quiet longest are recycled.
+    """
+
+    def __init__(self, tick=60, alpha=0.1, seasonal_alpha=0.05, season_ticks=1440, seasonal_buckets=24,
+                 sensitivity=4.0, min_count=5, warmup_ticks=30, capacity=200000, subnet_prefix=24,
+                 max_alerts=1000):
+        self.tick = tick
+        self.alpha = alpha
+        self.seasonal_alpha = seasonal_alpha
+        self.season_ticks = season_ticks
+        self.seasonal_buckets = seasonal_buckets
+        self.sensitivity = sensitivity
+        self.min_count = min_count
+        self.warmup_ticks = warmup_ticks
+        self.capacity = capacity
+        self.subnet_shift = 32 - subnet_prefix
+        self.subnet_prefix = subnet_prefix
+
+        self.mean = np.zeros(capacity, dtype=np.float32)
+        self.var = np.zeros(capacity, dtype=np.float32)
+        self.season_mean = np.zeros((capacity, seasonal_buckets), dtype=np.float32)
+        self.season_var = np.zeros((capacity, seasonal_buckets), dtype=np.float32)
+        self.season_seen = np.zeros((capacity, seasonal_buckets), dtype=np.uint16)
+        self.observed = np.zeros(capacity, dtype=np.int32)
+        self.last_active = np.zeros(capacity, dtype=np.int64)
+        self.in_use = np.zeros(capacity, dtype=bool)
+        self.slot_key = np.zeros(capacity, dtype=np.int64)
+        self.pending = np.zeros(capacity, dtype=np.int32)
+
+        # Sorted key -> slot index, searched with np.searchsorted
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._slots = np.zeros(0, dtype=np.int64)
+        self._attack_names = {}
+        self._attack_by_id = []
+
+        self.high_water = 0
+        self.current_tick = None
+        self.alerts = deque(maxlen=max_alerts)
+        self.ticks_processed = 0
+        self.events = 0
+        self.late_events = 0
+        self.recycled = 0
+
+    # -- series bookkeeping -----------------------------------------------------
+
+    def _attack_ids(self, names):
+        ids = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            if name not in self._attack_names:
+                self._attack_names[name] = len(self._attack_by_id)
+                self._attack_by_id.append(name)
+            ids[i] = self._attack_names[name]
+        return ids
+
+    def _slots_for(self, keys):
+        """Slot of every key, allocating slots for keys seen for the first time"""
+        unique, inverse = np.unique(keys, return_inverse=True)
+        position = np.searchsorted(self._keys, unique)
+        found = position < len(self._keys)
+        found[found] = self._keys[position[found]] == unique[found]
+        slots = np.empty(len(unique), dtype=np.int64)
+        slots[found] = self._slots[position[found]]
+
+        new_keys = unique[~found]
+        if len(new_keys):
+            new_slots = self._allocate(len(new_keys), protect=slots[found])
+            slots[~found] = new_slots
+            self.slot_key[new_slots] = new_keys
+            merged_keys = np.concatenate([self._keys, new_keys])
+            merged_slots = np.concatenate([self._slots, new_slots])
+            order = np.argsort(merged_keys, kind='stable')
+            self._keys, self._slots = merged_keys[order], merged_slots[order]
+        return slots[inverse.ravel()]
+
+    def _allocate(self, count, protect):
+        free = np.flatnonzero(~self.in_use)
+        if len(free) < count:
+            self._recycle(count - len(free) + self.capacity // 10, protect)
+            free = np.flatnonzero(~self.in_use)
+        if len(free) < count:
+            raise ValueError(f"A single batch touches more than {self.capacity} series")
+        slots = free[:count]
+        self.high_water = max(self.high_water, int(slots[-1]) + 1)
+        self._reset(slots)
+        self.in_use[slots] = True
+        self.last_active[slots] = self.current_tick or 0
+        return slots
+
+    def _reset(self, slots):
+        for array in (self.mean, self.var, self.season_mean, self.season_var, self.season_seen,
+                      self.observed, self.pending):
+            array[slots] = 0
+
+    def _recycle(self, count, protect):
+        candidates = self.in_use & (self.pending == 0)
+        candidates[protect] = False
+        used = np.flatnonzero(candidates)
+        count = min(count, len(used))
+        if count == 0:
+            return
+        victims = used[np.argpartition(self.last_active[used], count - 1)[:count]]
+        self.in_use[victims] = False
+        keep = ~np.isin(self._slots, victims)
+        self._keys, self._slots = self._keys[keep], self._slots[keep]
+        self.recycled += count
+
+    def describe(self, slot):
+        key = int(self.slot_key[slot])
+        dimension, value = key >> 32, key & 0xFFFFFFFF
+        if dimension == ATTACK_TYPE:
+            return 'attack_type', self._attack_by_id[value]
+        network = value << self.subnet_shift
+        return 'subnet', f"{network >> 24}.{(network >> 16) & 255}.{(network >> 8) & 255}.{network & 255}/{self.subnet_prefix}"
+
+    # -- updates ------------------------------------------------------------------
+
+    def _close_tick(self, tick, counts):
+        """Fold one tick of counts into every live series and return its alerts"""
+        # Slots are handed out lowest first, so every live series sits below the high-water mark
+        hw = self.high_water
+        live = self.in_use[:hw]
+        counts = counts[:hw]
+        x = counts.astype(np.float32)
+        mean, var = self.mean[:hw], self.var[:hw]
+        bucket = (tick % self.season_ticks) * self.seasonal_buckets // self.season_ticks
+
+        z_ewma = (x - mean) / (np.sqrt(var) + 1.0)
+        s_mean = self.season_mean[:hw, bucket].copy()
+        s_var = self.season_var[:hw, bucket].copy()
+        z_season = (x - s_mean) / (np.sqrt(s_var) + 1.0)
+        seasonal_ready = self.season_seen[:hw, bucket] >= 3
+        z = np.where(seasonal_ready, z_season, z_ewma)
+
+        firing = live & (self.observed[:hw] >= self.warmup_ticks) & (counts >= self.min_count) & (z >= self.sensitivity)
+        alerts = []
+        for slot in np.flatnonzero(firing):
+            dimension, label = self.describe(slot)
+            expected = float(s_mean[slot] if seasonal_ready[slot] else mean[slot])
+            alerts.append({
+                'time': np.datetime64(int(tick * self.tick), 's'),
+                'dimension': dimension,
+                'series': label,
+                'count': int(counts[slot]),
+                'expected': round(expected, 2),
+                'z': round(float(z[slot]), 1),
+            })
+
+        diff = x - mean
+        var[:] = np.where(live, (1 - self.alpha) * (var + self.alpha * diff * diff), var)
+        mean += np.where(live, self.alpha * diff, 0)
+        s_diff = x - s_mean
+        self.season_mean[:hw, bucket] = np.where(live, s_mean + self.seasonal_alpha * s_diff, s_mean)
+        self.season_var[:hw, bucket] = np.where(
+            live, (1 - self.seasonal_alpha) * (s_var + self.seasonal_alpha * s_diff * s_diff), s_var)
+        seen = self.season_seen[:hw, bucket]
+        seen[live & (seen < 65535)] += 1
+        self.observed[:hw] += live
+        self.last_active[:hw][counts > 0] = tick
+        self.ticks_processed += 1
+        self.alerts.extend(alerts)
+        return alerts
+
+    def _skip_quiet(self, first_tick, ticks):
+        """Apply ``ticks`` consecutive zero-count ticks in closed form
+
+        After k zero observations an EWMA with factor d = (1 - alpha)^k has
+        mean m*d and variance d*(v + m^2*(1 - d)), so a silence of any length
+        costs one pass over the arrays. Quiet ticks cannot alert.
+        """
+        if ticks <= 0:
+            return
+        hw = self.high_water
+        live = self.in_use[:hw]
+        mean, var = self.mean[:hw], self.var[:hw]
+        decay = np.float32((1 - self.alpha) ** ticks)
+        var[:] = np.where(live, decay * (var + mean * mean * (1 - decay)), var)
+        mean[:] = np.where(live, mean * decay, mean)
+
+        cycles, remainder = divmod(ticks, self.season_ticks)
+        bucket_of = np.arange(self.season_ticks) * self.seasonal_buckets // self.season_ticks
+        per_bucket = cycles * np.bincount(bucket_of, minlength=self.seasonal_buckets)
+        per_bucket += np.bincount(bucket_of[(first_tick + np.arange(remainder)) % self.season_ticks],
+                                  minlength=self.seasonal_buckets)
+        s_decay = ((1 - self.seasonal_alpha) ** per_bucket).astype(np.float32)
+        live_rows = live[:, np.newaxis]
+        s_mean, s_var, seen = self.season_mean[:hw], self.season_var[:hw], self.season_seen[:hw]
+        s_var[:] = np.where(live_rows, s_decay * (s_var + s_mean * s_mean * (1 - s_decay)), s_var)
+        s_mean[:] = np.where(live_rows, s_mean * s_decay, s_mean)
+        seen[:] = np.where(live_rows, np.minimum(seen + per_bucket, 65535), seen)
+        self.observed[:hw] += live * np.int32(min(ticks, 2 ** 30))
+        self.ticks_processed += ticks
+
+    def _advance_to(self, tick):
+        if self.current_tick is None:
+            self.current_tick = tick
+            return []
+        if tick <= self.current_tick:
+            return []
+        alerts = self._close_tick(self.current_tick, self.pending)
+        self.pending[:] = 0
+        self._skip_quiet(self.current_tick + 1, tick - self.current_tick - 1)
+        self.current_tick = tick
+        return alerts
+
+    def update(self, batch):
+        """Count a batch of log events; returns the alerts of every tick it closed"""
+        if not isinstance(batch, LogBatch):
+            batch = parse_lines(batch)
+        usable = ~np.isnat(batch.timestamp)
+        ticks = batch.timestamp[usable].astype(np.int64) // self.tick
+        if not len(ticks):
+            return []
+        type_codes, type_names = batch.column('attack_type')
+        attack_keys = (ATTACK_TYPE << 32) | self._attack_ids(type_names)[type_codes[usable]]
+        subnets = (batch.ip[usable].astype(np.int64) >> self.subnet_shift)
+        subnet_keys = np.where(batch.ip_valid[usable], (SUBNET << 32) | subnets, -1)
+
+        if self.current_tick is not None:
+            late = ticks < self.current_tick
+            self.late_events += int(late.sum())
+            # Late events are counted into the open tick rather than rewriting history
+            ticks = np.maximum(ticks, self.current_tick)
+
+        order = np.argsort(ticks, kind='stable')
+        ticks, attack_keys, subnet_keys = ticks[order], attack_keys[order], subnet_keys[order]
+        boundaries = np.flatnonzero(np.diff(ticks)) + 1
+        alerts = []
+        for start, stop in zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [len(ticks)]])):
+            alerts.extend(self._advance_to(int(ticks[start])))
+            keys = np.concatenate([attack_keys[start:stop], subnet_keys[start:stop]])
+            keys = keys[keys >= 0]
+            slots = self._slots_for(keys)
+            self.pending += np.bincount(slots, minlength=self.capacity).astype(np.int32)
+        self.events += len(ticks)
+        return alerts
+
+    def flush(self):
+        """Close the open tick"""
+        if self.current_tick is None:
+            return []
+        return self._advance_to(self.current_tick + 1)
+
+    def series_count(self):
+        return int(self.in_use.sum())
+
+    def top_series(self, dimension=None, limit=10):
+        """Series with the highest current baseline rate"""
+        slots = np.flatnonzero(self.in_use)
+        if dimension is not None:
+            wanted = ATTACK_TYPE if dimension == 'attack_type' else SUBNET
+            slots = slots[(self.slot_key[slots] >> 32) == wanted]
+        slots = slots[np.argsort(-self.mean[slots])[:limit]]
+        return [(*self.describe(slot), float(self.mean[slot])) for slot in slots]
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'series': self.series_count(),
+            'ticks': self.ticks_processed,
+            'alerts': len(self.alerts),
+            'late_events': self.late_events,
+            'recycled_series': self.recycled,
+            'memory_mb': sum(a.nbytes for a in (self.mean, self.var, self.season_mean, self.season_var,
+                                                self.season_seen, self.observed, self.last_active,
+                                                self.in_use, self.slot_key, self.pending)) / 1024 ** 2,
+        }
+
+
+class LogRateMonitor:
+    """Tails a log file and feeds newly appended lines to a RateAnomalyDetector
+
+    With a ``store`` (a TimeSeriesStore) the per-second event counts are also
+    recorded as the ``series`` time series. How far the log has been recorded
+    is saved next to the store, so after a restart the detector re-reads the
+    log to rebuild its baselines but the store only receives new lines.
+    """
+
+    def __init__(self, path, store=None, series='events.total', **detector_options):
+        self.path = path
+        self.store = store
+        self.series = series
+        self.detector_options = detector_options
+        self._lock = threading.Lock()
+        self.state_path = os.path.join(store.root, f'{series}.tail.json') if store is not None else None
+        self.stored_inode, self.stored_offset = self._load_state()
+        self._reset()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            return state['inode'], state['offset']
+        except (TypeError, OSError, ValueError, KeyError):
+            return None, 0
+
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'inode': self.stored_inode, 'offset': self.stored_offset}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _reset(self):
+        self.detector = RateAnomalyDetector(**self.detector_options)
+        self.offset = 0
+        self.inode = None
+
+    def poll(self):
+        """Process lines appended since the last poll; returns new alerts"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return []
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                # The log was replaced or truncated: start over
+                self._reset()
+                self.inode = stat.st_ino
+            if stat.st_ino != self.stored_inode or stat.st_size < self.stored_offset:
+                # Nothing of this file has been recorded yet
+                self.stored_inode, self.stored_offset = stat.st_ino, 0
+            if stat.st_size == self.offset:
+                return []
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(stat.st_size - self.offset)
+            complete = data.rfind(b'\n') + 1
+            if complete == 0:
+                return []
+            batch = parse_bytes(data[:complete])
+            if self.store is not None:
+                # Lines before the saved offset were recorded before a restart
+                skip = max(self.stored_offset - self.offset, 0)
+                if skip < complete:
+                    unseen = batch if skip == 0 else parse_bytes(data[skip:complete])
+                    seconds = unseen.timestamp[~np.isnat(unseen.timestamp)].astype(np.int64)
+                    self.store.append_many(self.series, seconds, np.ones(len(seconds)))
+                    self.store.flush()
+                    self.stored_offset = self.offset + complete
+                    self._save_state()
+            self.offset += complete
+            return self.detector.update(batch)
@@ -0,0 +1,258 @@
+import importlib.util
+import ipaddress
+import os
+import re
+from collections import deque
+
+import numpy as np
+
+from utils.log_parser import LogBatch, parse_lines, factorize_rows, first_occurrence, TEXT_FIELDS
+
+ACTIONS = ('alert', 'allow', 'tag')
+
+# Distinct field values remembered per field before the memo is reset
+MEMO_LIMIT = 100000
+
+ATTACK_SIM_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'IDSfiles.py', 'AttackSim.py')
+
+
+class AhoCorasick:
+    """Multi-pattern substring automaton; finds every keyword in one pass over the text"""
+
+    def __init__(self, patterns, case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in self._fold(pattern):
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                state = next_state
+            self.output[state].add(index)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                if self.fail[next_state] == next_state:
+                    self.fail[next_state] = 0
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def _fold(self, text):
+        return text if self.case_sensitive else text.lower()
+
+    def search(self, text):
+        """Indices of every pattern occurring in ``text``"""
+        found = set()
+        state = 0
+        for char in self._fold(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                found |= self.output[state]
+        return found
+
+
+class Rule:
+    """A detection rule: text conditions on one log field plus optional IP/CIDR conditions
+
+    The text condition holds when any keyword or the regex matches ``field``;
+    the address condition when the source IP lies in any of ``cidrs`` and in
+    none of ``exclude_cidrs``. A rule matches when every condition it defines
+    holds.
+    """
+
+    def __init__(self, rule_id, keywords=(), regex=None, cidrs=(), exclude_cidrs=(), field='message',
+                 action='tag', description=''):
+        if field not in TEXT_FIELDS:
+            raise ValueError(f"field must be one of {TEXT_FIELDS}")
+        if action not in ACTIONS:
+            raise ValueError(f"action must be one of {ACTIONS}")
+        if not (keywords or regex or cidrs or exclude_cidrs):
+            raise ValueError(f"Rule {rule_id} has no conditions")
+        self.rule_id = rule_id
+        self.keywords = tuple(keywords)
+        self.regex = regex
+        self.cidrs = tuple(ipaddress.ip_network(c, strict=False) for c in cidrs)
+        self.exclude_cidrs = tuple(ipaddress.ip_network(c, strict=False) for c in exclude_cidrs)
+        self.field = field
+        self.action = action
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, spec):
+        spec = dict(spec)
+        return cls(spec.pop('id'), **spec)
+
+
+def _network_bounds(networks):
+    # IPv4 networks as [first, last] address ranges; other families never match parsed IPv4
+    ranges = [(int(n.network_address), int(n.broadcast_address)) for n in networks if n.version == 4]
+    if not ranges:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint32)
+    ranges.sort()
+    merged = [list(ranges[0])]
+    for first, last in ranges[1:]:
+        if first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    bounds = np.array(merged, dtype=np.uint32)
+    return bounds[:, 0], bounds[:, 1]
+
+
+def _in_ranges(ip, firsts, lasts):
+    # Binary search over sorted, disjoint ranges: O(log ranges) per address
+    position = np.searchsorted(firsts, ip, side='right') - 1
+    inside = position >= 0
+    position = np.maximum(position, 0)
+    return inside & (ip <= lasts[position])
+
+
+class RuleEngine:
+    """Compiled ruleset evaluated over whole LogBatches at once
+
+    All keywords of all rules go into one Aho-Corasick automaton and the
+    regexes are compiled once. Text conditions are evaluated per distinct
+    field value of a batch and broadcast to its lines through the batch's
+    integer codes; IP conditions are binary searches over merged CIDR
+    ranges. Results for distinct values are memoized across batches, so
+    on recurring vocabulary the per-line cost is a handful of array gathers.
+    """
+
+    def __init__(self, rules):
+        self.rules = [rule if isinstance(rule, Rule) else Rule.from_dict(rule) for rule in rules]
+        ids = [rule.rule_id for rule in self.rules]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Rule ids must be unique")
+        self.rule_ids = np.array(ids, dtype=object)
+        self.actions = np.array([rule.action for rule in self.rules], dtype=object)
+
+        keywords = sorted({kw for rule in self.rules for kw in rule.keywords})
+        self.automaton = AhoCorasick(keywords)
+        keyword_index = {kw: i for i, kw in enumerate(keywords)}
+        self._rule_keywords = [{keyword_index[kw] for kw in rule.keywords} for rule in self.rules]
+        self._regexes = [re.compile(rule.regex, re.IGNORECASE) if rule.regex else None for rule in self.rules]
+        self._has_text = np.array([bool(rule.keywords or rule.regex) for rule in self.rules])
+        self._ranges = [_network_bounds(rule.cidrs) if rule.cidrs else None for rule in self.rules]
+        self._excluded = [_network_bounds(rule.exclude_cidrs) if rule.exclude_cidrs else None for rule in self.rules]
+        self._by_field = {field: [i for i, rule in enumerate(self.rules) if rule.field == field and self._has_text[i]]
+                          for field in TEXT_FIELDS}
+        self._memo = {field: {} for field in TEXT_FIELDS}
+
+    def _text_row(self, field, value):
+        row = self._memo[field].get(value)
+        if row is None:
+            found = self.automaton.search(value)
+            row = np.zeros(len(self.rules), dtype=bool)
+            for i in self._by_field[field]:
+                regex = self._regexes[i]
+                row[i] = bool(found & self._rule_keywords[i]) or (regex is not None and regex.search(value) is not None)
+            memo = self._memo[field]
+            if len(memo) >= MEMO_LIMIT:
+                memo.clear()
+            memo[value] = row
+        return row
+
+    def match(self, batch):
+        """Boolean (lines, rules) matrix of rule hits"""
+        if not isinstance(batch, LogBatch):
+            batch = parse_lines(batch)
+        n = len(batch)
+        hits = np.ones((n, len(self.rules)), dtype=bool)
+        for field in TEXT_FIELDS:
+            rules = self._by_field[field]
+            if not rules:
+                continue
+            codes, uniques = batch.column(field)
+            table = np.zeros((len(uniques), len(rules)), dtype=bool)
+            for row, value in enumerate(uniques):
+                table[row] = self._text_row(field, value)[rules]
+            hits[:, rules] = table[codes]
+
+        for i in range(len(self.rules)):
+            ranges, excluded = self._ranges[i], self._excluded[i]
+            if ranges is None and excluded is None:
+                continue
+            address = batch.ip_valid.copy()
+            if ranges is not None:
+                address &= _in_ranges(batch.ip, *ranges)
+            if excluded is not None:
+                address &= ~_in_ranges(batch.ip, *excluded)
+            hits[:, i] &= address
+        return hits
+
+    def tag(self, batch):
+        """Object array holding the tuple of matching rule ids for every line"""
+        hits = self.match(batch)
+        if not len(hits):
+            return np.empty(0, dtype=object)
+        # Lines sharing a hit pattern share one tuple
+        codes = factorize_rows(np.packbits(hits, axis=1))
+        labels = np.empty(int(codes.max()) + 1, dtype=object)
+        for code, line in enumerate(first_occurrence(codes)):
+            labels[code] = tuple(self.rule_ids[hits[line]])
+        return labels[codes]
+
+    def decide(self, batch):
+        """Per-line verdict: 1 for an alert rule, 0 for an allow rule, -1 when no rule decides
+
+        Alert rules win over allow rules, so an allowlist never hides a known attack.
+        """
+        hits = self.match(batch)
+        alert = hits[:, self.actions == 'alert'].any(axis=1)
+        allow = hits[:, self.actions == 'allow'].any(axis=1)
+        return np.where(alert, 1, np.where(allow, 0, -1))
+
+    def counts(self, batch):
+        """Number of lines matched by each rule"""
+        return dict(zip(self.rule_ids, self.match(batch).sum(axis=0).tolist()))
+
+
+def rule_scorer(engine):
+    """CascadeStage scorer: alerts score 1, allowed lines 0 and undecided lines 0.5
+
+    As the first stage of a cascade over LogBatches, with a band such as
+    ``low=0.25, high=0.75``, only lines no rule decides reach the ML stages,
+    which receive them through their ``features`` hook.
+    """
+    def score(batch):
+        verdict = engine.decide(batch)
+        return np.where(verdict == 1, 1.0, np.where(verdict == 0, 0.0, 0.5))
+    return score
+
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def load_attack_vocabulary(path=ATTACK_SIM_PATH):
+    """The attack types and breach terms defined by the log simulator"""
+    spec = importlib.util.spec_from_file_location('attack_sim', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return list(module.attack_types), list(module.breach_terms)
+
+
+def attack_sim_rules(attack_action='alert', term_action='tag'):
+    """Ruleset covering the AttackSim vocabulary: one rule per attack type and per breach term"""
+    attack_types, breach_terms = load_attack_vocabulary()
+    rules = [Rule(f'attack:{_slug(a)}', keywords=[a], field='attack_type', action=attack_action,
+                  description=f'{a} reported') for a in attack_types]
+    rules += [Rule(f'term:{_slug(t)}', keywords=[t], field='breach_term', action=term_action,
+                   description=f'Breach term "{t}"') for t in breach_terms]
+    return rules
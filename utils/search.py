@@ -0,0 +1,459 @@
+import math
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.pipeline import Pipeline
+
+from utils.eval_store import params_key
+from utils.transform_cache import fingerprint, transformer_key
+
+try:
+    from sklearn.utils._param_validation import validate_parameter_constraints
+except ImportError:  # scikit-learn < 1.2 has no declarative constraints
+    validate_parameter_constraints = None
+
+STRATEGIES = ('grid', 'random', 'halving', 'hyperband')
+
+# Parameters an estimator silently ignores under some other setting. Candidates
+# that only differ in ignored parameters are the same fit, so they are collapsed
+# into one before anything is trained.
+IGNORED_PARAMS = {
+    'MLPClassifier': [
+        (('momentum', 'nesterovs_momentum', 'learning_rate', 'power_t'),
+         lambda p: p.get('solver', 'adam') != 'sgd'),
+        (('nesterovs_momentum',), lambda p: p.get('momentum', 0.9) == 0),
+        (('beta_1', 'beta_2', 'epsilon'), lambda p: p.get('solver', 'adam') != 'adam'),
+        (('learning_rate_init', 'early_stopping', 'n_iter_no_change', 'batch_size', 'shuffle'),
+         lambda p: p.get('solver', 'adam') == 'lbfgs'),
+        (('validation_fraction',),
+         lambda p: p.get('solver', 'adam') == 'lbfgs' or not p.get('early_stopping', False)),
+    ],
+    'SVC': [
+        (('gamma',), lambda p: p.get('kernel', 'rbf') == 'linear'),
+        (('degree',), lambda p: p.get('kernel', 'rbf') != 'poly'),
+        (('coef0',), lambda p: p.get('kernel', 'rbf') not in ('poly', 'sigmoid')),
+    ],
+}
+
+# Cross-parameter combinations the estimator rejects at fit time
+INVALID_COMBINATIONS = {
+    'LogisticRegression': [
+        lambda p: "penalty 'l1' needs solver 'liblinear' or 'saga'"
+        if p.get('penalty') == 'l1' and p.get('solver', 'lbfgs') not in ('liblinear', 'saga') else None,
+        lambda p: "penalty 'elasticnet' needs solver 'saga'"
+        if p.get('penalty') == 'elasticnet' and p.get('solver', 'lbfgs') != 'saga' else None,
+    ],
+}
+
+
+def _split_key(key):
+    step, _, name = key.rpartition('__')
+    return step, name
+
+
+class BudgetedSearch:
+    """Exhaustive, randomized, successive-halving or Hyperband search under a compute budget
+
+    Drop-in for the parts of ``GridSearchCV`` the training scripts use
+    (``fit``, ``best_params_``, ``best_score_``, ``best_estimator_``). The
+    resource being halved is the number of training samples. The budget is a
+    number of fold fits (``max_fits``), a wall clock limit in seconds
+    (``max_time``), or both; whichever runs out first ends the search.
+
+    Fold fits are dispatched through ``parallel``, any callable taking joblib
+    ``delayed`` tasks; by default a ``joblib.Parallel`` with ``n_jobs``.
+    With a ``transform_cache``, pipeline steps before the classifier are
+    fitted once per fold and transformer setting and reused by every
+    candidate that only changes classifier parameters. With an
+    ``evaluation_store``, fold scores already recorded by an earlier or
+    concurrent run are reused instead of refitted, so an interrupted search
+    resumes where it stopped, and ``warm_start`` seeds the candidate stream
+    with the best candidates the store already knows about.
+    """
+
+    def __init__(self, estimator, param_grid, strategy='halving', cv=5, max_fits=None, max_time=None,
+                 n_candidates=None, eta=3, min_resources=None, stop_margin=0.1, n_jobs=-1,
+                 random_state=42, refit=True, verbose=True, parallel=None, transform_cache=None,
+                 evaluation_store=None, warm_start=10):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown search strategy '{strategy}', expected one of {STRATEGIES}")
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.strategy = strategy
+        self.cv = cv
+        self.max_fits = max_fits
+        self.max_time = max_time
+        self.n_candidates = n_candidates
+        self.eta = eta
+        self.min_resources = min_resources
+        self.stop_margin = stop_margin
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.refit = refit
+        self.verbose = verbose
+        self.parallel = parallel
+        self.transform_cache = transform_cache
+        self.evaluation_store = evaluation_store
+        self.warm_start = warm_start
+
+        self.best_params_ = None
+        self.best_score_ = None
+        self.best_estimator_ = None
+        self.refit_time_ = None
+        self.store_keys_ = None
+        self.history_ = []
+        self.report_ = None
+
+    # -- candidate generation ------------------------------------------------
+
+    def _target_params(self, params):
+        """Group pipeline-prefixed parameters by the step they belong to"""
+        by_step = {}
+        for key, value in params.items():
+            step, name = _split_key(key)
+            by_step.setdefault(step, {})[name] = value
+        return by_step
+
+    def _step_estimator(self, step):
+        if not step:
+            return self.estimator
+        return self.estimator.get_params()[step]
+
+    def check_candidate(self, params):
+        """Return (canonical_params, reason); reason is set when the candidate can never fit"""
+        canonical = dict(params)
+        for step, step_params in self._target_params(params).items():
+            estimator = self._step_estimator(step)
+            name = type(estimator).__name__
+            prefix = f'{step}__' if step else ''
+            effective = {**estimator.get_params(deep=False), **step_params}
+
+            if validate_parameter_constraints is not None and hasattr(estimator, '_parameter_constraints'):
+                constraints = {k: v for k, v in estimator._parameter_constraints.items() if k in step_params}
+                try:
+                    validate_parameter_constraints(constraints, step_params, caller_name=name)
+                except ValueError as e:
+                    return canonical, str(e)
+
+            for rule in INVALID_COMBINATIONS.get(name, []):
+                reason = rule(effective)
+                if reason:
+                    return canonical, f"{name}: {reason}"
+
+            for names, is_ignored in IGNORED_PARAMS.get(name, []):
+                if is_ignored(effective):
+                    for param in names:
+                        canonical.pop(prefix + param, None)
+        return canonical, None
+
+    def candidate_stream(self, rng, seeds=()):
+        """Yield distinct valid candidates in random order without expanding the grid
+
+        ``seeds`` are yielded first, e.g. the best candidates of earlier runs.
+        """
+        grid = ParameterGrid(self.param_grid)
+        total = len(grid)
+        self._stats = {'grid_size': total, 'sampled': 0, 'invalid': 0, 'duplicates': 0}
+        seen = set()
+
+        for params in seeds:
+            canonical, reason = self.check_candidate(params)
+            if reason is None and params_key(canonical) not in seen:
+                seen.add(params_key(canonical))
+                yield canonical
+
+        # Small grids are walked as a permutation; huge ones are sampled with replacement
+        order = rng.permutation(total) if total <= 1_000_000 else None
+        for draw in range(total):
+            index = int(order[draw]) if order is not None else int(rng.integers(total))
+            self._stats['sampled'] += 1
+
+            canonical, reason = self.check_candidate(grid[index])
+            if reason:
+                self._stats['invalid'] += 1
+                continue
+            key = params_key(canonical)
+            if key in seen:
+                self._stats['duplicates'] += 1
+                continue
+            seen.add(key)
+            yield canonical
+
+    def _take(self, stream, n):
+        return [candidate for _, candidate in zip(range(n), stream)]
+
+    # -- evaluation ----------------------------------------------------------
+
+    def _budget_left(self):
+        if self.max_fits is not None and self._fits_run >= self.max_fits:
+            return 0
+        if self.max_time is not None and time.perf_counter() - self._start >= self.max_time:
+            return 0
+        return float('inf') if self.max_fits is None else self.max_fits - self._fits_run
+
+    def _folds(self, X, y, n_resources):
+        n_resources = min(n_resources, len(y))
+        indices = self._sample_order[:n_resources]
+        splitter = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        return [(indices[train], indices[test]) for train, test in splitter.split(X[indices], y[indices])]
+
+    def _run_rung(self, candidates, X, y, n_resources, parallel, early_stop=True):
+        """Score candidates fold by fold, abandoning those that fall behind the leader"""
+        folds = self._folds(X, y, n_resources)
+        scores = [[] for _ in candidates]
+        alive = list(range(len(candidates)))
+
+        for fold_index, (train, test) in enumerate(folds):
+            fold_key = f'{fingerprint(train)}:{fingerprint(test)}'
+            reused = {}
+            if self.evaluation_store is not None:
+                found = self.evaluation_store.lookup(*self.store_keys_, [candidates[i] for i in alive], fold_key)
+                reused = {i: found[params_key(candidates[i])] for i in alive if params_key(candidates[i]) in found}
+
+            pending = [i for i in alive if i not in reused]
+            batch = pending[:int(min(self._budget_left(), len(pending)))]
+            if not batch and not reused:
+                break
+
+            results = []
+            if batch:
+                if self._data_key is not None:
+                    self._warm_transforms([candidates[i] for i in batch], X, train, test, parallel)
+                results = parallel(
+                    delayed(_fit_and_score)(self.estimator, candidates[i], X, y, train, test,
+                                            self.transform_cache, self._data_key) for i in batch
+                )
+                self._fits_run += len(batch)
+
+            for i, (score, _) in reused.items():
+                scores[i].append(score)
+            self._fits_reused += len(reused)
+            for i, (score, _, cache_status) in zip(batch, results):
+                self._count_cache(cache_status)
+                scores[i].append(score)
+                if np.isnan(score):
+                    self._failed += 1
+            if self.evaluation_store is not None and batch:
+                self.evaluation_store.record(*self.store_keys_, [
+                    (candidates[i], fold_key, n_resources, score, fit_time)
+                    for i, (score, fit_time, _) in zip(batch, results)
+                ])
+            alive = [i for i in alive if len(scores[i]) == fold_index + 1 and not np.isnan(scores[i][-1])]
+
+            # A candidate whose running mean trails the best by more than the
+            # margin is very unlikely to recover over the remaining folds
+            if early_stop and 1 <= fold_index < len(folds) - 1 and len(alive) > 1:
+                means = {i: np.mean(scores[i]) for i in alive}
+                leader = max(means.values())
+                stopped = [i for i in alive if means[i] < leader - self.stop_margin]
+                self._early_stopped += len(stopped)
+                self._fits_avoided_early += len(stopped) * (len(folds) - fold_index - 1)
+                alive = [i for i in alive if means[i] >= leader - self.stop_margin]
+
+        rung = []
+        for i, candidate in enumerate(candidates):
+            complete = i in alive and len(scores[i]) == len(folds)
+            mean = float(np.mean(scores[i])) if scores[i] else float('nan')
+            rung.append({
+                'params': candidate,
+                'n_resources': n_resources,
+                'folds_run': len(scores[i]),
+                'mean_score': mean,
+                'complete': complete,
+            })
+        self.history_.extend(rung)
+        return rung
+
+    def _warm_transforms(self, candidates, X, train, test, parallel):
+        """Fill the cache once per distinct transformer setting before a wave of fits"""
+        distinct = {}
+        for params in candidates:
+            transformers = clone(self.estimator).set_params(**params)[:-1]
+            distinct.setdefault(transformer_key(transformers), transformers)
+        statuses = parallel(
+            delayed(_warm_transform)(self.transform_cache, transformers, X, train, test, self._data_key)
+            for transformers in distinct.values()
+        )
+        for status in statuses:
+            self._count_cache(status)
+
+    def _count_cache(self, status):
+        if status == 'hit':
+            self._cache_hits += 1
+        elif status == 'miss':
+            self._cache_misses += 1
+
+    def _successive_halving(self, candidates, X, y, min_resources, parallel):
+        n_resources = min_resources
+        max_resources = len(y)
+        ranked = []
+        while candidates:
+            rung = self._run_rung(candidates, X, y, n_resources, parallel)
+            rung_ranked = sorted((r for r in rung if r['complete']), key=lambda r: r['mean_score'], reverse=True)
+            # An exhausted budget leaves the previous rung as the best evidence
+            if rung_ranked:
+                ranked = rung_ranked
+            if n_resources >= max_resources or len(rung_ranked) <= 1 or self._budget_left() <= 0:
+                break
+            keep = max(1, len(rung_ranked) // self.eta)
+            candidates = [r['params'] for r in rung_ranked[:keep]]
+            n_resources = min(n_resources * self.eta, max_resources)
+        return ranked
+
+    def fit(self, X, y):
+        # asanyarray keeps memory-mapped inputs mapped when tasks are pickled
+        X = np.asanyarray(X)
+        y = np.asanyarray(y)
+        rng = np.random.default_rng(self.random_state)
+        self._start = time.perf_counter()
+        self._fits_run = 0
+        self._failed = 0
+        self._early_stopped = 0
+        self._fits_avoided_early = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._fits_reused = 0
+        cacheable = (self.transform_cache is not None and isinstance(self.estimator, Pipeline)
+                     and len(self.estimator.steps) > 1)
+        X_key = fingerprint(X) if cacheable or self.evaluation_store is not None else None
+        self._data_key = X_key if cacheable else None
+        seeds = []
+        if self.evaluation_store is not None:
+            self.store_keys_ = (f'{X_key}:{fingerprint(y)}', transformer_key(self.estimator))
+            if self.warm_start:
+                seeds = [params for params, _ in self.evaluation_store.best_candidates(
+                    *self.store_keys_, n_resources=len(y), n_folds=self.cv, limit=self.warm_start)]
+        self._sample_order = rng.permutation(len(y))
+        self.history_ = []
+
+        n_classes = len(np.unique(y))
+        min_resources = self.min_resources or min(len(y), 2 * self.cv * n_classes)
+        max_resources = len(y)
+        max_rounds = max(0, int(math.floor(math.log(max_resources / min_resources, self.eta))))
+        stream = self.candidate_stream(rng, seeds)
+
+        finalists = []
+        backend = self.parallel if self.parallel is not None else Parallel(n_jobs=self.n_jobs)
+        with backend as parallel:
+            if self.strategy == 'grid':
+                candidates = self._take(stream, len(ParameterGrid(self.param_grid)))
+                rung = self._run_rung(candidates, X, y, max_resources, parallel, early_stop=False)
+                finalists = [r for r in rung if r['complete']]
+            elif self.strategy == 'random':
+                n = self.n_candidates or (self.max_fits // self.cv if self.max_fits else 20)
+                rung = self._run_rung(self._take(stream, n), X, y, max_resources, parallel)
+                finalists = [r for r in rung if r['complete']]
+            elif self.strategy == 'halving':
+                # Each rung keeps 1/eta of the candidates, so the fits form a
+                # geometric series of roughly n * cv * eta / (eta - 1)
+                default = self.max_fits * (self.eta - 1) // (self.eta * self.cv) if self.max_fits else 0
+                n = self.n_candidates or max(default, self.eta ** (max_rounds + 1))
+                finalists = self._successive_halving(self._take(stream, n), X, y, min_resources, parallel)
+            else:
+                # Hyperband: brackets trade many cheap candidates against few
+                # well-resourced ones. With a budget set, brackets repeat with
+                # fresh candidates until the budget or the grid runs out.
+                while True:
+                    for s in range(max_rounds, -1, -1):
+                        if self._budget_left() <= 0:
+                            break
+                        n = int(math.ceil((max_rounds + 1) / (s + 1) * self.eta ** s))
+                        candidates = self._take(stream, n)
+                        if not candidates:
+                            break
+                        n_resources = max(min_resources, max_resources // self.eta ** s)
+                        finalists.extend(self._successive_halving(candidates, X, y, n_resources, parallel))
+                    else:
+                        if self.max_fits is not None or self.max_time is not None:
+                            continue
+                    break
+
+            finalists = [r for r in finalists if r['n_resources'] >= max_resources] or finalists
+            if not finalists:
+                raise RuntimeError("Search budget exhausted before any candidate completed cross-validation")
+            best = max(finalists, key=lambda r: r['mean_score'])
+            self.best_params_ = best['params']
+            self.best_score_ = best['mean_score']
+            elapsed = time.perf_counter() - self._start
+
+            if self.refit:
+                refit_start = time.perf_counter()
+                self.best_estimator_ = parallel([delayed(_refit)(self.estimator, self.best_params_, X, y)])[0]
+                self.refit_time_ = time.perf_counter() - refit_start
+
+        stats = self._stats
+        exhaustive_fits = stats['grid_size'] * self.cv
+        self.report_ = {
+            'strategy': self.strategy,
+            'grid_size': stats['grid_size'],
+            'exhaustive_fits': exhaustive_fits,
+            'fits_run': self._fits_run,
+            'fits_reused': self._fits_reused,
+            'warm_start_candidates': len(seeds),
+            'fits_avoided': exhaustive_fits - self._fits_run - self._fits_reused,
+            'candidates_sampled': stats['sampled'],
+            'pruned_invalid': stats['invalid'],
+            'pruned_duplicate': stats['duplicates'],
+            'early_stopped': self._early_stopped,
+            'fits_avoided_by_early_stopping': self._fits_avoided_early,
+            'failed_fits': self._failed,
+            'transform_cache_hits': self._cache_hits,
+            'transform_cache_misses': self._cache_misses,
+            'transform_cache_hit_rate': (self._cache_hits / (self._cache_hits + self._cache_misses)
+                                         if self._cache_hits + self._cache_misses else 0.0),
+            'elapsed_seconds': elapsed,
+            'best_score': self.best_score_,
+            'best_params': self.best_params_,
+        }
+
+        if self.verbose:
+            print(format_report(self.report_))
+        return self
+
+
+def _refit(estimator, params, X, y):
+    return clone(estimator).set_params(**params).fit(X, y)
+
+
+def _warm_transform(cache, transformers, X, train, test, data_key):
+    try:
+        return cache.fold_transform(transformers, X, train, test, data_key)[2]
+    except Exception:
+        return None
+
+
+def _fit_and_score(estimator, params, X, y, train, test, cache=None, data_key=None):
+    """Return (score, fit_time, cache_status) for one candidate on one fold"""
+    model = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    try:
+        if cache is not None and data_key is not None:
+            X_train, X_test, status = cache.fold_transform(model[:-1], X, train, test, data_key)
+            classifier = model.steps[-1][1]
+            classifier.fit(X_train, y[train])
+            return classifier.score(X_test, y[test]), time.perf_counter() - start, status
+        model.fit(X[train], y[train])
+        return model.score(X[test], y[test]), time.perf_counter() - start, None
+    except Exception:
+        return float('nan'), time.perf_counter() - start, None
+
+
+def format_report(report):
+    """Render a search report as a short plain-text summary"""
+    lines = [
+        f"Search strategy: {report['strategy']}",
+        f"Grid size: {report['grid_size']} candidates ({report['exhaustive_fits']} fits exhaustively)",
+        f"Fits run: {report['fits_run']} / reused from earlier runs: {report['fits_reused']} / "
+        f"avoided: {report['fits_avoided']}",
+        f"Pruned before fitting: {report['pruned_invalid']} invalid, {report['pruned_duplicate']} duplicate",
+        f"Stopped early: {report['early_stopped']} candidates "
+        f"({report['fits_avoided_by_early_stopping']} fold fits skipped)",
+        f"Failed fits: {report['failed_fits']}",
+        f"Transform cache: {report['transform_cache_hits']} hits, {report['transform_cache_misses']} misses "
+        f"({report['transform_cache_hit_rate']:.0%} hit rate)",
+        f"Elapsed: {report['elapsed_seconds']:.1f}s, best score {report['best_score']:.4f}",
+    ]
+    return '\n'.join(lines)
@@ -1,85 +1,208 @@
-import networkx as nx
+from itertools import combinations
+
+import numpy as np
 import plotly.graph_objects as go
 
-def run_network_isolation(segments):
-    # Simulate network isolation effects
+from utils.cluster_sim import ClusterSimulation
+from utils.graph_layout import default_cache, index_edges, edge_segments, aggregate_grid, decimate_edges
+from utils.propagation import compare_strategies
+from utils.reachability import ReachabilityEngine
+
+# Above these sizes nodes are aggregated into grid cells and edges are sampled
+MAX_DRAWN_NODES = 5000
+MAX_DRAWN_EDGES = 20000
+
+# Node names are drawn as text only on small graphs; larger ones show them on hover
+LABEL_LIMIT = 50
+
+# Segments, hosts and firewall rules of the demo network shown on the Isolation Scenarios page
+DEMO_TOPOLOGY = {
+    "segments": ["DMZ", "Production", "Database", "Development"],
+    "hosts": {
+        "dmz-web-1": "DMZ", "dmz-web-2": "DMZ", "dmz-mail": "DMZ",
+        "prod-app-1": "Production", "prod-app-2": "Production", "prod-app-3": "Production",
+        "db-primary": "Database", "db-replica": "Database",
+        "dev-ws-1": "Development", "dev-ws-2": "Development", "dev-ci": "Development",
+    },
+    "rules": [
+        {"src": "DMZ", "dst": "Production"},
+        {"src": "Production", "dst": "Database"},
+        {"src": "Development", "dst": "Production"},
+        {"src": "dev-ci", "dst": "db-replica"},
+        {"src": "Production", "dst": "dmz-mail"},
+    ],
+}
+
+# Trials x nodes x steps above which propagation batches fan out to joblib workers;
+# below it, starting the workers costs more than the simulation
+PARALLEL_WORK = 5e7
+
+# Blast-radius reduction (%) at which isolation counts as high, medium or low impact
+IMPACT_LEVELS = [(50.0, "high"), (20.0, "medium"), (0.0, "low")]
+
+_demo_engine = None
+
+def get_engine(topology=None):
+    """ReachabilityEngine for a topology dict or engine; the demo network by default"""
+    global _demo_engine
+    if isinstance(topology, ReachabilityEngine):
+        return topology
+    if topology is not None:
+        return ReachabilityEngine.from_dict(topology)
+    if _demo_engine is None:
+        _demo_engine = ReachabilityEngine.from_dict(DEMO_TOPOLOGY)
+    return _demo_engine
+
+def run_network_isolation(segments, topology=None):
+    """Isolate ``segments`` in a topology and report reachability and blast radius before and after"""
+    engine = get_engine(topology)
+    before = engine.blast_radius()
+    isolated = engine.clone()
+    after = isolated.isolate(segments)
+    reduction = 100.0 * (before - after) / before if before else 0.0
+    impact = next((label for floor, label in IMPACT_LEVELS if reduction > floor), "none")
     results = {
         "isolated_segments": segments,
-        "connectivity_matrix": {},
-        "security_impact": "high"
+        "connectivity_matrix": isolated.connectivity_matrix(),
+        "blast_radius": {"before": before, "after": after, "reduction": before - after,
+                         "reduction_pct": round(reduction, 1)},
+        "security_impact": impact,
+        "nodes": isolated.segments,
+        "edges": isolated.segment_edges(),
     }
     return results
 
-def create_network_graph(results):
-    G = nx.Graph()
-    
-    # Create nodes for each segment
-    for segment in results["isolated_segments"]:
-        G.add_node(segment)
-    
-    # Create edges between segments
-    for i, seg1 in enumerate(results["isolated_segments"]):
-        for seg2 in results["isolated_segments"][i+1:]:
-            G.add_edge(seg1, seg2)
-    
-    # Convert to plotly figure
-    pos = nx.spring_layout(G)
-    
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
-
-    node_x = []
-    node_y = []
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-    
+def segment_hosts(engine, segment):
+    """Names of the hosts in one segment of an engine"""
+    segment = engine.segments.index(segment)
+    return [name for name in engine.hosts if engine.segment_of[engine.index[name]] == segment]
+
+def run_attack_propagation(segments, entry="DMZ", target="Database", trials=1000, steps=30, topology=None,
+                           n_jobs=None):
+    """Monte Carlo attack spread from ``entry`` hosts with and without ``segments`` isolated
+
+    Returns one row per strategy with the compromised-host distribution,
+    the chance and median time of reaching a ``target`` host, and the
+    p-value of isolation lowering the compromised count. ``n_jobs`` defaults
+    to every core for runs above PARALLEL_WORK and to one otherwise.
+    """
+    engine = get_engine(topology)
+    if n_jobs is None:
+        n_jobs = -1 if trials * engine.n * steps >= PARALLEL_WORK else 1
+    strategies = {f"Isolate {', '.join(segments)}": segments} if segments else {}
+    compared = compare_strategies(engine, strategies, segment_hosts(engine, entry), segment_hosts(engine, target),
+                                  trials=trials, steps=steps, n_jobs=n_jobs)
+    return {
+        "strategies": {name: summary for name, (_, summary) in compared.items()},
+        "infected": {name: result["infected"] for name, (result, _) in compared.items()},
+        "curves": {name: result["curve"] for name, (result, _) in compared.items()},
+        "trials": trials,
+        "steps": steps,
+    }
+
+def create_network_graph(results, max_nodes=MAX_DRAWN_NODES, max_edges=MAX_DRAWN_EDGES, cache=None):
+    """Plotly figure of a segment topology
+
+    ``results`` may carry the topology as "nodes" and "edges"; without it the
+    isolated segments are drawn fully connected. Layouts come from a cache
+    keyed by topology, traces are WebGL, and graphs above ``max_nodes`` are
+    drawn as grid cells of nodes.
+    """
+    nodes = results.get("nodes") or results["isolated_segments"]
+    edges = results.get("edges")
+    if edges is None:
+        edges = combinations(nodes, 2)
+    nodes, pairs = index_edges(nodes, edges)
+    pos = (cache or default_cache).layout(nodes, pairs)
+    isolated = set(results["isolated_segments"])
+    flagged = np.array([node in isolated for node in nodes], dtype=bool)
+
+    if len(nodes) > max_nodes:
+        cells = int(np.sqrt(max_nodes))
+        centroids, counts, cell_of, links, weights = aggregate_grid(pos, pairs, cells)
+        flagged_counts = np.bincount(cell_of, flagged, len(counts)).astype(np.int64)
+        links = links[np.sort(np.argsort(-weights, kind='stable')[:max_edges])]
+        edge_x, edge_y = edge_segments(centroids, links)
+        node_trace = go.Scattergl(
+            x=centroids[:, 0], y=centroids[:, 1],
+            mode='markers',
+            hoverinfo='text',
+            text=[f"{c} nodes, {f} isolated" for c, f in zip(counts.tolist(), flagged_counts.tolist())],
+            marker=dict(size=4 + 3 * np.log2(counts), color=flagged_counts / counts,
+                        colorscale='Reds', cmin=0, cmax=1, line_width=1)
+        )
+        title = f"Network Isolation Simulation ({len(nodes):,} segments in {len(counts):,} cells)"
+    else:
+        edge_x, edge_y = edge_segments(pos, decimate_edges(pairs, max_edges, keep=flagged))
+        small = len(nodes) <= LABEL_LIMIT
+        node_trace = go.Scattergl(
+            x=pos[:, 0], y=pos[:, 1],
+            mode='markers+text' if small else 'markers',
+            hoverinfo='text',
+            text=[str(node) for node in nodes],
+            textposition="bottom center",
+            marker=dict(
+                size=30 if small else 6,
+                color=np.where(flagged, '#d62728', '#1f77b4'),
+                line_width=2 if small else 0
+            )
+        )
+        title = "Network Isolation Simulation"
+
     fig = go.Figure(data=[
-        go.Scatter(
+        go.Scattergl(
             x=edge_x, y=edge_y,
             line=dict(width=0.5, color='#888'),
             hoverinfo='none',
             mode='lines'
         ),
-        go.Scatter(
-            x=node_x, y=node_y,
-            mode='markers+text',
-            hoverinfo='text',
-            text=[str(node) for node in G.nodes()],
-            textposition="bottom center",
-            marker=dict(
-                size=30,
-                line_width=2
-            )
-        )
+        node_trace
     ])
-    
+
     fig.update_layout(
         showlegend=False,
         hovermode='closest',
         margin=dict(b=20,l=5,r=5,t=40),
-        title="Network Isolation Simulation"
+        title=title
     )
-    
+
     return fig
 
-def run_container_isolation(container_count):
-    return {
-        "isolated_containers": container_count,
-        "status": "success",
-        "network_impact": "minimal"
-    }
+def run_container_isolation(container_count, minutes=60, action="network", attacks_per_hour=6.0, seed=0):
+    """Simulate a cluster of ``container_count`` containers for ``minutes`` with automatic isolation
 
-def run_process_isolation(process_name):
-    return f"""
-Process: {process_name}
-Status: Isolated
-Resources: Restricted
-Network: Blocked
-"""
+    ``action`` is the response to a detected compromise (None to only
+    detect). Returns the simulation report plus a per-minute timeline.
+    """
+    sim = ClusterSimulation(container_count, seed=seed, response=action, attacks_per_hour=attacks_per_hour)
+    results = sim.run(60.0 * minutes)
+    results["timeline"] = sim.timeline()
+    return results
+
+def run_process_isolation(process_name, action="kill", container_count=1000, minutes=30, at_minute=10, seed=0,
+                          unfreeze_minute=None):
+    """Isolate every process named ``process_name`` across a cluster at ``at_minute`` and report the impact
+
+    Frozen processes resume at ``unfreeze_minute``, or stay frozen when it is None.
+    """
+    sim = ClusterSimulation(container_count, seed=seed, attacks_per_hour=0.0)
+    sim.run(60.0 * at_minute)
+    before = [row["throughput"] for row in sim.timeline()]
+    matched = sim.isolate_processes(process_name, action)
+    unfrozen = 0
+    if action == "freeze" and unfreeze_minute is not None and at_minute < unfreeze_minute < minutes:
+        sim.run(60.0 * unfreeze_minute)
+        unfrozen = sim.unfreeze_processes(process_name)
+    results = sim.run(60.0 * minutes)
+    after = [row["throughput"] for row in sim.timeline() if row["minute"] >= at_minute]
+    results["process"] = {
+        "name": process_name,
+        "action": action,
+        "matched": matched,
+        "unfrozen": unfrozen,
+        "containers_affected": len({p.container for p in sim.processes if p.isolated}),
+        "throughput_before_rps": round(float(np.mean(before)), 1) if before else None,
+        "throughput_after_rps": round(float(np.mean(after)), 1) if after else None,
+    }
+    results["timeline"] = sim.timeline()
+    return results
@@ -0,0 +1,340 @@
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Columns kept for every bucket at every resolution; the mean is sum / count
+COLUMNS = ('min', 'max', 'sum', 'count')
+MIN, MAX, SUM, COUNT = range(len(COLUMNS))
+
+DAY = 24 * 3600
+
+# (bucket seconds, retention seconds) from finest to coarsest
+DEFAULT_LEVELS = ((1, DAY), (60, 14 * DAY), (3600, 400 * DAY))
+
+# Buckets per chunk file at every resolution: an hour of 1 s data, 2.5 days of 1 m, 150 days of 1 h
+CHUNK_ROWS = 3600
+
+# Chunk files kept mapped per resolution of each series
+OPEN_CHUNKS = 4
+
+SERIES_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+def _merge(bucket, other):
+    """Fold the (min, max, sum, count) of ``other`` into ``bucket`` in place"""
+    if bucket[COUNT]:
+        bucket[MIN] = min(bucket[MIN], other[MIN])
+        bucket[MAX] = max(bucket[MAX], other[MAX])
+        bucket[SUM] += other[SUM]
+        bucket[COUNT] += other[COUNT]
+    else:
+        bucket[:] = other
+
+
+class _Level:
+    """One resolution of one series: fixed-size columnar chunk files plus the bucket being filled
+
+    A chunk holds ``rows`` consecutive buckets as four float64 columns, so a
+    bucket's position is implied by its timestamp and a range read is one
+    contiguous slice per column. Empty buckets have a zero count.
+    """
+
+    def __init__(self, directory, resolution, retention, rows):
+        self.directory = directory
+        self.resolution = resolution
+        self.retention = retention
+        self.rows = rows
+        self.span = resolution * rows
+        os.makedirs(directory, exist_ok=True)
+        self.chunks = sorted(int(name[:-6]) for name in os.listdir(directory) if name.endswith('.chunk'))
+        self.newest = self.chunks[-1] if self.chunks else -math.inf
+        self._mapped = OrderedDict()
+        self.open_time = None
+        self.open = np.zeros(len(COLUMNS))
+
+    def _path(self, start):
+        return os.path.join(self.directory, f'{start}.chunk')
+
+    def _chunk(self, start, create=False):
+        chunk = self._mapped.get(start)
+        if chunk is not None:
+            self._mapped.move_to_end(start)
+            return chunk
+        path = self._path(start)
+        if os.path.exists(path):
+            chunk = np.memmap(path, dtype=np.float64, mode='r+', shape=(len(COLUMNS), self.rows))
+        elif create:
+            chunk = np.memmap(path, dtype=np.float64, mode='w+', shape=(len(COLUMNS), self.rows))
+            self.chunks.append(start)
+            self.chunks.sort()
+        else:
+            return None
+        self._mapped[start] = chunk
+        if len(self._mapped) > OPEN_CHUNKS:
+            self._mapped.popitem(last=False)[1].flush()
+        return chunk
+
+    def bucket(self, timestamp):
+        return timestamp - timestamp % self.resolution
+
+    def write(self, bucket_time, values):
+        """Merge a closed bucket into its chunk; returns False when it is past retention"""
+        bucket_time = int(bucket_time)
+        self.newest = max(self.newest, bucket_time)
+        if bucket_time < self.newest - self.retention:
+            return False
+        start = bucket_time - bucket_time % self.span
+        chunk = self._chunk(start, create=True)
+        slot = int((bucket_time - start) // self.resolution)
+        _merge(chunk[:, slot], values)
+        if start == self.chunks[-1]:
+            self.expire()
+        return True
+
+    def stored(self, bucket_time):
+        """Whether a bucket has already been written to disk"""
+        start = bucket_time - bucket_time % self.span
+        chunk = self._chunk(start)
+        return chunk is not None and chunk[COUNT, (bucket_time - start) // self.resolution] > 0
+
+    def expire(self):
+        """Delete chunks whose every bucket is older than the retention window"""
+        cutoff = self.newest - self.retention
+        while self.chunks and self.chunks[0] + self.span <= cutoff:
+            start = self.chunks.pop(0)
+            self._mapped.pop(start, None)
+            os.remove(self._path(start))
+
+    def read(self, start, end):
+        """Non-empty buckets in [start, end) as (times, (4, n) values)"""
+        first = start - start % self.span
+        times, values = [], []
+        for chunk_start in self.chunks:
+            if chunk_start < first or chunk_start >= end:
+                continue
+            chunk = self._chunk(chunk_start)
+            lo = max(0, int(math.ceil((start - chunk_start) / self.resolution)))
+            hi = min(self.rows, int(math.ceil((end - chunk_start) / self.resolution)))
+            block = np.array(chunk[:, lo:hi])
+            filled = np.flatnonzero(block[COUNT] > 0)
+            times.append(chunk_start + (lo + filled) * self.resolution)
+            values.append(block[:, filled])
+        if not times:
+            return np.zeros(0), np.zeros((len(COLUMNS), 0))
+        return np.concatenate(times).astype(np.float64), np.concatenate(values, axis=1)
+
+    def flush(self):
+        for chunk in self._mapped.values():
+            chunk.flush()
+
+    def disk_bytes(self):
+        return len(self.chunks) * len(COLUMNS) * self.rows * 8
+
+
+class TimeSeriesStore:
+    """Embedded on-disk store of numeric time series with automatic rollups
+
+    Every series is kept at each resolution of ``levels`` (1 s, 1 m and 1 h
+    by default), each with its own retention. Points are bucketed at the
+    finest resolution; when a bucket closes its min/max/sum/count is written
+    to disk and folded into the bucket of the next resolution, so coarser
+    resolutions never re-read finer data. Points older than the bucket being
+    filled are merged straight into the stored buckets, at every resolution.
+    Disk use per series is bounded by retention / resolution buckets of
+    32 bytes at each resolution.
+    """
+
+    def __init__(self, root, levels=DEFAULT_LEVELS, chunk_rows=CHUNK_ROWS):
+        resolutions = [resolution for resolution, _ in levels]
+        if any(coarse % fine for fine, coarse in zip(resolutions, resolutions[1:])) or resolutions != sorted(resolutions):
+            raise ValueError("Each resolution must be a multiple of the previous one")
+        self.root = root
+        self.levels = tuple(levels)
+        self.chunk_rows = chunk_rows
+        self._series = {}
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        for name in sorted(os.listdir(root)):
+            if SERIES_NAME.match(name) and os.path.isdir(os.path.join(root, name)):
+                self._load(name)
+
+    def _load(self, name):
+        directory = os.path.join(self.root, name)
+        levels = [_Level(os.path.join(directory, f'{resolution}s'), resolution, retention, self.chunk_rows)
+                  for resolution, retention in self.levels]
+        state_path = os.path.join(directory, 'open.npy')
+        if os.path.exists(state_path):
+            # Buckets that were still filling when the store was last flushed
+            state = np.load(state_path)
+            for level, row in zip(levels, state):
+                # A bucket only reaches disk when it closes, so a stored one is stale state
+                if not np.isnan(row[0]) and not level.stored(int(row[0])):
+                    level.open_time, level.open[:] = int(row[0]), row[1:]
+        self._series[name] = levels
+        return levels
+
+    def _levels(self, name):
+        levels = self._series.get(name)
+        if levels is None:
+            if not SERIES_NAME.match(name):
+                raise ValueError(f"Invalid series name: {name!r}")
+            levels = self._load(name)
+        return levels
+
+    def names(self):
+        return sorted(self._series)
+
+    def _add(self, levels, index, bucket_time, values):
+        level = levels[index]
+        if level.open_time is None or bucket_time > level.open_time:
+            if level.open_time is not None:
+                self._close(levels, index)
+            level.open_time = bucket_time
+            level.open[:] = values
+        elif bucket_time == level.open_time:
+            _merge(level.open, values)
+        else:
+            # Late data: patch the stored bucket here and the covering buckets above
+            level.write(bucket_time, values)
+            if index + 1 < len(levels):
+                self._add(levels, index + 1, levels[index + 1].bucket(bucket_time), values)
+
+    def _close(self, levels, index):
+        level = levels[index]
+        bucket_time, values = level.open_time, level.open.copy()
+        level.write(bucket_time, values)
+        level.open_time = None
+        if index + 1 < len(levels):
+            self._add(levels, index + 1, levels[index + 1].bucket(bucket_time), values)
+
+    def append(self, name, timestamp, value):
+        value = float(value)
+        with self._lock:
+            levels = self._levels(name)
+            self._add(levels, 0, levels[0].bucket(int(timestamp)), np.array([value, value, value, 1.0]))
+
+    def append_many(self, name, timestamps, values):
+        """Append many points at once; they are pre-aggregated per finest bucket"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if not len(timestamps):
+            return
+        resolution = self.levels[0][0]
+        buckets = np.floor(timestamps / resolution).astype(np.int64) * resolution
+        order = np.argsort(buckets, kind='stable')
+        buckets, values = buckets[order], values[order]
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        rows = np.stack([
+            np.minimum.reduceat(values, starts),
+            np.maximum.reduceat(values, starts),
+            np.add.reduceat(values, starts),
+            np.diff(np.r_[starts, len(values)]).astype(np.float64),
+        ], axis=1)
+        with self._lock:
+            levels = self._levels(name)
+            for bucket_time, row in zip(buckets[starts].tolist(), rows):
+                self._add(levels, 0, bucket_time, row)
+
+    def append_row(self, timestamp, values, prefix=''):
+        """Append one point to each series of a {name: value} mapping"""
+        with self._lock:
+            for name, value in values.items():
+                self.append(prefix + name, timestamp, value)
+
+    def latest(self, name):
+        """Start of the newest bucket of a series, or None when it has no data"""
+        with self._lock:
+            levels = self._series.get(name)
+            if levels is None:
+                return None
+            times = [level.open_time for level in levels if level.open_time is not None]
+            times += [level.newest for level in levels if level.newest > -math.inf]
+            return max(times) if times else None
+
+    def _choose(self, levels, start, end, max_points):
+        # Coarser resolutions keep data for longer; skip those that no longer cover ``start``
+        usable = [i for i, level in enumerate(levels) if start >= level.newest - level.retention]
+        if not usable:
+            usable = [len(levels) - 1]
+        if max_points is None:
+            return usable[0]
+        enough = [i for i in usable if (end - start) / levels[i].resolution >= max_points]
+        return enough[-1] if enough else usable[0]
+
+    def query(self, name, start, end, max_points=None, resolution=None):
+        """Buckets of a series in [start, end) as a dict of arrays
+
+        Reads the coarsest resolution that still yields ``max_points`` buckets
+        over the range (or the one given as ``resolution``) and merges
+        neighbouring buckets further if more than ``max_points`` remain.
+        Returns 'time' (bucket start, epoch seconds), 'min', 'max', 'mean',
+        'sum' and 'count', plus the 'resolution' used.
+        """
+        with self._lock:
+            levels = self._series.get(name)
+            if levels is None:
+                empty = np.zeros(0)
+                return {'time': empty, 'min': empty, 'max': empty, 'mean': empty, 'sum': empty, 'count': empty,
+                        'resolution': None}
+            if resolution is None:
+                index = self._choose(levels, start, end, max_points)
+            else:
+                index = [level.resolution for level in levels].index(resolution)
+            level = levels[index]
+            start = level.bucket(int(math.floor(start)))
+            times, values = level.read(start, end)
+            # Buckets still filling at this and every finer resolution are not on disk yet
+            pending = [(level.bucket(finer.open_time), finer.open.copy()) for finer in levels[:index + 1]
+                       if finer.open_time is not None and start <= finer.open_time < end]
+
+        for bucket_time, row in pending:
+            position = np.searchsorted(times, bucket_time)
+            if position < len(times) and times[position] == bucket_time:
+                merged = values[:, position].copy()
+                _merge(merged, row)
+                values[:, position] = merged
+            else:
+                times = np.insert(times, position, bucket_time)
+                values = np.insert(values, position, row, axis=1)
+
+        if max_points is not None and len(times) > max_points:
+            width = level.resolution * math.ceil((end - start) / level.resolution / max_points)
+            groups = ((times - start) // width).astype(np.int64)
+            edges = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+            times = start + groups[edges] * width
+            values = np.stack([
+                np.minimum.reduceat(values[MIN], edges),
+                np.maximum.reduceat(values[MAX], edges),
+                np.add.reduceat(values[SUM], edges),
+                np.add.reduceat(values[COUNT], edges),
+            ])
+        return {
+            'time': times,
+            'min': values[MIN],
+            'max': values[MAX],
+            'mean': values[SUM] / np.maximum(values[COUNT], 1),
+            'sum': values[SUM],
+            'count': values[COUNT],
+            'resolution': level.resolution,
+        }
+
+    def flush(self):
+        """Write mapped chunks and the buckets still filling to disk"""
+        with self._lock:
+            for name, levels in self._series.items():
+                for level in levels:
+                    level.flush()
+                state = np.array([[np.nan if level.open_time is None else level.open_time, *level.open]
+                                  for level in levels])
+                path = os.path.join(self.root, name, 'open.npy')
+                np.save(path + '.tmp.npy', state)
+                os.replace(path + '.tmp.npy', path)
+
+    def disk_usage(self):
+        """Bytes of chunk files per series"""
+        with self._lock:
+            return {name: sum(level.disk_bytes() for level in levels) for name, levels in self._series.items()}
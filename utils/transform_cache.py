@@ -0,0 +1,138 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+
+def fingerprint(array):
+    """Stable content hash of an array, including its shape and dtype"""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str((array.shape, array.dtype.str)).encode())
+    digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+def transformer_key(transformers):
+    """Describe a chain of fitted-or-unfitted transformers by type and parameters"""
+    steps = getattr(transformers, 'steps', None) or [('step', transformers)]
+    parts = []
+    for name, step in steps:
+        if step is None or isinstance(step, str):
+            parts.append((name, 'passthrough'))
+            continue
+        params = sorted((k, repr(v)) for k, v in step.get_params(deep=False).items())
+        parts.append((name, type(step).__module__, type(step).__name__, params))
+    return repr(parts)
+
+
+class TransformCache:
+    """On-disk cache of transformed cross-validation folds
+
+    Entries are keyed by the dataset fingerprint, the train/test indices of
+    the fold and the parameters of every transformer in the chain, so a grid
+    candidate that only changes the final estimator reuses the scaled and
+    expanded matrices of an earlier candidate. Files are written atomically,
+    which lets several worker processes share one directory. When the
+    directory grows past ``max_bytes`` the least recently used entries are
+    removed.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 ** 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _path(self, data_key, transformers, train, test):
+        digest = hashlib.sha256()
+        for part in (data_key, fingerprint(train), fingerprint(test), transformer_key(transformers)):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return os.path.join(self.directory, f'{digest.hexdigest()}.npz')
+
+    def fold_transform(self, transformers, X, train, test, data_key=None):
+        """Return (X_train, X_test, status) for a fold, fitting the transformers only on a miss"""
+        data_key = data_key or fingerprint(X)
+        path = self._path(data_key, transformers, train, test)
+        try:
+            with np.load(path) as cached:
+                X_train, X_test = cached['train'], cached['test']
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return X_train, X_test, 'hit'
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            pass
+
+        X_train = transformers.fit_transform(X[train])
+        X_test = transformers.transform(X[test])
+        self._store(path, X_train, X_test)
+        with self._lock:
+            self.misses += 1
+        return X_train, X_test, 'miss'
+
+    def _store(self, path, X_train, X_test):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, train=X_train, test=X_test)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.npz'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except FileNotFoundError:
+                continue
+
+    def size(self):
+        return sum(e.stat().st_size for e in os.scandir(self.directory) if e.name.endswith('.npz'))
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(('.npz', '.tmp')):
+                os.remove(entry.path)